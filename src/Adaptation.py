@@ -0,0 +1,185 @@
+"""
+Solution adaptive point distributions of the windtunnel blocks
+
+The point distributions of the windtunnel blocks (tanh distribution on
+the C-shaped boundary in TunnelMesh, geometric distribution along the
+wake in TunnelMeshWake) are chosen with the velocity gradients of the
+panel method solution (SvpMethod, see Farfield.Farfield.gradient).
+
+The monitor of a cell is its width times the velocity gradient, sampled
+along the grid lines which start at the points of the distribution.
+Equidistributing the monitor minimizes its largest value. Here the
+minimum is searched within the family of the static distribution (tanh
+stretching, geometric ratio), so the distributions stay smooth and the
+number of points does not change. A free redistribution of the points
+on the C-shaped boundary skews the grid lines of the windtunnel block
+(the points on the airfoil side are fixed) and folds cells.
+"""
+
+import numpy as np
+
+import Farfield
+import Spacing
+from Utils import Utils
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Adaptation:
+
+    def __init__(self, contour, alpha=0.0, npanel=60, order=8):
+        """
+        Args:
+            contour (tuple): x and y coordinates of the airfoil contour
+            alpha (float, optional): Angle of attack in degrees
+            npanel (int, optional): Number of panels
+            order (int, optional): Number of Gauss points per panel
+        """
+        self.solution = Farfield.Farfield(contour, alpha=alpha,
+                                          npanel=npanel, order=order)
+
+        # distribution name -> largest monitor (static, adapted)
+        self.monitors = dict()
+
+    def monitor(self, start, end, fractions=(0.05, 0.1, 0.2, 0.4)):
+        """Largest cell monitor between the grid lines of a distribution
+
+        Args:
+            start (np.array): Points of the distribution, where the grid
+                lines start, shape (n, 2)
+            end (np.array): Other ends of the grid lines, shape (n, 2)
+            fractions (tuple, optional): Positions on the grid lines
+                (0 is start, 1 is end) where the cells are evaluated
+
+        Returns:
+            float: Largest cell width times velocity gradient
+        """
+        largest = 0.0
+        for fraction in fractions:
+            points = start + fraction * (end - start)
+            width = np.linalg.norm(np.diff(points, axis=0), axis=1)
+            middle = 0.5 * (points[1:] + points[:-1])
+            largest = max(largest,
+                          np.max(width * self.solution.gradient(middle)))
+        return largest
+
+    def tunnelDistribution(self, inner, line, ld=-1.3, ud=1.3,
+                           scales=np.linspace(0.6, 1.4, 9)):
+        """Parameters of the tanh distribution on the windtunnel boundary
+
+        Both parameters are scaled by the same factor, so only the
+        stretching changes and the biasing stays as it is. The mesh
+        quality of the windtunnel block is very sensitive to unequal
+        parameters (biasing), but not to the scaling in this range.
+
+        Args:
+            inner (np.array): Inner line of the windtunnel block
+            line (np.array): C-shaped windtunnel boundary
+            ld (float, optional): Static lower parameter (negative)
+            ud (float, optional): Static upper parameter
+            scales (np.array, optional): Factors which are tried
+
+        Returns:
+            tuple: ld and ud
+        """
+        def monitor(scale):
+            t = Spacing.tanh_two_sided(divisions=len(inner) - 1,
+                                       delta=scale * (ud - ld),
+                                       center=-ld / (ud - ld),
+                                       normalized=False)
+            return self.monitor(inner, Utils.resample_polyline(line, t))
+
+        candidates = [1.0] + list(scales)
+        monitors = [monitor(candidate) for candidate in candidates]
+
+        best = int(np.argmin(monitors))
+        self.monitors['tunnel'] = (monitors[0], monitors[best])
+        scale = candidates[best]
+
+        logger.info('Adaptive windtunnel distribution: ld = {:.2f}, '
+                    'ud = {:.2f}'.format(scale * ld, scale * ud))
+
+        return scale * ld, scale * ud
+
+    def wakeRatio(self, start, end, divisions=100, ratio=15.0, first=0.0,
+                  number=16):
+        """Ratio of the geometric distribution along the wake
+
+        The ratio is limited so that the first cell of the wake is not
+        smaller than the adjacent cell of the trailing edge block.
+
+        Args:
+            start (np.array): Start of the wake at the trailing edge block
+            end (np.array): End of the wake at the outlet
+            divisions (int, optional): Number of subdivisions
+            ratio (float, optional): Static ratio of last to first cell
+            first (float, optional): Smallest size of the first cell
+            number (int, optional): Number of ratios which are tried
+
+        Returns:
+            float: Ratio of last to first cell
+        """
+        start = np.asarray(start, dtype=float)
+        end = np.asarray(end, dtype=float)
+        length = np.linalg.norm(end - start)
+
+        def monitor(ratio):
+            s = Spacing.geometric(divisions=divisions, ratio=ratio,
+                                  length=1.0)
+            points = start + s[:, np.newaxis] * (end - start)
+            return self.monitor(points, points, fractions=(0.0,))
+
+        largest = ratio
+        if 0.0 < first < length / divisions:
+            growth, _ = Spacing.growth_rate(first=first, length=length,
+                                            cells=divisions)
+            largest = max(ratio, growth**(divisions - 1.0))
+
+        candidates = [ratio] + list(np.geomspace(1.0, largest, number))
+        monitors = [monitor(candidate) for candidate in candidates]
+
+        best = int(np.argmin(monitors))
+        self.monitors['wake'] = (monitors[0], monitors[best])
+
+        logger.info('Adaptive wake distribution: ratio = {:.1f}'.
+                    format(candidates[best]))
+
+        return candidates[best]
+
+    def report(self, wind_tunnel):
+        """Cell counts of adapted and static distributions
+
+        For the same largest cell monitor, the static distribution needs
+        more points (the cell widths scale with the inverse number of
+        points). The other direction of the blocks is the same.
+
+        Args:
+            wind_tunnel (Windtunnel): Instance with the adapted blocks
+
+        Returns:
+            dict: Block name and 'mesh' (all blocks) -> (cells, cells of
+                the static distribution at equal accuracy)
+        """
+        blocks = {'tunnel': wind_tunnel.block_tunnel,
+                  'wake': wind_tunnel.block_tunnel_wake}
+
+        cells = int(sum(np.prod(block.getDivUV())
+                        for block in wind_tunnel.blocks))
+
+        report = dict()
+        static_cells = cells
+        for name, (static, adapted) in self.monitors.items():
+            # the distribution runs along the u-lines of both blocks
+            columns, rows = blocks[name].getDivUV()
+            equal = int(np.ceil(columns * static / adapted)) * rows
+            report[name] = (columns * rows, equal)
+            static_cells += equal - columns * rows
+
+            logger.info('Adaptive {} block: {} cells, the static '
+                        'distribution needs {} cells for the same largest '
+                        'cell monitor'.format(name, columns * rows, equal))
+
+        report['mesh'] = (cells, static_cells)
+
+        return report
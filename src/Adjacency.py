@@ -0,0 +1,193 @@
+"""
+Adjacency of the mesh as compressed sparse row (CSR) tables
+
+A CSR table is a pair of arrays (indptr, indices): the entries of row i
+are indices[indptr[i]:indptr[i + 1]]. The tables are built with one
+stable argsort and a bincount, so there is no loop over the vertices
+or cells:
+
+    - vertex -> cells: cells which have the vertex as a corner
+    - vertex -> vertices: vertices connected to the vertex by an edge
+    - edge -> cells: one cell for boundary edges, two for inner edges
+
+Within a row the entries are sorted (cells and vertices by their
+number). The edges are numbered as in ElementTypes.edge_table, the edge
+tables have the integer type of the connectivity (int32 for a
+CompactMesh).
+
+The cell neighbour table is a plain array: neighbour j of a cell lies
+across edge j (from vertex j to vertex j + 1), -1 marks the boundary.
+"""
+
+import numpy as np
+
+import ElementTypes
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def csr(rows, columns, number_of_rows):
+    """CSR table from the (row, column) pairs of its entries
+
+    Args:
+        rows (np.array): Row of each entry
+        columns (np.array): Column of each entry
+        number_of_rows (int): Number of rows of the table
+
+    Returns:
+        tuple: indptr (number_of_rows + 1) and indices (entries sorted
+            by row, then in the order of the pairs)
+    """
+    rows = np.asarray(rows).ravel()
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(number_of_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=number_of_rows), out=indptr[1:])
+    return indptr, np.asarray(columns).ravel()[order]
+
+
+def vertex_cells(connectivity, number_of_vertices):
+    """CSR table of the cells at each vertex"""
+    cells = np.asarray(connectivity)
+    ids = np.broadcast_to(np.arange(len(cells))[:, np.newaxis], cells.shape)
+    return csr(cells, ids, number_of_vertices)
+
+
+def vertex_vertices(edges, number_of_vertices):
+    """CSR table of the neighbour vertices of each vertex
+
+    Args:
+        edges (np.array): Unique edges of shape (nedges, 2)
+        number_of_vertices (int): Number of vertices of the mesh
+    """
+    edges = np.asarray(edges)
+    rows = np.concatenate((edges[:, 0], edges[:, 1]))
+    columns = np.concatenate((edges[:, 1], edges[:, 0]))
+    indptr, indices = csr(rows, columns, number_of_vertices)
+
+    # sort the neighbours within each row
+    row_of_entry = np.repeat(np.arange(number_of_vertices), np.diff(indptr))
+    order = np.lexsort((indices, row_of_entry))
+    return indptr, indices[order]
+
+
+def edge_cells(cell_edges, number_of_edges):
+    """CSR table of the cells at each edge
+
+    Args:
+        cell_edges (np.array): Edge numbers of each cell, shape
+            (ncells, edges per cell)
+        number_of_edges (int): Number of unique edges
+    """
+    cell_edges = np.asarray(cell_edges)
+    ids = np.broadcast_to(np.arange(len(cell_edges))[:, np.newaxis],
+                          cell_edges.shape)
+    return csr(cell_edges, ids, number_of_edges)
+
+
+def cell_neighbours(cell_edges):
+    """Cell across each edge of each cell
+
+    The cell edges are sorted by their edge number, an inner edge then
+    appears twice in a row and the two cells are neighbours.
+
+    Args:
+        cell_edges (np.array): Edge numbers of each cell, shape
+            (ncells, edges per cell)
+
+    Returns:
+        np.array: Neighbour cells, int32 of the same shape, -1 on the
+            boundary
+    """
+    cell_edges = np.asarray(cell_edges)
+    edges = cell_edges.ravel()
+    order = np.argsort(edges, kind='stable')
+    cells = (order // cell_edges.shape[1]).astype(np.int32)
+
+    shared = np.flatnonzero(edges[order[1:]] == edges[order[:-1]])
+
+    neighbours = np.full(edges.shape, -1, dtype=np.int32)
+    neighbours[order[shared]] = cells[shared + 1]
+    neighbours[order[shared + 1]] = cells[shared]
+    return neighbours.reshape(cell_edges.shape)
+
+
+class Adjacency:
+    """Adjacency tables of a mesh, each made on first use
+
+    Windtunnel.getAdjacency keeps one instance per mesh, so smoothers,
+    quality metrics and writers share the tables.
+    """
+
+    def __init__(self, mesh):
+        """
+        Args:
+            mesh (tuple or CompactMesh): vertices and connectivity
+        """
+        vertices, connectivity = mesh
+        self.connectivity = np.asarray(connectivity)
+        self.number_of_vertices = len(vertices)
+        self._tables = dict()
+
+    def _table(self, name, make):
+        if name not in self._tables:
+            self._tables[name] = make()
+        return self._tables[name]
+
+    def edgeTable(self):
+        """Unique edges and the edge numbers of each cell
+
+        Returns:
+            tuple: edges (array of shape (nedges, 2), sorted vertex
+                numbers) and cell to edge table (ncells, edges per cell)
+        """
+        def make():
+            n = self.number_of_vertices
+            keys, cell_edges = ElementTypes.edge_table(self.connectivity, n)
+            dtype = self.connectivity.dtype
+            edges = np.stack((keys // n, keys % n), axis=-1)
+            return (edges.astype(dtype, copy=False),
+                    cell_edges.astype(dtype, copy=False))
+        return self._table('edges', make)
+
+    def vertexCells(self):
+        """CSR table (indptr, indices) of the cells at each vertex"""
+        return self._table('vertex_cells', lambda: vertex_cells(
+            self.connectivity, self.number_of_vertices))
+
+    def vertexVertices(self):
+        """CSR table (indptr, indices) of the neighbours of each vertex"""
+        return self._table('vertex_vertices', lambda: vertex_vertices(
+            self.edgeTable()[0], self.number_of_vertices))
+
+    def edgeCells(self):
+        """CSR table (indptr, indices) of the cells at each edge"""
+        def make():
+            edges, cell_edges = self.edgeTable()
+            return edge_cells(cell_edges, len(edges))
+        return self._table('edge_cells', make)
+
+    def cellNeighbours(self):
+        """Neighbour cells of shape (ncells, edges per cell), -1 on the
+        boundary (see cell_neighbours)"""
+        return self._table('cell_neighbours', lambda: cell_neighbours(
+            self.edgeTable()[1]))
+
+    def boundaryEdges(self):
+        """Edges which belong to only one cell
+
+        Returns:
+            np.array: Boundary edges of shape (nboundary, 2), in the
+                order of the cells
+        """
+        def make():
+            edges, cell_edges = self.edgeTable()
+            cell_edges = cell_edges.ravel()
+            cells_per_edge = np.bincount(cell_edges, minlength=len(edges))
+            return edges[cell_edges[cells_per_edge[cell_edges] == 1]]
+        return self._table('boundary_edges', make)
+
+    def cellsOfVertex(self, vertex):
+        """Cell numbers at one vertex"""
+        indptr, indices = self.vertexCells()
+        return indices[indptr[vertex]:indptr[vertex + 1]]
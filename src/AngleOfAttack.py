@@ -0,0 +1,165 @@
+import os
+import copy
+import numpy as np
+
+import Meshing
+from CompactMesh import CompactMesh
+from Utils import Transformations
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class AngleOfAttack:
+    """Meshes for several angles of attack from one base mesh
+
+    The mesh is rotated around a pivot point (quarter chord by default).
+    Inside the inner radius the rotation is rigid, so the cells around
+    the airfoil keep their shape. Between inner and outer radius the
+    rotation angle decreases linearly to zero, outside the outer radius
+    (farfield and windtunnel boundaries) nothing moves. Connectivity and
+    boundary tags are the same for all angles.
+    """
+
+    def __init__(self, wind_tunnel, pivot=(0.25, 0.0), inner_radius=None,
+                 outer_radius=None):
+        """
+        Args:
+            wind_tunnel (Windtunnel): Instance with mesh and boundary tags
+                (angle of attack 0)
+            pivot (tuple, optional): Center of the rotation
+            inner_radius (float, optional): Radius of the rigidly rotated
+                disc, default is slightly larger than the airfoil
+            outer_radius (float, optional): Radius where the rotation
+                ends, default is 90% of the distance to the windtunnel
+                boundary
+
+        Raises:
+            ValueError: If the radii do not fit between airfoil and
+                windtunnel boundary
+        """
+        self.wind_tunnel = wind_tunnel
+        self.pivot = np.asarray(pivot, dtype=float)
+
+        vertices, _ = wind_tunnel.mesh
+        self.vertices = np.asarray(vertices, dtype=float)
+
+        tags = wind_tunnel.boundary_tags
+        airfoil = np.unique(np.asarray(tags['airfoil']))
+        farfield = np.unique(np.concatenate(
+            [np.asarray(edges).ravel() for name, edges in tags.items()
+             if name != 'airfoil' and len(edges)]))
+
+        def distance(ids):
+            return np.linalg.norm(self.vertices[ids] - self.pivot, axis=1)
+
+        airfoil_radius = distance(airfoil).max()
+        farfield_radius = distance(farfield).min()
+
+        if inner_radius is None:
+            inner_radius = 1.05 * airfoil_radius
+        if outer_radius is None:
+            outer_radius = 0.9 * farfield_radius
+
+        if not airfoil_radius < inner_radius < outer_radius <= \
+                farfield_radius:
+            raise ValueError('Rotation radii need to satisfy airfoil '
+                             '({:.3f}) < inner ({:.3f}) < outer ({:.3f}) <= '
+                             'windtunnel boundary ({:.3f}).'.
+                             format(airfoil_radius, inner_radius,
+                                    outer_radius, farfield_radius))
+
+        self.inner_radius = inner_radius
+        self.outer_radius = outer_radius
+
+        # fraction of the rotation angle applied to each vertex
+        radius = np.linalg.norm(self.vertices - self.pivot, axis=1)
+        self.blending = np.clip((outer_radius - radius) /
+                                (outer_radius - inner_radius), 0.0, 1.0)
+        self.rigid = self.blending == 1.0
+        self.blended = (self.blending > 0.0) & ~self.rigid
+
+    def rotate(self, angle):
+        """Vertex coordinates for one angle of attack
+
+        Args:
+            angle (float): Angle of attack in degrees (positive is nose
+                up for a flow in x-direction)
+
+        Returns:
+            np.array: Vertex coordinates of shape (n, 2)
+        """
+        vertices = self.vertices.copy()
+
+        # rigid rotation of the inner disc (clockwise for nose up)
+        px, py = self.pivot
+        matrix = Transformations.translate3D((px, py, 0.0)).dot(
+            Transformations.rotate3D(axis='z', phi=-angle).dot(
+                Transformations.translate3D((-px, -py, 0.0))))
+        vertices[self.rigid] = self.vertices[self.rigid].dot(
+            matrix[:2, :2].T) + matrix[:2, 3]
+
+        # rotation angle blended to zero at the outer radius
+        phi = np.radians(-angle) * self.blending[self.blended]
+        cos, sin = np.cos(phi), np.sin(phi)
+        x, y = (self.vertices[self.blended] - self.pivot).T
+        vertices[self.blended] = self.pivot + \
+            np.stack((cos * x - sin * y, sin * x + cos * y), axis=-1)
+
+        return vertices
+
+    def series(self, angles):
+        """Meshes for a list of angles of attack, one at a time
+
+        Only the rotated vertices of the current angle are kept in memory.
+        The yielded object is a shallow copy of the windtunnel with the
+        rotated mesh, so it can be passed to the mesh writers.
+
+        Args:
+            angles (list): Angles of attack in degrees
+
+        Yields:
+            tuple: angle of attack and Windtunnel copy
+        """
+        base = self.wind_tunnel
+
+        for angle in angles:
+            wind_tunnel = copy.copy(base)
+            vertices = self.rotate(angle)
+
+            if isinstance(base.mesh, CompactMesh):
+                mesh = copy.copy(base.mesh)
+                mesh.vertices = vertices.astype(base.mesh.vertices.dtype)
+                wind_tunnel.mesh = mesh
+            else:
+                _, connectivity = base.mesh
+                wind_tunnel.mesh = vertices, connectivity
+
+            yield angle, wind_tunnel
+
+    def export(self, basename, angles, formats=('SU2',)):
+        """Write the meshes of all angles of attack
+
+        The angle is appended to the file name, e.g. clarky_AoA_-2.5.su2.
+
+        Args:
+            basename (str): Path and file name without extension
+            angles (list): Angles of attack in degrees
+            formats (list, optional): Output formats, see Meshing.WRITERS
+
+        Returns:
+            list: Names of the written files
+        """
+        names = list()
+
+        for angle, wind_tunnel in self.series(angles):
+            for output_format in formats:
+                writer, extension = Meshing.WRITERS[output_format]
+                name = '{}_AoA_{:g}{}'.format(basename, angle, extension)
+                getattr(Meshing.BlockMesh, writer)(wind_tunnel, name=name)
+                names.append(name)
+
+        logger.info('Meshes for {} angles of attack saved as {}_AoA_*'.
+                    format(len(angles), os.path.basename(basename)))
+
+        return names
@@ -6,6 +6,13 @@ import SplineRefine
 import TrailingEdge
 import Meshing
 import Connect
+import Multilevel
+import AngleOfAttack
+import Farfield
+import Adaptation
+import CellBudget
+import Extrusion
+import ElementTypes
 from Settings import DATAPATH
 
 import logging
@@ -34,6 +41,40 @@ class Batch:
         with open(batch_controlfile, 'r') as f:
             self.batch_control = json.load(f)
 
+    def make_contour(self, points, trailing_edge):
+        """Spline, refine and trailing edge of the current airfoil
+
+        Args:
+            points (int): Number of points on the spline
+            trailing_edge (str): 'yes' for a blunt trailing edge
+        """
+        # spline and refine
+        refinement = self.batch_control['Airfoil contour refinement']
+        refine = SplineRefine.SplineRefine()
+        refine.doSplineRefine(tolerance=refinement['Refinement tolerance'],
+                              points=points,
+                              ref_te=refinement['Refine trailing edge old'],
+                              ref_te_n=refinement['Refine trailing edge new'],
+                              ref_te_ratio=refinement['Refine trailing edge ratio'])
+
+        # trailing edge
+        if trailing_edge == 'yes':
+
+            self.app.mainwindow.airfoil.has_TE = True
+
+            te = self.batch_control['Airfoil trailing edge']
+            trailing = TrailingEdge.TrailingEdge()
+
+            trailing.trailingEdge(blend=te['Upper side blending length'] / 100.0,
+                                ex=te['Upper blending polynomial exponent'],
+                                thickness=te['Trailing edge thickness relative to chord'],
+                                side='upper')
+
+            trailing.trailingEdge(blend=te['Lower side blending length'] / 100.0,
+                                ex=te['Lower blending polynomial exponent'],
+                                thickness=te['Trailing edge thickness relative to chord'],
+                                side='lower')
+
     def run_batch(self):
         
         # loop all airfoils
@@ -68,107 +109,282 @@ class Batch:
             self.airfoil = Airfoil.Airfoil(basename)
             self.airfoil.readContour(os.path.join(airfoil_path, airfoil), '#')
 
-            # spline and refine
+            # spline, refine and trailing edge
             refinement = self.batch_control['Airfoil contour refinement']
-            refine = SplineRefine.SplineRefine()
-            refine.doSplineRefine(tolerance=refinement['Refinement tolerance'],
-                                  points=refinement['Number of points on spline'],
-                                  ref_te=refinement['Refine trailing edge old'],
-                                  ref_te_n=refinement['Refine trailing edge new'],
-                                  ref_te_ratio=refinement['Refine trailing edge ratio'])
-
-            # trailing edge
-            if trailing_edges[i] == 'yes':
-
-                self.app.mainwindow.airfoil.has_TE = True
-
-                te = self.batch_control['Airfoil trailing edge']
-                trailing = TrailingEdge.TrailingEdge()
-
-                trailing.trailingEdge(blend=te['Upper side blending length'] / 100.0,
-                                    ex=te['Upper blending polynomial exponent'],
-                                    thickness=te['Trailing edge thickness relative to chord'],
-                                    side='upper')
-
-                trailing.trailingEdge(blend=te['Lower side blending length'] / 100.0,
-                                    ex=te['Lower blending polynomial exponent'],
-                                    thickness=te['Trailing edge thickness relative to chord'],
-                                    side='lower')
-            
+            points = refinement['Number of points on spline']
+            self.make_contour(points, trailing_edges[i])
+
             # make mesh
             wind_tunnel = Meshing.Windtunnel()
             contour = self.app.mainwindow.airfoil.spline_data[0]
 
-            # mesh around airfoil
-            acm = self.batch_control['Airfoil contour mesh']
-            wind_tunnel.AirfoilMesh(name='block_airfoil',
-                                    contour=contour,
-                                    divisions=acm['Divisions normal to airfoil'],
-                                    ratio=acm['Cell growth rate'],
-                                    thickness=acm['1st cell layer thickness'])
-
-            # mesh at trailing edge
-            tem = self.batch_control['Airfoil trailing edge mesh']
-            wind_tunnel.TrailingEdgeMesh(name='block_TE',
-                                         te_divisions=tem['Divisions at trailing edge'],
-                                         thickness=tem['1st cell layer thickness'],
-                                         divisions=tem['Divisions downstream'],
-                                         ratio=tem['Cell growth rate'])
+            topology = self.batch_control.get('Mesh topology', 'multi-block')
 
-            # mesh tunnel airfoil
+            # windtunnel size and far field divisions
             tam = self.batch_control['Windtunnel mesh airfoil']
-            wind_tunnel.TunnelMesh(name='block_tunnel',
-                                   tunnel_height=tam['Windtunnel height'],
-                                   divisions_height=tam['Divisions of tunnel height'],
-                                   ratio_height=tam['Cell thickness ratio'],
-                                   dist=tam['Distribution biasing'],
-                                   smoothing_algorithm=tam['Smoothing algorithm'],
-                                   smoothing_iterations=tam['Smoothing iterations'],
-                                   smoothing_tolerance=tam['Smoothing tolerance'])
-
-            # mesh tunnel wake
             twm = self.batch_control['Windtunnel mesh wake']
-            wind_tunnel.TunnelMeshWake(name='block_tunnel_wake',
-                                    tunnel_wake=twm['Windtunnel wake'],
-                                    divisions=twm['Divisions in the wake'],
-                                    ratio=twm['Cell thickness ratio'],
-                                    spread=twm['Equalize vertical wake line at'] / 100.0)
+            tunnel = dict(tunnel_height=tam['Windtunnel height'],
+                          divisions_height=tam['Divisions of tunnel height'],
+                          ratio_height=tam['Cell thickness ratio'],
+                          tunnel_wake=twm['Windtunnel wake'],
+                          divisions_wake=twm['Divisions in the wake'],
+                          ratio_wake=twm['Cell thickness ratio'])
+
+            # smallest windtunnel for a far field error tolerance (0 is off)
+            sizing = self.batch_control.get('Farfield sizing', {})
+            tolerance = sizing.get('Error tolerance', 0.0)
+            if tolerance:
+                farfield = Farfield.Farfield(contour,
+                                             alpha=sizing.get('Angle of attack', 0.0),
+                                             npanel=sizing.get('Panels', 60))
+                tunnel = farfield.settings(tolerance, **tunnel)
+
+            # mesh divisions, scaled to meet a cell budget (0 is off)
+            acm = self.batch_control['Airfoil contour mesh']
+            tem = self.batch_control['Airfoil trailing edge mesh']
+            mesh_divisions = dict(points=points,
+                                  divisions=acm['Divisions normal to airfoil'],
+                                  divisions_te=tem['Divisions downstream'],
+                                  te_divisions=tem['Divisions at trailing edge'],
+                                  divisions_height=tunnel['divisions_height'],
+                                  divisions_wake=tunnel['divisions_wake'])
+            budget = self.batch_control.get('Cell budget', {}).get('Cells', 0)
+            if budget:
+                ref_te = refinement['Refine trailing edge old']
+                ref_te_n = refinement['Refine trailing edge new']
+
+                # the points inserted by the curvature refinement depend
+                # on the number of spline points, so they are counted again
+                for _ in range(3):
+                    inserted = CellBudget.refinements(contour, points=points,
+                                                      ref_te=ref_te,
+                                                      ref_te_n=ref_te_n)
+                    planner = CellBudget.CellBudget(topology=topology,
+                                                    has_te=self.airfoil.has_TE,
+                                                    ref_te=ref_te,
+                                                    ref_te_n=ref_te_n,
+                                                    refinements=inserted)
+                    planned, predicted = planner.plan(budget, mesh_divisions)
+                    if planned['points'] == points:
+                        break
+                    points = planned['points']
+                    self.make_contour(points, trailing_edges[i])
+                    contour = self.app.mainwindow.airfoil.spline_data[0]
+
+                mesh_divisions = planned
+                tunnel['divisions_height'] = planned['divisions_height']
+                tunnel['divisions_wake'] = planned['divisions_wake']
+
+            # 'off' or the coordinate type of a CompactMesh
+            compact = self.batch_control.get('Compact mesh', 'off')
+            dtype = None if compact == 'off' else compact
+
+            if topology == 'C-grid':
+                # single block C-grid around airfoil and wake
+                divisions = dict(divisions=mesh_divisions['divisions'],
+                                 divisions_height=tunnel['divisions_height'],
+                                 divisions_wake=tunnel['divisions_wake'],
+                                 te_divisions=mesh_divisions['te_divisions'])
+
+                # coarser and finer levels of the same C-grid
+                levels = self.batch_control.get('Mesh levels', {})
+                coarse = levels.get('Coarser levels', 0)
+                fine = levels.get('Finer levels', 0)
+                if coarse:
+                    contour, divisions = \
+                        Multilevel.compatible_settings(contour, coarse=coarse,
+                                                       **divisions)
+
+                wind_tunnel.CGridMesh(name='block_cgrid',
+                                      contour=contour,
+                                      ratio=acm['Cell growth rate'],
+                                      thickness=acm['1st cell layer thickness'],
+                                      extrusion=acm.get('Extrusion', 'normal'),
+                                      tunnel_height=tunnel['tunnel_height'],
+                                      ratio_height=tunnel['ratio_height'],
+                                      dist=tam['Distribution biasing'],
+                                      tunnel_wake=tunnel['tunnel_wake'],
+                                      smoothing_algorithm=tam['Smoothing algorithm'],
+                                      smoothing_iterations=tam['Smoothing iterations'],
+                                      smoothing_tolerance=tam['Smoothing tolerance'],
+                                      **divisions)
+
+                if coarse or fine:
+                    hierarchy = Multilevel.MeshHierarchy(wind_tunnel,
+                                                         coarse=coarse,
+                                                         fine=fine,
+                                                         dtype=dtype)
+                else:
+                    hierarchy = None
+
+                    # connectivity and boundaries from the block indices
+                    connect = Connect.Connect(None)
+                    vertices, connectivity, node_ids = \
+                        connect.connectCGrid(wind_tunnel.block_cgrid,
+                                             wind_tunnel.cgrid_cut)
+                    wind_tunnel.mesh = vertices, connectivity
+                    if dtype:
+                        wind_tunnel.makeCompact(dtype=dtype)
+                    wind_tunnel.makeLCE()
+                    wind_tunnel.makeLCC()
+                    wind_tunnel.makeBoundariesCGrid(node_ids)
+
+            else:
+                # mesh around airfoil
+                wind_tunnel.AirfoilMesh(name='block_airfoil',
+                                        contour=contour,
+                                        divisions=mesh_divisions['divisions'],
+                                        ratio=acm['Cell growth rate'],
+                                        thickness=acm['1st cell layer thickness'],
+                                        extrusion=acm.get('Extrusion', 'normal'))
+
+                # mesh at trailing edge
+                wind_tunnel.TrailingEdgeMesh(name='block_TE',
+                                             te_divisions=mesh_divisions['te_divisions'],
+                                             thickness=tem['1st cell layer thickness'],
+                                             divisions=mesh_divisions['divisions_te'],
+                                             ratio=tem['Cell growth rate'])
+
+                # distributions of tunnel and wake from the panel method
+                clustering = self.batch_control.get('Adaptive clustering', {})
+                if clustering.get('Active', 'no') == 'yes':
+                    adaptation = Adaptation.Adaptation(contour,
+                                                       alpha=clustering.get('Angle of attack', 0.0),
+                                                       npanel=clustering.get('Panels', 60))
+                else:
+                    adaptation = None
+
+                # mesh tunnel airfoil
+                wind_tunnel.TunnelMesh(name='block_tunnel',
+                                       tunnel_height=tunnel['tunnel_height'],
+                                       divisions_height=tunnel['divisions_height'],
+                                       ratio_height=tunnel['ratio_height'],
+                                       dist=tam['Distribution biasing'],
+                                       smoothing_algorithm=tam['Smoothing algorithm'],
+                                       smoothing_iterations=tam['Smoothing iterations'],
+                                       smoothing_tolerance=tam['Smoothing tolerance'],
+                                       adaptation=adaptation)
+
+                # mesh tunnel wake
+                wind_tunnel.TunnelMeshWake(name='block_tunnel_wake',
+                                        tunnel_wake=tunnel['tunnel_wake'],
+                                        divisions=tunnel['divisions_wake'],
+                                        ratio=tunnel['ratio_wake'],
+                                        spread=twm['Equalize vertical wake line at'] / 100.0,
+                                        adaptation=adaptation)
             
-            # connect mesh blocks
-            connect = Connect.Connect(None)
-            vertices, connectivity, _ = connect.connectAllBlocks(wind_tunnel.blocks)
-
-            # add mesh to Wind-tunnel instance
-            wind_tunnel.mesh = vertices, connectivity
-
-            # generate cell to edge connectivity from mesh
-            wind_tunnel.makeLCE()
-
-            # generate cell to edge connectivity from mesh
-            wind_tunnel.makeLCE()
-
-            # generate boundaries from mesh connectivity
-            wind_tunnel.makeBoundaries()
+                # connect mesh blocks
+                connect = Connect.Connect(None)
+                interfaces = wind_tunnel.blockInterfaces(wind_tunnel.blocks)
+                vertices, connectivity, node_ids = connect.connectAllBlocks(
+                    wind_tunnel.blocks, interfaces=interfaces)
+
+                # add mesh to Wind-tunnel instance
+                wind_tunnel.mesh = vertices, connectivity
+                if dtype:
+                    wind_tunnel.makeCompact(dtype=dtype)
+
+                # generate cell to edge connectivity from mesh
+                wind_tunnel.makeLCE()
+
+                # generate cell to cell connectivity from mesh
+                wind_tunnel.makeLCC()
+
+                # generate boundaries from the block sides
+                wind_tunnel.makeBoundariesBlocks(node_ids)
+
+                if adaptation:
+                    cells, static_cells = adaptation.report(wind_tunnel)['mesh']
+                    message = (f'Adaptive clustering: static distributions '
+                               f'need {static_cells} instead of {cells} cells '
+                               f'for the same accuracy')
+                    print(message)
+                    logger.info(message)
 
             message = f'Finished batch meshing for airfoil {airfoil}'
             print(message)
             logger.info(message)
 
+            if budget:
+                cells = Farfield.Farfield.cells(wind_tunnel)
+                message = (f'Cell budget {budget}: {predicted["cells"]} cells '
+                           f'predicted, {cells} cells meshed')
+                print(message)
+                logger.info(message)
+
+            if tolerance:
+                # cells of the same mesh with the windtunnel of the user
+                cells = Farfield.Farfield.cells(wind_tunnel,
+                                                tam['Divisions of tunnel height'],
+                                                twm['Divisions in the wake'])
+                saved = cells - Farfield.Farfield.cells(wind_tunnel)
+                message = (f'Farfield sizing saved {saved} of {cells} cells '
+                           f'({100.0 * saved / cells:.1f}%)')
+                print(message)
+                logger.info(message)
+
             # export mesh
             message = f'Starting mesh export for airfoil {airfoil}'
             print(message)
             logger.info(message)
 
+            # rotated meshes for a polar, written one after the other
+            angles = self.batch_control.get('Angles of attack', [])
+            if angles:
+                if topology == 'C-grid' and hierarchy:
+                    base = hierarchy.levels[hierarchy.generated]
+                else:
+                    base = wind_tunnel
+                series = AngleOfAttack.AngleOfAttack(base)
+                names = series.export(os.path.join(mesh_path, basename),
+                                      angles, formats=output_formats)
+                for mesh_name in names:
+                    message = f'Finished mesh export for airfoil {airfoil} to {mesh_name}'
+                    print(message)
+                    logger.info(message)
+
+            # hexahedra in spanwise layers, written one layer at a time
+            extrusion = self.batch_control.get('Spanwise extrusion', {})
+            layers = extrusion.get('Layers', 0)
+            if layers:
+                if topology == 'C-grid' and hierarchy:
+                    base = hierarchy.levels[hierarchy.generated]
+                else:
+                    base = wind_tunnel
+                extruded = Extrusion.Extrusion(base, layers=layers,
+                                               depth=extrusion.get('Depth', 0.3),
+                                               ratio=extrusion.get('Ratio', 1.0),
+                                               periodic=extrusion.get('Periodic', 'no') == 'yes')
+                names = extruded.export(os.path.join(mesh_path, basename),
+                                        formats=output_formats)
+                for mesh_name in names:
+                    message = f'Finished mesh export for airfoil {airfoil} to {mesh_name}'
+                    print(message)
+                    logger.info(message)
+
+            if topology == 'C-grid' and hierarchy:
+                # all levels in one go, file names end with the level
+                names = hierarchy.export(os.path.join(mesh_path, basename),
+                                         formats=output_formats)
+                for mesh_name in names:
+                    message = f'Finished mesh export for airfoil {airfoil} to {mesh_name}'
+                    print(message)
+                    logger.info(message)
+                continue
+
+            # triangles or second order quadrilaterals for the 2D mesh
+            element_type = self.batch_control.get('Element type', 'quad')
+            converted = ElementTypes.convert(wind_tunnel, element_type)
+
             for output_format in output_formats:
-                extension = {'FLMA': '.flma',
-                             'SU2': '.su2',
-                             'GMSH': '.msh',
-                             'VTK': '.vtk',
-                             'CGNS': '.cgns',
-                             'ABAQUS': '.inp',
-                             'OBJ': '.obj'}
-                mesh_name = os.path.join(mesh_path, basename + extension[output_format])
-                getattr(Meshing.BlockMesh, 'write'+output_format)(wind_tunnel, name=mesh_name)
+                if not ElementTypes.supported(output_format, element_type):
+                    message = f'No {output_format} export of {element_type} elements'
+                    print(message)
+                    logger.info(message)
+                    continue
+                writer, extension = Meshing.WRITERS[output_format]
+                mesh_name = os.path.join(mesh_path, basename + extension)
+                getattr(Meshing.BlockMesh, writer)(converted, name=mesh_name)
 
                 message = f'Finished mesh export for airfoil {airfoil} to {mesh_name}'
                 print(message)
@@ -0,0 +1,203 @@
+"""
+Cell budget of the mesh from the numbers of divisions
+
+The shapes of the blocks follow from the numbers of divisions only (see
+Windtunnel.AirfoilMesh, TrailingEdgeMesh, TunnelMesh, TunnelMeshWake and
+CGridMesh), so the counts of the mesh are known before any geometry is
+built. The number of boundary edges is counted along the block
+boundaries and the number of nodes follows from the Euler formula of a
+quadrilateral mesh with one hole (the airfoil):
+
+    nodes = cells + boundary edges / 2
+
+The number of contour points after SplineRefine.doSplineRefine is the
+number of spline points plus the points inserted by the curvature
+refinement and at the trailing edge. Only the curvature refinement
+depends on the airfoil shape, it is measured once from a refined
+contour (see refinements).
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# settings which are scaled to meet a cell budget
+SETTINGS = ('points', 'divisions', 'divisions_te', 'te_divisions',
+            'divisions_height', 'divisions_wake')
+
+# largest factor by which the settings are scaled
+MAX_FACTOR = 1.e6
+
+
+def contour_points(points=150, ref_te=3, ref_te_n=6, refinements=0):
+    """Number of contour points after SplineRefine.doSplineRefine
+
+    Args:
+        points (int, optional): Number of points on the spline
+        ref_te (int, optional): Trailing edge points which are replaced
+            (on each side)
+        ref_te_n (int, optional): Divisions of the new trailing edge
+            points (on each side)
+        refinements (int, optional): Points inserted by the curvature
+            refinement
+
+    Returns:
+        int: Number of contour points
+    """
+    return points + refinements + 2 * (ref_te_n - ref_te)
+
+
+def refinements(contour, points=150, ref_te=3, ref_te_n=6):
+    """Points inserted by the curvature refinement of a refined contour
+
+    Args:
+        contour (tuple): x and y coordinates made by
+            SplineRefine.doSplineRefine with the other arguments
+
+    Returns:
+        int: Number of inserted points
+    """
+    return len(contour[0]) - contour_points(points, ref_te, ref_te_n)
+
+
+class CellBudget:
+
+    def __init__(self, topology='multi-block', has_te=False, ref_te=3,
+                 ref_te_n=6, refinements=0):
+        """
+        Args:
+            topology (str, optional): 'multi-block' or 'C-grid'
+            has_te (bool, optional): Blunt trailing edge
+            ref_te (int, optional): See contour_points
+            ref_te_n (int, optional): See contour_points
+            refinements (int, optional): See contour_points
+
+        Raises:
+            ValueError: If the topology is unknown
+        """
+        if topology not in ('multi-block', 'C-grid'):
+            raise ValueError('Unknown mesh topology {}.'.format(topology))
+
+        self.topology = topology
+        self.has_te = has_te
+        self.ref_te = ref_te
+        self.ref_te_n = ref_te_n
+        self.refinements = refinements
+
+    def counts(self, points=150, divisions=15, divisions_te=15,
+               te_divisions=3, divisions_height=100, divisions_wake=100):
+        """Dry run: counts of the mesh without building it
+
+        Args:
+            points (int, optional): Number of points on the spline
+            divisions (int, optional): Layers of the airfoil block (near
+                wall layers of the C-grid)
+            divisions_te (int, optional): Divisions downstream of the
+                trailing edge block (multi-block only)
+            te_divisions (int, optional): Divisions of a blunt trailing
+                edge
+            divisions_height (int, optional): Divisions of the tunnel
+                height
+            divisions_wake (int, optional): Divisions of the wake
+
+        Returns:
+            dict: Number of nodes, cells, boundary edges and the boundary
+                edges on airfoil, outlet and the rest of the windtunnel
+                boundary (farfield)
+        """
+        n = contour_points(points, self.ref_te, self.ref_te_n,
+                           self.refinements)
+        d, dh, dw = divisions, divisions_height, divisions_wake
+
+        if self.topology == 'C-grid':
+            # C-grid: wake cut, trailing edge base halves and contour
+            base = max(1, (te_divisions + 1) // 2) if self.has_te else 0
+            nu = 2 * dw + n + 2 * base
+            cells = (nu - 1) * (d + dh)
+            airfoil = n - 1 + 2 * base
+            outlet = 2 * (d + dh)
+            farfield = nu - 1
+        else:
+            # multi-block: airfoil, trailing edge, tunnel and wake block
+            k = te_divisions if self.has_te else 0
+            dt = divisions_te
+            cells = (d * (n - 1) + (2 * d + k) * dt +
+                     (2 * dt + n - 1) * dh + (2 * dh + 2 * d + k) * dw)
+            airfoil = n - 1 + k
+            outlet = 2 * dh + 2 * d + k
+            farfield = 2 * dt + n - 1 + 2 * dw
+
+        boundary_edges = airfoil + outlet + farfield
+
+        return {'nodes': cells + boundary_edges // 2,
+                'cells': cells,
+                'boundary_edges': boundary_edges,
+                'airfoil': airfoil,
+                'outlet': outlet,
+                'farfield': farfield}
+
+    def plan(self, budget, settings, scale=SETTINGS, tolerance=1.e-6):
+        """Scale the divisions so that the mesh meets a cell budget
+
+        All settings in scale are multiplied by the same factor and
+        rounded. The largest factor whose mesh does not exceed the
+        budget is found by bisection (the cell count grows with the
+        factor).
+
+        Args:
+            budget (int): Largest number of cells
+            settings (dict): Arguments of counts
+            scale (tuple, optional): Settings which are scaled, the
+                others are kept
+            tolerance (float, optional): Tolerance of the factor
+
+        Returns:
+            tuple: Scaled settings and their counts
+
+        Raises:
+            ValueError: If a setting in scale is unknown or missing in
+                settings, if the budget is smaller than the coarsest mesh
+                or if scaling does not reach the budget
+        """
+        unknown = [name for name in scale
+                   if name not in SETTINGS or name not in settings]
+        if unknown:
+            raise ValueError('Settings {} cannot be scaled.'.format(
+                ', '.join(unknown)))
+
+        def scaled(factor):
+            new = dict(settings)
+            for name in scale:
+                new[name] = max(1, int(round(factor * new[name])))
+            return new
+
+        def cells(factor):
+            return self.counts(**scaled(factor))['cells']
+
+        low, high = 0.0, 1.0
+        if cells(low) > budget:
+            raise ValueError('Cell budget {} is smaller than the coarsest '
+                             'mesh with {} cells.'.format(budget, cells(low)))
+        while cells(high) <= budget:
+            if cells(2.0 * high) == cells(high) or high > MAX_FACTOR:
+                raise ValueError('Scaling {} does not reach the cell '
+                                 'budget {}.'.format(', '.join(scale),
+                                                     budget))
+            low, high = high, 2.0 * high
+
+        while high - low > tolerance * high:
+            middle = 0.5 * (low + high)
+            if cells(middle) <= budget:
+                low = middle
+            else:
+                high = middle
+
+        new = scaled(low)
+        counts = self.counts(**new)
+
+        logger.info('Cell budget {}: divisions scaled by {:.3f} give {} '
+                    'cells, {} nodes and {} boundary edges'.
+                    format(budget, low, counts['cells'], counts['nodes'],
+                           counts['boundary_edges']))
+
+        return new, counts
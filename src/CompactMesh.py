@@ -0,0 +1,96 @@
+import numpy as np
+
+import Adjacency
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CompactMesh:
+    """Mesh stored in contiguous arrays
+
+    Drop-in replacement for the (vertices, connectivity) tuple of
+    Windtunnel.mesh, unpacking works the same way:
+
+        vertices, connectivity = mesh
+
+    Coordinates are float64 or float32, connectivity and edge tables are
+    int32. The edge table lists each edge only once (sorted vertex
+    numbers), the cell to edge table refers to rows of the edge table.
+    """
+
+    __slots__ = ('vertices', 'connectivity', 'edges', 'cell_edges',
+                 'quality', 'adjacency')
+
+    def __init__(self, vertices, connectivity, dtype=np.float64):
+        """
+        Args:
+            vertices (list or np.array): Vertex coordinates (x, y)
+            connectivity (list or np.array): Vertex numbers of each cell
+            dtype (np.dtype, optional): np.float64 or np.float32 for the
+                vertex coordinates
+        """
+        self.vertices = np.ascontiguousarray(vertices, dtype=dtype)
+        self.connectivity = np.ascontiguousarray(connectivity,
+                                                 dtype=np.int32)
+        self.edges = None
+        self.cell_edges = None
+        self.quality = None
+        self.adjacency = None
+
+    def __iter__(self):
+        yield self.vertices
+        yield self.connectivity
+
+    def __getitem__(self, index):
+        return (self.vertices, self.connectivity)[index]
+
+    @property
+    def nbytes(self):
+        """Memory used by all arrays of the mesh in bytes"""
+        arrays = (self.vertices, self.connectivity, self.edges,
+                  self.cell_edges, self.quality)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def getAdjacency(self, adjacency=None):
+        """The given adjacency tables, else the ones kept by the mesh"""
+        if adjacency is not None:
+            return adjacency
+        if self.adjacency is None:
+            self.adjacency = Adjacency.Adjacency(self)
+        return self.adjacency
+
+    def makeEdges(self, adjacency=None):
+        """Make the edge table and the cell to edge table
+
+        The tables are the int32 edge tables of Adjacency (edge j of a
+        cell runs from vertex j to vertex j + 1 of the cell).
+
+        Args:
+            adjacency (Adjacency.Adjacency, optional): Tables of this
+                mesh, e.g. from Windtunnel.getAdjacency (see getAdjacency)
+
+        Returns:
+            tuple: edges (array of shape (nedges, 2)) and cell to edge
+                table (array of shape (ncells, vertices per cell))
+        """
+        adjacency = self.getAdjacency(adjacency)
+        edges, cell_edges = adjacency.edgeTable()
+        self.edges = edges.astype(np.int32, copy=False)
+        self.cell_edges = cell_edges.astype(np.int32, copy=False)
+
+        return self.edges, self.cell_edges
+
+    def boundaryEdges(self, adjacency=None):
+        """Edges which belong to only one cell
+
+        Args:
+            adjacency (Adjacency.Adjacency, optional): Tables of this
+                mesh, see makeEdges
+
+        Returns:
+            np.array: Boundary edges of shape (nboundary, 2), in the
+                order of the cells
+        """
+        adjacency = self.getAdjacency(adjacency)
+        return adjacency.boundaryEdges().astype(np.int32, copy=False)
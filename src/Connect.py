@@ -2,7 +2,8 @@ import os
 import copy
 
 import numpy as np
-from scipy import spatial
+from scipy import sparse, spatial
+from scipy.sparse import csgraph
 
 from PySide6 import QtCore, QtGui
 
@@ -13,6 +14,8 @@ import GraphicsItem
 class Connect:
     """docstring"""
 
+    SIDES = ('first_uline', 'last_uline', 'first_vline', 'last_vline')
+
     def __init__(self, progdialog):
 
         # get MainWindow instance (overcomes handling parents)
@@ -30,26 +33,26 @@ class Connect:
             list: list of point tuples
                   # [(x1, y1), (x2, y2), (x3, y3), ... , (xn, yn)]
         """
-        vertices = list()
-        for uline in block.getULines():
-            vertices += uline
-        return vertices
+        vertices = block.getULinesArray().reshape(-1, 2).tolist()
+        return list(map(tuple, vertices))
 
-    def getConnectivity(self, block):
+    def getConnectivity(self, block, shift=0):
+        """Cell connectivity of a BlockMesh object
 
-        connectivity = list()
+        The cells run along the v-lines (u outer, v inner), the nodes of
+        a cell are (p1, p1 + nu, p1 + nu + 1, p1 + 1) with p1 = v nu + u.
 
-        U, V = block.getDivUV()
-        up = U + 1
-        for u in range(U):
-            for v in range(V):
-                p1 = v * up + u
-                p2 = p1 + up
-                p3 = p2 + 1
-                p4 = p1 + 1
-                connectivity.append((p1, p2, p3, p4))
+        Args:
+            block (BlockMesh): BlockMesh object
+            shift (int, optional): Number of the first node of the block
 
-        return connectivity
+        Returns:
+            np.array: Vertex numbers of shape (ncells, 4), int32
+        """
+        U, V = block.getDivUV()
+        node_ids = np.arange(shift, shift + (V + 1) * (U + 1),
+                             dtype=np.int32).reshape(V + 1, U + 1)
+        return self.cellsFromNodeIds(node_ids)
 
     def getMinMaxConnectivityIDs(self, connectivity):
         id_min = 1e10
@@ -103,102 +106,281 @@ class Connect:
         return vertex_and_neighbours
 
     def shiftConnectivity(self, connectivity, shift):
+        """Connectivity with all vertex numbers increased by shift"""
+        return np.asarray(connectivity) + shift
 
-        if shift == 0:
-            return connectivity
+    @staticmethod
+    def blockNodeIds(nodes):
+        """Numbers of the nodes of all blocks, block after block
 
-        connectivity_shifted = list()
-        for cell in connectivity:
-            new_cell = [vertex + shift for vertex in cell]
-            connectivity_shifted.append(new_cell)
+        Args:
+            nodes (list): Node arrays of shape (nv, nu, 2)
+
+        Returns:
+            list: Node numbers of each block, shape (nv, nu)
+        """
+        sizes = [len(block_nodes) * len(block_nodes[0])
+                 for block_nodes in nodes]
+        offsets = np.cumsum([0] + sizes)
+        return [offset + np.arange(size).reshape(block_nodes.shape[:2])
+                for offset, size, block_nodes in zip(offsets, sizes, nodes)]
+
+    @staticmethod
+    def shortestEdges(nodes):
+        """Length of the shortest edge at each node of a block
+
+        Edges of zero length (collapsed block sides) are ignored.
+
+        Args:
+            nodes (np.array): Nodes of shape (nv, nu, 2)
+
+        Returns:
+            np.array: Lengths of shape (nv, nu), inf at nodes without
+                edges of finite length
+        """
+        shortest = np.full(nodes.shape[:2], np.inf)
+        for axis in (0, 1):
+            length = np.linalg.norm(np.diff(nodes, axis=axis), axis=2)
+            length[length == 0.0] = np.inf
+            lower = [slice(None), slice(None)]
+            upper = [slice(None), slice(None)]
+            lower[axis] = slice(None, -1)
+            upper[axis] = slice(1, None)
+            np.minimum(shortest[tuple(lower)], length,
+                       out=shortest[tuple(lower)])
+            np.minimum(shortest[tuple(upper)], length,
+                       out=shortest[tuple(upper)])
+        return shortest
+
+    @staticmethod
+    def blockSide(nodes, side):
+        """Nodes (or node numbers) on one side of a block
+
+        Args:
+            nodes (np.array): Array of shape (nv, nu, ...)
+            side (str): One of SIDES
+
+        Returns:
+            np.array: View of the side
+        """
+        sides = {'first_uline': (0, slice(None)),
+                 'last_uline': (-1, slice(None)),
+                 'first_vline': (slice(None), 0),
+                 'last_vline': (slice(None), -1)}
+        return nodes[sides[side]]
+
+    @staticmethod
+    def cellsFromNodeIds(node_ids):
+        """Connectivity of a block from the vertex number of each node
+
+        Same cell order and orientation as in getConnectivity.
+
+        Args:
+            node_ids (np.array): Vertex numbers of shape (nv, nu)
+
+        Returns:
+            np.array: Connectivity of shape (ncells, 4)
+        """
+        return np.stack((node_ids[:-1, :-1].T,
+                         node_ids[1:, :-1].T,
+                         node_ids[1:, 1:].T,
+                         node_ids[:-1, 1:].T), axis=-1).reshape(-1, 4)
 
-        return connectivity_shifted
+    def connectBlocks(self, blocks, interfaces, tolerance=1.e-6):
+        """Vertices and connectivity from declared block interfaces
 
-    def connectAllBlocks(self, blocks):
+        Works by index arithmetic only. An interface is a pair of index
+        ranges on block sides which are the same nodes:
 
-        # compile global vertex list and cell connectivity from all blocks
-        vertices = list()
-        connectivity = list()
+            ((block, side, index range), (block, side, index range))
 
-        for i, block in enumerate(blocks):
+        with the block number in blocks, the side (see blockSide) and a
+        slice along the side (a negative step reverses it). Nodes which
+        are connected through several interfaces (corners) get the same
+        vertex. Each vertex is numbered like the first of its nodes in
+        the blocks, so the result is the same as in connectAllBlocks.
 
-            # accumulated number of vertices
-            # for i = 0 shift is automatically 0
-            # so the connectivity of the first block doesn't get shifted
-            # thus, this variable must be set before 'vertices += ...'
-            shift = len(vertices)
+        Args:
+            blocks (list): BlockMesh objects
+            interfaces (list): Declared interfaces
+            tolerance (float, optional): Largest distance of the nodes
+                of an interface
+
+        Returns:
+            tuple: vertices (list of point tuples), connectivity (array
+                of shape (ncells, 4)) and the vertex number of each
+                block node (list of arrays of shape (nv, nu))
+
+        Raises:
+            ValueError: If the index ranges of an interface have a
+                different length or the nodes do not coincide
+        """
+        nodes = [block.getULinesArray() for block in blocks]
+        node_ids = self.blockNodeIds(nodes)
+        coordinates = np.concatenate([block_nodes.reshape(-1, 2)
+                                      for block_nodes in nodes])
+
+        first, second = list(), list()
+        for one, other in interfaces:
+            ids = [self.blockSide(node_ids[block], side)[index_range]
+                   for block, side, index_range in (one, other)]
+            if len(ids[0]) != len(ids[1]):
+                raise ValueError('Interface {} <-> {} connects {} to {} '
+                                 'nodes.'.format(one, other, len(ids[0]),
+                                                 len(ids[1])))
+            first.append(ids[0])
+            second.append(ids[1])
+        first = np.concatenate(first)
+        second = np.concatenate(second)
+
+        distance = np.linalg.norm(coordinates[first] - coordinates[second],
+                                  axis=1)
+        if len(distance) and distance.max() > tolerance:
+            raise ValueError('Nodes of a block interface are {:.3e} apart.'.
+                             format(distance.max()))
+
+        # smallest node number of each group of connected nodes
+        representative = np.arange(len(coordinates))
+        while True:
+            lowest = np.minimum(representative[first],
+                                representative[second])
+            if np.array_equal(lowest, representative[first]) and \
+                    np.array_equal(lowest, representative[second]):
+                break
+            np.minimum.at(representative, first, lowest)
+            np.minimum.at(representative, second, lowest)
+
+        return self.numberVertices(coordinates, node_ids, representative)
+
+    def numberVertices(self, coordinates, node_ids, representative):
+        """Vertices and connectivity from the merged nodes of all blocks
+
+        Args:
+            coordinates (np.array): Nodes of all blocks, shape (n, 2)
+            node_ids (list): Node numbers of each block, see blockNodeIds
+            representative (np.array): Smallest node number of the group
+                of coincident nodes of each node
 
-            # concatenate vertices of all blocks
-            # vertices += [vertex for vertex in self.getVertices(block)]
-            vertices += self.getVertices(block)
+        Returns:
+            tuple: vertices (list of point tuples), connectivity (array
+                of shape (ncells, 4)) and the vertex number of each
+                block node (list of arrays of shape (nv, nu))
+        """
+        # contiguous numbering of the remaining nodes
+        used, vertex_ids = np.unique(representative, return_inverse=True)
+        vertices = list(map(tuple, coordinates[used].tolist()))
 
-            # shift the block connectivity by accumulated number of vertices
-            # from all blocks before this one
-            connectivity_block = \
-                self.shiftConnectivity(self.getConnectivity(block), shift)
-            connectivity += [tuple(cell) for cell in connectivity_block]
+        block_vertex_ids = [vertex_ids[block_ids] for block_ids in node_ids]
+        connectivity = np.concatenate(
+            [self.cellsFromNodeIds(block_ids)
+             for block_ids in block_vertex_ids])
+
+        if self.progdialog:
+            self.progdialog.setValue(90)
+
+        return (vertices, connectivity, block_vertex_ids)
+
+    def connectAllBlocks(self, blocks, interfaces=None,
+                         relative_tolerance=1.e-3):
+        """Vertices and connectivity of all blocks
+
+        With declared interfaces the blocks are connected by index
+        arithmetic (see connectBlocks). Otherwise coincident nodes on
+        the sides of arbitrary blocks are found geometrically (KD-tree).
+        Two nodes coincide if they are closer than the relative
+        tolerance times the shortest edge at either node, so the merge
+        works for fine and coarse meshes alike. Groups of coincident
+        nodes get the vertex number of their first node.
+
+        Args:
+            blocks (list): BlockMesh objects
+            interfaces (list, optional): See connectBlocks
+            relative_tolerance (float, optional): Merge distance relative
+                to the local edge length
+
+        Returns:
+            tuple: vertices (list of point tuples), connectivity (array
+                of shape (ncells, 4)) and the vertex number of each
+                block node (list of arrays of shape (nv, nu))
+        """
+        if interfaces is not None:
+            return self.connectBlocks(blocks, interfaces)
+
+        nodes = [block.getULinesArray() for block in blocks]
+        node_ids = self.blockNodeIds(nodes)
+        coordinates = np.concatenate([block_nodes.reshape(-1, 2)
+                                      for block_nodes in nodes])
 
         if self.progdialog:
             self.progdialog.setValue(80)
 
-        # FIXME
-        # FIXME for some reason tuples need to be redefined
-        # FIXME
-        vertices = [(vertex[0], vertex[1]) for vertex in vertices]
-
-        # search vertices of all blocks against themselves
-        # finds itself AND multiple connections (i.e. vertices from neighbour blocks)
-        # uses Scipy kd-tree for quick nearest-neighbor lookup
-        # the distance tolerance is specified via the radius variable
-        vertex_and_neighbours = self.getNearestNeighbours(vertices,
-                                                          vertices,
-                                                          radius=1.e-6)
-
-        # substitute vertex ids in connectivity at block connections
-        connectivity_connected = list()
-        for cell in connectivity:
-            cell_new = list()
-            for node in cell:
-                # if there is only one vertex in vertex_and_neighbours,
-                # then it is taken as it is
-                # if there is more than one vertex,
-                # then the minimum vertex index is used
-                # so a few vertices remain unused and need to be removed later
-                node_new = min(vertex_and_neighbours[node])
-                cell_new.append(node_new)
-            connectivity_connected.append(cell_new)
-
-        # use numpy arrays
-        unconnected = np.array(connectivity)
-        connected = np.array(connectivity_connected)
-
-        # deleted nodes
-        deleted_nodes = np.unique(unconnected[np.where(connected != unconnected)])
-
-        # delete unused vertices
-        vertices_clean = [v for i,v in enumerate(vertices)
-                        if i not in sorted(deleted_nodes.tolist())]
-
-        # find remaining node ids
-        remaining_nodes = np.setdiff1d(np.unique(connected), deleted_nodes)
-
-        # replace node ids so that a contiguous numbering is established
-        # divakar, method 3 (https://stackoverflow.com/a/55950051/2264936)
-        mapping = {rn:i for i, rn in enumerate(remaining_nodes)}
-        k = np.array(list(mapping.keys()))
-        v = np.array(list(mapping.values()))
-        mapping_ar = np.zeros(k.max()+1,dtype=v.dtype)
-        mapping_ar[k] = v
-        connectivity_clean = mapping_ar[connected]
+        # only nodes on the block sides can meet nodes of other blocks
+        candidates = np.unique(np.concatenate(
+            [self.blockSide(block_ids, side) for block_ids in node_ids
+             for side in self.SIDES]))
+        shortest = np.concatenate([self.shortestEdges(block_nodes).ravel()
+                                   for block_nodes in nodes])[candidates]
+        tolerance = relative_tolerance * shortest
+
+        # all pairs within the largest tolerance in one query, then only
+        # those pairs which are closer than the tolerance of both nodes
+        tree = spatial.cKDTree(coordinates[candidates])
+        pairs = tree.query_pairs(tolerance.max(), p=2., eps=0,
+                                 output_type='ndarray')
+        first, second = pairs.T
+        distance = np.linalg.norm(tree.data[first] - tree.data[second],
+                                  axis=1)
+        close = distance <= np.minimum(tolerance[first], tolerance[second])
+        first, second = first[close], second[close]
+
+        # groups of coincident nodes (also chains of pairs)
+        graph = sparse.coo_matrix(
+            (np.ones(len(first), dtype=bool), (first, second)),
+            shape=(len(candidates), len(candidates)))
+        _, groups = csgraph.connected_components(graph, directed=False)
+
+        # smallest node number of each group
+        lowest = np.full(groups.max() + 1, len(coordinates))
+        np.minimum.at(lowest, groups, candidates)
+        representative = np.arange(len(coordinates))
+        representative[candidates] = lowest[groups]
+
+        return self.numberVertices(coordinates, node_ids, representative)
+
+    def connectCGrid(self, block, cut):
+        """Vertices and connectivity of a single block C-grid
+
+        Works by index arithmetic only. The nodes on the lower side of
+        the wake cut are replaced by the nodes on the upper side.
+
+        Args:
+            block (BlockMesh): C-grid block (see Windtunnel.CGridMesh)
+            cut (int): Number of nodes on each side of the wake cut,
+                node (i, 0) and node (nu - 1 - i, 0) are the same
+                vertex for i < cut
+
+        Returns:
+            tuple: vertices (list of point tuples), connectivity
+                (array of shape (ncells, 4)) and the vertex number of
+                each block node (array of shape (nv, nu))
+        """
+        nodes = block.getULinesArray()
+        nv, nu = nodes.shape[:2]
+
+        node_ids = np.arange(nv * nu).reshape(nv, nu)
+        node_ids[0, nu - cut:] = node_ids[0, :cut][::-1]
+
+        # contiguous numbering of the remaining nodes
+        used, node_ids = np.unique(node_ids, return_inverse=True)
+        node_ids = node_ids.reshape(nv, nu)
+        vertices = list(map(tuple, nodes.reshape(-1, 2)[used].tolist()))
+
+        connectivity = self.cellsFromNodeIds(node_ids)
 
         if self.progdialog:
             self.progdialog.setValue(90)
 
-        # DEBUGGING
-        # self.write_debug(unconnected, connected, deleted_nodes, vertices, vertices_clean, connectivity_clean)
-        # self.draw_connectivity(vertices, deleted_nodes)
-
-        return (vertices_clean, connectivity_clean, self.progdialog)
+        return vertices, connectivity, node_ids
 
     def draw_connectivity(self, vertices, deleted_nodes):
 
@@ -0,0 +1,185 @@
+"""
+Element types of the mesh (triangles and second order quadrilaterals)
+
+The mesh generation makes linear quadrilaterals. The functions here
+transform the connectivity array in a few array operations:
+
+    - 'tri': each quadrilateral is split into two triangles along its
+      shorter diagonal
+    - 'quad8': a node is added at the middle of each edge
+    - 'quad9': additionally a node is added at the center of each cell
+
+The mid-edge nodes are shared by the adjacent cells. Their numbers come
+from a sorted table of the unique edges (see edge_table). The node
+order of the second order cells is the same in GMSH and VTK: corners,
+mid-edge nodes of the edges 0-1, 1-2, 2-3, 3-0, center.
+"""
+
+import copy
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+ELEMENT_TYPES = ('quad', 'tri', 'quad8', 'quad9')
+
+# output formats which do not support all element types
+FORMATS = {'FLMA': ('quad',),
+           'SU2': ('quad', 'tri')}
+
+
+def supported(output_format, element_type):
+    """True if the writer of the output format can write the element type"""
+    return element_type in FORMATS.get(output_format, ELEMENT_TYPES)
+
+
+def edge_table(connectivity, number_of_vertices):
+    """Unique edges of the cells
+
+    Edge j of a cell runs from vertex j to vertex j + 1 of the cell.
+    Each edge is identified by an integer key made from its sorted
+    vertex numbers.
+
+    Args:
+        connectivity (np.array): Vertex numbers of shape (ncells, 4)
+        number_of_vertices (int): Number of vertices of the mesh
+
+    Returns:
+        tuple: Sorted keys of the unique edges and the edge number of
+            each cell edge, shape (ncells, 4)
+    """
+    start = connectivity.ravel()
+    end = np.roll(connectivity, -1, axis=1).ravel()
+    keys = edge_keys(start, end, number_of_vertices)
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys, inverse.reshape(connectivity.shape)
+
+
+def edge_keys(start, end, number_of_vertices):
+    """Integer keys of edges, independent of their direction"""
+    keys = np.minimum(start, end).astype(np.int64)
+    keys *= number_of_vertices
+    keys += np.maximum(start, end)
+    return keys
+
+
+def split_quads(vertices, connectivity):
+    """Split each quadrilateral into two triangles
+
+    The quadrilateral is cut along its shorter diagonal. The triangles
+    keep the orientation of the quadrilateral, triangles 2 i and 2 i + 1
+    come from cell i.
+
+    Args:
+        vertices (np.array): Vertex coordinates of shape (n, 2)
+        connectivity (np.array): Vertex numbers of shape (ncells, 4)
+
+    Returns:
+        np.array: Vertex numbers of the triangles, shape (2 ncells, 3)
+    """
+    cells = np.asarray(connectivity)
+    corners = np.asarray(vertices)[cells]
+
+    diagonal_02 = np.linalg.norm(corners[:, 2] - corners[:, 0], axis=1)
+    diagonal_13 = np.linalg.norm(corners[:, 3] - corners[:, 1], axis=1)
+    short = (diagonal_02 <= diagonal_13)[:, np.newaxis]
+
+    triangles = np.empty((2 * len(cells), 3), dtype=cells.dtype)
+    triangles[0::2] = np.where(short, cells[:, [0, 1, 2]],
+                               cells[:, [1, 2, 3]])
+    triangles[1::2] = np.where(short, cells[:, [0, 2, 3]],
+                               cells[:, [1, 3, 0]])
+
+    return triangles
+
+
+def promote_quads(vertices, connectivity, boundary_tags=None, nodes=8):
+    """Second order quadrilaterals with 8 or 9 nodes
+
+    The new nodes lie at the middle of the straight edges (and at the
+    mean of the corners for 9 nodes). Boundary edges get their mid-edge
+    node as third node.
+
+    Args:
+        vertices (np.array): Vertex coordinates of shape (n, 2)
+        connectivity (np.array): Vertex numbers of shape (ncells, 4)
+        boundary_tags (dict, optional): Boundary name -> edges
+        nodes (int, optional): 8 or 9
+
+    Returns:
+        tuple: Vertices, connectivity of shape (ncells, nodes) and
+            boundary tags with edges of three nodes
+
+    Raises:
+        ValueError: If nodes is not 8 or 9
+    """
+    if nodes not in (8, 9):
+        raise ValueError('Quadrilaterals have 8 or 9 nodes, not {}.'.
+                         format(nodes))
+
+    vertices = np.asarray(vertices, dtype=float)
+    cells = np.asarray(connectivity)
+    n = len(vertices)
+
+    keys, cell_edges = edge_table(cells, n)
+    middle = 0.5 * (vertices[keys // n] + vertices[keys % n])
+
+    new_vertices = [vertices, middle]
+    new_cells = [cells, n + cell_edges.astype(cells.dtype)]
+    if nodes == 9:
+        new_vertices.append(vertices[cells].mean(axis=1))
+        new_cells.append(n + len(keys) +
+                         np.arange(len(cells), dtype=cells.dtype)[:, np.newaxis])
+
+    new_tags = dict()
+    for name, edges in (boundary_tags or {}).items():
+        edges = np.array(edges, dtype=cells.dtype).reshape(-1, 2)
+        ids = np.searchsorted(keys, edge_keys(edges[:, 0], edges[:, 1], n))
+        new_tags[name] = np.column_stack((edges, n + ids))
+
+    return (np.concatenate(new_vertices), np.hstack(new_cells), new_tags)
+
+
+def convert(wind_tunnel, element_type='quad'):
+    """Windtunnel with the mesh in another element type
+
+    The result is a shallow copy of the windtunnel, so it can be passed
+    to the mesh writers. The original mesh is not changed.
+
+    Args:
+        wind_tunnel (Windtunnel): Instance with mesh and boundary tags
+        element_type (str, optional): One of ELEMENT_TYPES
+
+    Returns:
+        Windtunnel: The same instance for 'quad', else a copy
+
+    Raises:
+        ValueError: If the element type is unknown
+    """
+    if element_type not in ELEMENT_TYPES:
+        raise ValueError('Unknown element type {}.'.format(element_type))
+
+    if element_type == 'quad':
+        return wind_tunnel
+
+    vertices, connectivity = wind_tunnel.mesh
+    vertices = np.asarray(vertices, dtype=float)
+    connectivity = np.asarray(connectivity)
+
+    converted = copy.copy(wind_tunnel)
+
+    if element_type == 'tri':
+        connectivity = split_quads(vertices, connectivity)
+    else:
+        vertices, connectivity, converted.boundary_tags = \
+            promote_quads(vertices, connectivity,
+                          boundary_tags=wind_tunnel.boundary_tags,
+                          nodes=int(element_type[-1]))
+
+    converted.mesh = vertices, connectivity
+
+    logger.info('Mesh converted to {}: {} vertices and {} elements'.
+                format(element_type, len(vertices), len(connectivity)))
+
+    return converted
@@ -41,28 +41,7 @@ class Elliptic:
 
     @staticmethod
     def curveNormals(x, y, closed=False):
-        istart = 0
-        iend = 0
-        n = list()
-
-        for i, _ in enumerate(x):
-
-            if closed:
-                if i == len(x) - 1:
-                    iend = -i - 1
-            else:
-                if i == 0:
-                    istart = 1
-                if i == len(x) - 1:
-                    iend = -1
-
-            a = np.array([x[i + 1 + iend] - x[i - 1 + istart],
-                          y[i + 1 + iend] - y[i - 1 + istart]])
-            e = Utils.unit_vector(a)
-            n.append([e[1], -e[0]])
-            istart = 0
-            iend = 0
-        return np.array(n)
+        return Utils.curve_normals(x, y, closed=closed)
 
     def smooth(self, iterations=10, tolerance=1e-3, bnd_type=None, verbose=False):
 
@@ -73,10 +52,11 @@ class Elliptic:
 
         # calculate normals at boundaries
         # used for Neumann boundary conditions
-        normals_left = self.curveNormals(self.xn[0, :], self.yn[0, :])
-        normals_right = self.curveNormals(self.xn[-1, :], self.yn[-1, :])
-        normals_top = self.curveNormals(self.xn[:, -1], self.yn[:, -1])
-        normals_bottom = self.curveNormals(self.xn[:, 0], self.yn[:, 0])
+        # (left/right and top/bottom boundaries each as batch of two curves)
+        normals_left, normals_right = \
+            self.curveNormals(self.xn[[0, -1], :], self.yn[[0, -1], :])
+        normals_top, normals_bottom = \
+            self.curveNormals(self.xn[:, [-1, 0]].T, self.yn[:, [-1, 0]].T)
 
         for iteration in range(iterations):
 
@@ -0,0 +1,307 @@
+"""
+Spanwise extrusion of the 2D mesh into layers of hexahedra
+
+Each vertex of the 2D mesh becomes a column of vertices, one per plane
+in spanwise (z) direction, and each cell becomes one hexahedron per
+layer. Vertex v of plane p has the number p * n + v (n vertices of the
+2D mesh), so all numbers follow from index arithmetic.
+
+Vertices, hexahedra and boundary faces are made one plane or layer at a
+time (generators) and the writers stream them to the file. Only the 2D
+mesh is kept in memory, also for many layers of a large mesh.
+
+The boundary faces of the 2D boundary edges keep their tags. The two
+end planes are tagged 'symmetry', or 'periodic_1' (z minimum) and
+'periodic_2' (z maximum) for spanwise periodic boundaries. Face i of
+'periodic_1' is the translation of face i of 'periodic_2' (vertex v
+pairs with vertex layers * n + v).
+
+The 2D writers (BlockMesh.write*_nolib) take the whole mesh of a
+Windtunnel and write it cell by cell, also triangles and second order
+cells. The extruded mesh is never held in memory, so it has its own
+writers for the chunks of the generators. Both share the section
+headers, the tag numbering and the log message (MeshFiles).
+"""
+
+import numpy as np
+
+import Spacing
+import MeshFiles
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Extrusion:
+
+    # output format -> writer method and file extension
+    WRITERS = {'SU2': ('writeSU2', '.su2'),
+               'GMSH': ('writeGMSH', '.msh'),
+               'VTK': ('writeVTK', '.vtu')}
+
+    def __init__(self, wind_tunnel, layers=1, depth=0.3, ratio=1.0,
+                 z=None, periodic=False):
+        """
+        Args:
+            wind_tunnel (Windtunnel): Instance with mesh and boundary tags
+            layers (int, optional): Number of cell layers
+            depth (float, optional): Spanwise depth, centered at z = 0
+            ratio (float, optional): Ratio of last to first layer
+                thickness (1 is uniform)
+            z (np.array, optional): Coordinates of the planes, replaces
+                layers, depth and ratio
+            periodic (bool, optional): Tag the end planes as periodic
+                pair instead of symmetry
+
+        Raises:
+            ValueError: If the mesh has cells which are not quadrilaterals
+        """
+        vertices, connectivity = wind_tunnel.mesh
+        self.vertices = np.asarray(vertices, dtype=float)
+
+        cells = np.array(connectivity)
+        if cells.ndim != 2 or cells.shape[1] != 4:
+            raise ValueError('Only quadrilateral cells can be extruded.')
+
+        # the base face of a hexahedron needs to be counterclockwise
+        x, y = self.vertices[cells].transpose(2, 0, 1)
+        area = np.sum(x * np.roll(y, -1, axis=1) -
+                      np.roll(x, -1, axis=1) * y, axis=1)
+        cells[area < 0.0] = cells[area < 0.0, ::-1]
+        self.cells = cells
+
+        self.edges = {name: np.array(edges, dtype=cells.dtype).reshape(-1, 2)
+                      for name, edges in wind_tunnel.boundary_tags.items()}
+
+        if z is None:
+            z = Spacing.geometric(divisions=layers, ratio=ratio,
+                                  length=depth) - 0.5 * depth
+        self.z = np.asarray(z, dtype=float)
+        self.layers = len(self.z) - 1
+        self.periodic = periodic
+
+    @property
+    def number_of_vertices(self):
+        return len(self.vertices) * (self.layers + 1)
+
+    @property
+    def number_of_cells(self):
+        return len(self.cells) * self.layers
+
+    def tags(self):
+        """Names of the boundary face selections"""
+        ends = ['periodic_1', 'periodic_2'] if self.periodic else \
+            ['symmetry']
+        return list(self.edges) + ends
+
+    def numberOfFaces(self, tag):
+        """Number of boundary faces of a tag"""
+        if tag in self.edges:
+            return len(self.edges[tag]) * self.layers
+        if tag == 'symmetry':
+            return 2 * len(self.cells)
+        return len(self.cells)
+
+    def planes(self):
+        """Vertex coordinates, one plane at a time
+
+        Yields:
+            np.array: Coordinates of shape (n, 3)
+        """
+        plane = np.empty((len(self.vertices), 3))
+        plane[:, :2] = self.vertices
+        for z in self.z:
+            plane[:, 2] = z
+            yield plane
+
+    def hexahedra(self):
+        """Vertex numbers of the hexahedra, one layer at a time
+
+        The first four vertices are the base face (lower z), the other
+        four lie above them.
+
+        Yields:
+            np.array: Vertex numbers of shape (ncells, 8)
+        """
+        n = len(self.vertices)
+        for layer in range(self.layers):
+            base = self.cells + layer * n
+            yield np.hstack((base, base + n))
+
+    def faces(self, tag):
+        """Vertex numbers of the boundary faces of a tag, in chunks
+
+        Yields:
+            np.array: Vertex numbers of shape (nfaces, 4)
+        """
+        n = len(self.vertices)
+
+        if tag in self.edges:
+            edges = self.edges[tag]
+            for layer in range(self.layers):
+                lower = edges + layer * n
+                yield np.hstack((lower, lower[:, ::-1] + n))
+            return
+
+        # end planes, the faces point out of the mesh
+        if tag in ('symmetry', 'periodic_1'):
+            yield self.cells[:, ::-1]
+        if tag in ('symmetry', 'periodic_2'):
+            yield self.cells + self.layers * n
+
+    def writeSU2(self, name=''):
+        """Write the extruded mesh in SU2 format"""
+        with open(name, 'w') as f:
+            MeshFiles.su2_section(f, 'Problem dimension', 'NDIME', 3)
+
+            MeshFiles.su2_section(f, 'Node coordinates', 'NPOIN',
+                                  self.number_of_vertices)
+            number = 0
+            for plane in self.planes():
+                ids = np.arange(number, number + len(plane))
+                np.savetxt(f, np.column_stack((plane, ids)),
+                           fmt='% .8e % .8e % .8e %d')
+                number += len(plane)
+
+            MeshFiles.su2_section(f, 'Element connectivity', 'NELEM',
+                                  self.number_of_cells)
+            number = 0
+            for hexahedra in self.hexahedra():
+                ids = np.arange(number, number + len(hexahedra))
+                types = np.full(len(hexahedra), 12)
+                np.savetxt(f, np.column_stack((types, hexahedra, ids)),
+                           fmt='%d')
+                number += len(hexahedra)
+
+            # quadrilateral faces
+            MeshFiles.su2_markers(f, self.tags(), self.numberOfFaces,
+                                  self.faces, 9)
+
+        MeshFiles.log_saved('SU2 type 3D mesh', name)
+
+    def writeGMSH(self, name=''):
+        """Write the extruded mesh in GMSH 2.2 format"""
+        tags = self.tags()
+
+        with open(name, 'w') as f:
+            physical, domain = MeshFiles.gmsh_header(f, tags, 3)
+
+            f.write('$Nodes\n')
+            f.write(f'{self.number_of_vertices}\n')
+            number = 1
+            for plane in self.planes():
+                ids = np.arange(number, number + len(plane))
+                np.savetxt(f, np.column_stack((ids, plane)),
+                           fmt='%d % .8e % .8e % .8e')
+                number += len(plane)
+            f.write('$EndNodes\n')
+
+            # boundary faces (quadrangles) first, then the hexahedra
+            elements = sum(self.numberOfFaces(tag) for tag in tags) + \
+                self.number_of_cells
+            f.write('$Elements\n')
+            f.write(f'{elements}\n')
+            number = 1
+            for tag in tags:
+                for faces in self.faces(tag):
+                    number = MeshFiles.gmsh_elements(f, number, 3,
+                                                     physical[tag], faces)
+            for hexahedra in self.hexahedra():
+                number = MeshFiles.gmsh_elements(f, number, 5, domain,
+                                                 hexahedra)
+            f.write('$EndElements\n')
+
+        MeshFiles.log_saved('GMSH type 3D mesh', name)
+
+    def writeVTK(self, name=''):
+        """Write the extruded mesh as VTU file (UnstructuredGrid)
+
+        The boundary faces are quadrilateral cells with the number of
+        their tag (starting at 1) as cell data BoundaryID, the
+        hexahedra have BoundaryID 0.
+        """
+        tags = self.tags()
+        boundary_ids, _ = MeshFiles.tag_numbers(tags)
+        faces = sum(self.numberOfFaces(tag) for tag in tags)
+        cells = self.number_of_cells + faces
+
+        def chunks():
+            # (VTK cell type, number of vertices, BoundaryID, vertices)
+            for hexahedra in self.hexahedra():
+                yield 12, 8, 0, hexahedra
+            for tag in tags:
+                for quads in self.faces(tag):
+                    yield 9, 4, boundary_ids[tag], quads
+
+        with open(name, 'w') as f:
+            MeshFiles.vtk_header(f, self.number_of_vertices, cells)
+
+            f.write('      <CellData Scalars="BoundaryID">\n')
+            f.write('        <DataArray type="Int32" Name="BoundaryID" '
+                    'format="ascii">\n')
+            for _, _, boundary, nodes in chunks():
+                np.savetxt(f, np.full((1, len(nodes)), boundary), fmt='%d')
+            f.write('        </DataArray>\n')
+            f.write('      </CellData>\n')
+
+            f.write('      <Points>\n')
+            f.write('        <DataArray type="Float64" '
+                    'NumberOfComponents="3" format="ascii">\n')
+            for plane in self.planes():
+                np.savetxt(f, plane, fmt='%.10g')
+            f.write('        </DataArray>\n')
+            f.write('      </Points>\n')
+
+            f.write('      <Cells>\n')
+            f.write('        <DataArray type="Int32" Name="connectivity" '
+                    'format="ascii">\n')
+            for _, _, _, nodes in chunks():
+                np.savetxt(f, nodes, fmt='%d')
+            f.write('        </DataArray>\n')
+
+            f.write('        <DataArray type="Int32" Name="offsets" '
+                    'format="ascii">\n')
+            offset = 0
+            for _, size, _, nodes in chunks():
+                offsets = offset + size * np.arange(1, len(nodes) + 1)
+                np.savetxt(f, offsets[np.newaxis], fmt='%d')
+                offset = offsets[-1]
+            f.write('        </DataArray>\n')
+
+            f.write('        <DataArray type="UInt8" Name="types" '
+                    'format="ascii">\n')
+            for cell_type, _, _, nodes in chunks():
+                np.savetxt(f, np.full((1, len(nodes)), cell_type), fmt='%d')
+            f.write('        </DataArray>\n')
+            f.write('      </Cells>\n')
+
+            MeshFiles.vtk_footer(f)
+
+        MeshFiles.log_saved('VTK type 3D mesh', name)
+
+    def export(self, basename, formats=('SU2',)):
+        """Write the extruded mesh in several formats
+
+        Args:
+            basename (str): Path and file name without extension, '_3D'
+                is appended
+            formats (list, optional): Output formats, see WRITERS
+
+        Returns:
+            list: Names of the written files
+        """
+        names = list()
+        for output_format in formats:
+            if output_format not in self.WRITERS:
+                logger.info('No 3D writer for {} meshes'.
+                            format(output_format))
+                continue
+            writer, extension = self.WRITERS[output_format]
+            name = '{}_3D{}'.format(basename, extension)
+            getattr(self, writer)(name=name)
+            names.append(name)
+
+        logger.info('Mesh extruded to {} layers ({} hexahedra)'.
+                    format(self.layers, self.number_of_cells))
+
+        return names
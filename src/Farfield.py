@@ -0,0 +1,344 @@
+"""
+Windtunnel size from the far field of a panel solution
+
+Flow solvers usually impose the free stream, corrected by a point
+vortex with the circulation of the airfoil, at the windtunnel boundary.
+The remaining error is mainly the doublet part of the flow around the
+airfoil, which decays with the square of the distance. The source-vortex
+panel method (SvpMethod) is solved once and its velocity field is
+compared with the point vortex model on the windtunnel boundary. The
+smallest windtunnel height and wake length where the error stays below
+a tolerance are found with Brent's method.
+"""
+
+import numpy as np
+from scipy import optimize
+
+import SvpMethod
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Farfield:
+
+    def __init__(self, contour, u_inf=1.0, alpha=0.0, npanel=60,
+                 center=(0.25, 0.0), order=8):
+        """
+        Args:
+            contour (tuple): x and y coordinates of the airfoil contour
+            u_inf (float, optional): Free stream velocity
+            alpha (float, optional): Angle of attack in degrees
+            npanel (int, optional): Number of panels
+            center (tuple, optional): Position of the point vortex
+            order (int, optional): Number of Gauss points per panel for
+                the velocity field
+        """
+        x, y = (np.asarray(coordinate, dtype=float)
+                for coordinate in contour)
+
+        panels = SvpMethod.define_panels(x, y, npanel)
+        self.freestream = SvpMethod.Freestream(u_inf, alpha)
+
+        A = SvpMethod.build_matrix(panels)
+        b = SvpMethod.build_rhs(panels, self.freestream)
+        variables = np.linalg.solve(A, b)
+
+        self.start = np.array([(p.xa, p.ya) for p in panels])
+        self.end = np.array([(p.xb, p.yb) for p in panels])
+        self.lengths = np.array([p.length for p in panels])
+        self.sigma = variables[:-1]
+        self.gamma = variables[-1]
+
+        # circulation, positive clockwise like the vortex sheet
+        self.circulation = self.gamma * np.sum(self.lengths)
+        self.center = np.asarray(center, dtype=float)
+
+        self.gauss = np.polynomial.legendre.leggauss(order)
+
+    def velocity(self, points, chunk=2048):
+        """Velocity of the panel solution
+
+        Args:
+            points (np.array): Coordinates of shape (n, 2), not close
+                to the airfoil
+            chunk (int, optional): Number of points processed at once
+
+        Returns:
+            np.array: Velocities of shape (n, 2)
+        """
+        points = np.asarray(points, dtype=float)
+
+        # Gauss points on all panels, shape (panels, order, 2)
+        t, weights = self.gauss
+        t = 0.5 * (t + 1.0)
+        sources = self.start[:, np.newaxis] + t[:, np.newaxis] * \
+            (self.end - self.start)[:, np.newaxis]
+        weights = 0.5 * weights * self.lengths[:, np.newaxis]
+
+        velocity = np.empty_like(points)
+        for start in range(0, len(points), chunk):
+            d = points[start:start + chunk, np.newaxis, np.newaxis] - sources
+            kernel = weights / np.sum(d**2, axis=-1)
+
+            # integrals of (x - xs) / r^2 and (y - ys) / r^2 over each panel
+            ix = np.sum(kernel * d[..., 0], axis=-1)
+            iy = np.sum(kernel * d[..., 1], axis=-1)
+
+            velocity[start:start + chunk, 0] = \
+                ix.dot(self.sigma) + self.gamma * np.sum(iy, axis=-1)
+            velocity[start:start + chunk, 1] = \
+                iy.dot(self.sigma) - self.gamma * np.sum(ix, axis=-1)
+
+        alpha = self.freestream.alpha
+        u_inf = self.freestream.u_inf
+        velocity /= 2.0 * np.pi
+        velocity += u_inf * np.array([np.cos(alpha), np.sin(alpha)])
+
+        return velocity
+
+    def gradient(self, points, step=1.e-4):
+        """Magnitude of the velocity gradient of the panel solution
+
+        Args:
+            points (np.array): Coordinates of shape (n, 2)
+            step (float, optional): Step of the central differences
+
+        Returns:
+            np.array: Frobenius norm of the velocity gradient tensor
+        """
+        points = np.asarray(points, dtype=float)
+        shifts = step * np.array([[1.0, 0.0], [-1.0, 0.0],
+                                  [0.0, 1.0], [0.0, -1.0]])
+
+        velocity = self.velocity((points[:, np.newaxis] + shifts).
+                                 reshape(-1, 2)).reshape(-1, 4, 2)
+        dx = (velocity[:, 0] - velocity[:, 1]) / (2.0 * step)
+        dy = (velocity[:, 2] - velocity[:, 3]) / (2.0 * step)
+
+        return np.sqrt(np.sum(dx**2 + dy**2, axis=-1))
+
+    def pointVortex(self, points):
+        """Velocity of free stream and point vortex
+
+        Args:
+            points (np.array): Coordinates of shape (n, 2)
+
+        Returns:
+            np.array: Velocities of shape (n, 2)
+        """
+        d = np.asarray(points, dtype=float) - self.center
+        r2 = np.sum(d**2, axis=-1)
+        velocity = self.circulation / (2.0 * np.pi) * \
+            np.stack((d[:, 1], -d[:, 0]), axis=-1) / r2[:, np.newaxis]
+
+        alpha = self.freestream.alpha
+        u_inf = self.freestream.u_inf
+        velocity += u_inf * np.array([np.cos(alpha), np.sin(alpha)])
+
+        return velocity
+
+    def error(self, points):
+        """Error of the point vortex model relative to the free stream
+
+        Args:
+            points (np.array): Coordinates of shape (n, 2)
+
+        Returns:
+            float: Largest velocity difference divided by u_inf
+        """
+        difference = self.velocity(points) - self.pointVortex(points)
+        return np.linalg.norm(difference, axis=-1).max() / \
+            self.freestream.u_inf
+
+    @staticmethod
+    def boundary(tunnel_height, tunnel_wake, chord=1.0, number=200):
+        """Points on the windtunnel boundary (see Windtunnel.TunnelMesh)
+
+        Args:
+            tunnel_height (float): Windtunnel height
+            tunnel_wake (float): Windtunnel wake length behind the
+                trailing edge
+            chord (float, optional): Chord length
+            number (int, optional): Number of points per part
+
+        Returns:
+            tuple: Points on inlet (half circle and upper and lower
+                line) and outlet
+        """
+        height, end = tunnel_height, chord + tunnel_wake
+
+        phi = np.radians(np.linspace(90.0, 270.0, number))
+        x = np.linspace(0.0, end, number)
+        inlet = np.concatenate((
+            height * np.stack((np.cos(phi), np.sin(phi)), axis=-1),
+            np.stack((x, np.full(number, height)), axis=-1),
+            np.stack((x, np.full(number, -height)), axis=-1)))
+
+        y = np.linspace(-height, height, number)
+        outlet = np.stack((np.full(number, end), y), axis=-1)
+
+        return inlet, outlet
+
+    def size(self, tolerance, tunnel_height=3.5, tunnel_wake=7.0,
+             minimum=1.5, maximum=100.0, decimals=1):
+        """Smallest windtunnel where the point vortex error is small enough
+
+        The height is searched first (with the given wake length), then
+        the wake length for this height. Both are rounded up to the
+        given number of decimals (like the spin boxes of the toolbox).
+
+        Args:
+            tolerance (float): Largest velocity error relative to u_inf
+            tunnel_height (float, optional): Windtunnel height to start
+                from, e.g. the default of the user
+            tunnel_wake (float, optional): Windtunnel wake to start from
+            minimum (float, optional): Smallest height and wake length
+            maximum (float, optional): Largest height and wake length
+            decimals (int, optional): Number of decimals of the result
+
+        Returns:
+            tuple: Windtunnel height and wake length
+        """
+        def inlet_error(height):
+            inlet, _ = self.boundary(height, tunnel_wake)
+            return self.error(inlet) - tolerance
+
+        def outlet_error(wake):
+            _, outlet = self.boundary(height, wake)
+            return self.error(outlet) - tolerance
+
+        def smallest(residual):
+            if residual(minimum) <= 0.0:
+                return minimum
+            if residual(maximum) > 0.0:
+                logger.warning('Farfield error tolerance {} can not be met '
+                               'up to {} chords'.format(tolerance, maximum))
+                return maximum
+            value = optimize.brentq(residual, minimum, maximum,
+                                    rtol=1.e-4)
+            return float(np.ceil(value * 10**decimals) / 10**decimals)
+
+        height = smallest(inlet_error)
+        wake = smallest(outlet_error)
+
+        return height, wake
+
+    @staticmethod
+    def divisions(length, new_length, divisions=100, ratio=10.0):
+        """Divisions of a shorter or longer line with the same spacing
+
+        First cell size and growth rate of the geometric distribution
+        (see Spacing.geometric) stay the same, only the number of cells
+        changes.
+
+        Args:
+            length (float): Length of the line
+            new_length (float): New length of the line
+            divisions (int, optional): Number of subdivisions of the line
+            ratio (float, optional): Ratio of last to first subdivision
+
+        Returns:
+            tuple: Number of subdivisions and ratio for the new length
+        """
+        if divisions == 1 or ratio == 1.0:
+            new = max(1, int(np.ceil(divisions * new_length / length)))
+            return new, ratio
+
+        growth = ratio**(1.0 / (divisions - 1.0))
+        first = length * (growth - 1.0) / (growth**divisions - 1.0)
+        new = np.log(1.0 + new_length * (growth - 1.0) / first) / \
+            np.log(growth)
+        new = max(1, int(np.ceil(new - 1.e-9)))
+
+        return new, growth**(new - 1.0)
+
+    def settings(self, tolerance, tunnel_height=3.5, divisions_height=100,
+                 ratio_height=10.0, tunnel_wake=7.0, divisions_wake=100,
+                 ratio_wake=15.0):
+        """Windtunnel settings for a far field error tolerance
+
+        Height and wake length are sized (see size), the divisions are
+        adapted so that the cells near the airfoil stay the same.
+
+        Args:
+            tolerance (float): Largest velocity error relative to u_inf
+            tunnel_height (float, optional): Windtunnel height set by
+                the user
+            divisions_height (int, optional): Divisions of tunnel height
+            ratio_height (float, optional): Cell thickness ratio
+            tunnel_wake (float, optional): Windtunnel wake set by the user
+            divisions_wake (int, optional): Divisions in the wake
+            ratio_wake (float, optional): Cell thickness ratio in the wake
+
+        Returns:
+            dict: Keyword arguments for TunnelMesh, TunnelMeshWake and
+                CGridMesh (tunnel_height, divisions_height, ratio_height,
+                tunnel_wake, divisions_wake, ratio_wake)
+        """
+        height, wake = self.size(tolerance, tunnel_height=tunnel_height,
+                                 tunnel_wake=tunnel_wake)
+
+        new_height, new_ratio_height = self.divisions(
+            tunnel_height, height, divisions_height, ratio_height)
+        new_wake, new_ratio_wake = self.divisions(
+            tunnel_wake, wake, divisions_wake, ratio_wake)
+
+        logger.info('Farfield sizing for error tolerance {}: windtunnel '
+                    'height {} -> {}, wake {} -> {} chords'.
+                    format(tolerance, tunnel_height, height,
+                           tunnel_wake, wake))
+
+        return {'tunnel_height': height,
+                'divisions_height': new_height,
+                'ratio_height': new_ratio_height,
+                'tunnel_wake': wake,
+                'divisions_wake': new_wake,
+                'ratio_wake': new_ratio_wake}
+
+    @staticmethod
+    def cells(wind_tunnel, divisions_height=None, divisions_wake=None):
+        """Number of cells of a mesh made with other far field divisions
+
+        Used to report the cells saved by the sizing. All other settings
+        (airfoil and trailing edge blocks) are the same as for the mesh.
+
+        Args:
+            wind_tunnel (Windtunnel): Instance with multi-block or C-grid
+                blocks
+            divisions_height (int, optional): Divisions of tunnel height,
+                default is the one of the mesh
+            divisions_wake (int, optional): Divisions in the wake, default
+                is the one of the mesh
+
+        Returns:
+            int: Number of cells
+        """
+        if hasattr(wind_tunnel, 'block_cgrid'):
+            nv, nu = wind_tunnel.block_cgrid.getULinesArray().shape[:2]
+            layers = wind_tunnel.cgrid_breaks[1][1]
+            wake = wind_tunnel.cgrid_cut - 1
+            if divisions_height is None:
+                divisions_height = nv - 1 - layers
+            if divisions_wake is None:
+                divisions_wake = wake
+            return (nu - 1 - 2 * wake + 2 * divisions_wake) * \
+                (layers + divisions_height)
+
+        height = len(wind_tunnel.block_tunnel.getULinesArray()) - 1
+        if divisions_height is None:
+            divisions_height = height
+
+        cells = 0
+        for block in wind_tunnel.blocks:
+            nv, nu = block.getULinesArray().shape[:2]
+            if block is wind_tunnel.block_tunnel:
+                nv = divisions_height + 1
+            elif block is wind_tunnel.block_tunnel_wake:
+                # rows: both tunnel vlines and the trailing edge
+                nv += 2 * (divisions_height - height)
+                if divisions_wake is not None:
+                    nu = divisions_wake + 1
+            cells += (nv - 1) * (nu - 1)
+
+        return cells
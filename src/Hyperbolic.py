@@ -0,0 +1,145 @@
+import numpy as np
+from scipy import linalg
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Hyperbolic:
+    """Hyperbolic grid generation by marching away from a curve
+
+    Each new grid line (layer) is found from the previous one by solving
+    the linearized orthogonality and cell area (volume) conditions
+
+        x_xi * x_eta + y_xi * y_eta = 0
+        x_xi * y_eta - y_xi * x_eta = dV
+
+    implicitly over the whole line (Steger and Chaussee, 1980; Chan and
+    Steger, 1992). The 2x2 block tridiagonal system of one layer is solved
+    as a banded system. Second order dissipation in the xi direction keeps
+    the marching stable, smoothing of the cell areas (volume control)
+    avoids folding of grid lines in concave regions.
+    """
+
+    def __init__(self, line):
+        """
+        Args:
+            line (list or np.array): Points (x, y) of the initial curve,
+                i.e. the first grid line
+        """
+        self.line = np.asarray(line, dtype=float)
+
+    def march(self, spacing, dissipation=1.0, volume_smoothing=0.3):
+        """March all layers of the grid
+
+        The cell heights are taken from the spacing. The grid lines start
+        along the curve normals (Utils.curve_normals convention), so the
+        result is comparable to an extrusion along the normals.
+
+        Args:
+            spacing (np.array): Distances of the layers from the curve,
+                starting with 0.0 for the curve itself
+            dissipation (float, optional): Coefficient of the second order
+                dissipation in the xi direction
+            volume_smoothing (float, optional): Weight (0 ... 0.5) of the
+                averaging of the cell areas with their neighbours
+
+        Returns:
+            np.array: Grid nodes of shape (len(spacing), len(line), 2)
+        """
+        heights = np.diff(spacing)
+
+        nodes = np.empty((len(spacing),) + self.line.shape)
+        nodes[0] = self.line
+
+        for k, height in enumerate(heights):
+            smoothing = volume_smoothing if k > 0 else 0.0
+            nodes[k + 1] = self.layer(nodes[k], height,
+                                      dissipation=dissipation,
+                                      volume_smoothing=smoothing)
+
+        return nodes
+
+    @staticmethod
+    def layer(r, height, dissipation=1.0, volume_smoothing=0.3):
+        """Compute the next grid line from the current one
+
+        Args:
+            r (np.array): Current grid line of shape (n, 2)
+            height (float): Nominal distance of the next grid line
+            dissipation (float, optional): Coefficient of the second order
+                dissipation in the xi direction
+            volume_smoothing (float, optional): Weight (0 ... 0.5) of the
+                averaging of the cell areas with their neighbours
+
+        Returns:
+            np.array: Next grid line of shape (n, 2)
+        """
+        n = len(r)
+
+        # metrics of the current line (one sided at both ends)
+        r_xi = np.gradient(r, axis=0)
+        x_xi, y_xi = r_xi[:, 0], r_xi[:, 1]
+        g11 = x_xi**2 + y_xi**2
+
+        ds = np.sqrt(g11)
+        normals = np.stack((y_xi, -x_xi), axis=-1) / ds[:, np.newaxis]
+
+        # prescribed cell areas (trapezoids between the line and its
+        # offset along the normals), smoothed with the neighbours
+        stretch = np.sum(np.gradient(normals, axis=0) * r_xi, axis=-1) / g11
+        stretch = np.maximum(1.0 + 0.5 * height * stretch, 0.5)
+        dv = height * ds * stretch
+        dv[1:-1] = (1.0 - volume_smoothing) * dv[1:-1] + \
+            0.5 * volume_smoothing * (dv[:-2] + dv[2:])
+
+        # zeroth order marching direction, normal to the line
+        x_eta = dv / g11 * y_xi
+        y_eta = -dv / g11 * x_xi
+
+        # C = B^-1 * A (symmetric and trace free)
+        c11 = (x_xi * x_eta - y_xi * y_eta) / g11
+        c12 = (x_xi * y_eta + y_xi * x_eta) / g11
+        C = np.stack((np.stack((c11, c12), axis=-1),
+                      np.stack((c12, -c11), axis=-1)), axis=-2)
+
+        # dissipation scaled with the spectral radius of C
+        eps = dissipation * np.sqrt((x_eta**2 + y_eta**2) / g11)
+        eye = np.eye(2)
+
+        inner = np.arange(1, n - 1)
+        e = eps[inner, np.newaxis, np.newaxis]
+        lower = -0.5 * C[inner] - e * eye
+        diagonal = (1.0 + 2.0 * e) * eye
+        upper = 0.5 * C[inner] - e * eye
+
+        # both end points march along their normals (Dirichlet type)
+        ends = np.array([0, n - 1])
+
+        # banded storage of the interleaved (x0, y0, x1, y1, ...) system
+        ab = np.zeros((7, 2 * n))
+
+        def put(rows, cols, blocks):
+            for a in range(2):
+                for b in range(2):
+                    row = 2 * rows + a
+                    col = 2 * cols + b
+                    ab[3 + row - col, col] = blocks[:, a, b]
+
+        put(inner, inner - 1, lower)
+        put(inner, inner, diagonal)
+        put(inner, inner + 1, upper)
+        put(ends, ends, np.broadcast_to(eye, (2, 2, 2)))
+
+        # explicit dissipation, only normal to the line so that
+        # points do not slide along it
+        r_xixi = r[:-2] - 2.0 * r[1:-1] + r[2:]
+        r_xixi = np.sum(r_xixi * normals[inner], axis=-1)[:, np.newaxis] * \
+            normals[inner]
+
+        rhs = np.stack((x_eta, y_eta), axis=-1)
+        rhs[inner] += 0.5 * eps[inner, np.newaxis] * r_xixi
+
+        dr = linalg.solve_banded((3, 3), ab, rhs.ravel())
+
+        return r + dr.reshape(n, 2)
@@ -0,0 +1,146 @@
+"""
+Parts of the mesh file formats shared by the mesh writers
+
+The 2D writers (BlockMesh.write*_nolib) and the writers of the extruded
+3D mesh (Extrusion) write the same file formats from different data, so
+they share the section headers, the numbering of the boundary tags and
+the log message here:
+
+    - SU2: sections and boundary markers
+    - GMSH 2.2: mesh format, physical names and element lines
+    - VTK: header and footer of the UnstructuredGrid (VTU) file
+
+The boundary tags are numbered from 1 in the order of the tag names,
+the domain (cells) gets the number after the last tag.
+"""
+
+import os
+import numpy as np
+
+from Settings import OUTPUTDATA
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def tag_numbers(tags):
+    """Numbers of the boundary tags and of the domain
+
+    Args:
+        tags (iterable): Names of the boundary tags
+
+    Returns:
+        tuple: Dictionary tag name -> number (from 1) and number of the
+            domain
+    """
+    numbers = {tag: number + 1 for number, tag in enumerate(tags)}
+    return numbers, len(numbers) + 1
+
+
+def su2_section(f, title, keyword, number):
+    """Write the comment block and the size line of a SU2 section"""
+    f.write('%\n')
+    f.write('% ' + title + '\n')
+    f.write('%\n')
+    f.write(keyword + '= ' + str(number) + '\n')
+
+
+def su2_markers(f, tags, number_of_faces, faces, element_type):
+    """Write the boundary tags of a SU2 file
+
+    Args:
+        f (file): Open SU2 file
+        tags (list): Names of the boundary tags
+        number_of_faces (callable): Number of faces of a tag
+        faces (callable): Vertex numbers of the faces of a tag, an
+            iterable of arrays of shape (nfaces, vertices per face)
+        element_type (int): SU2 element type of the faces (3 line,
+            9 quadrilateral)
+    """
+    su2_section(f, 'Boundary tags', 'NMARK', len(tags))
+    for tag in tags:
+        f.write('MARKER_TAG= ' + tag + '\n')
+        f.write('MARKER_ELEMS= ' + str(number_of_faces(tag)) + '\n')
+        for chunk in faces(tag):
+            types = np.full(len(chunk), element_type)
+            np.savetxt(f, np.column_stack((types, chunk)), fmt='%d')
+
+
+def gmsh_header(f, tags, dimension):
+    """Write the mesh format and the physical names of a GMSH 2.2 file
+
+    Args:
+        f (file): Open GMSH file
+        tags (list): Names of the boundary tags
+        dimension (int): Dimension of the domain, the boundary tags have
+            one dimension less
+
+    Returns:
+        tuple: Physical number of each tag and of the domain, see
+            tag_numbers
+    """
+    numbers, domain = tag_numbers(tags)
+
+    f.write('$MeshFormat\n')
+    f.write('2.2 0 8\n')  # version 2.2, ASCII, size of double precision
+    f.write('$EndMeshFormat\n')
+
+    f.write('$PhysicalNames\n')
+    f.write(f'{domain}\n')
+    for tag, number in numbers.items():
+        f.write(f'{dimension - 1} {number} "{tag}"\n')
+    f.write(f'{dimension} {domain} "Domain"\n')
+    f.write('$EndPhysicalNames\n')
+
+    return numbers, domain
+
+
+def gmsh_elements(f, number, element_type, physical, nodes):
+    """Write element lines of one type and physical number
+
+    The geometrical tag is the physical number, vertices are numbered
+    from 1 in GMSH.
+
+    Args:
+        f (file): Open GMSH file
+        number (int): Number of the first element
+        element_type (int): GMSH element type
+        physical (int): Physical number of the elements
+        nodes (np.array): Vertex numbers (from 0) of shape (nelements,
+            vertices per element)
+
+    Returns:
+        int: Number of the next element
+    """
+    nodes = np.asarray(nodes)
+    if len(nodes) == 0:
+        return number
+    ids = np.arange(number, number + len(nodes))
+    head = np.array([element_type, 2, physical, physical])
+    np.savetxt(f, np.column_stack((
+        ids, np.broadcast_to(head, (len(nodes), 4)), nodes + 1)), fmt='%d')
+    return number + len(nodes)
+
+
+def vtk_header(f, number_of_points, number_of_cells):
+    """Write the start of a VTU file up to the piece"""
+    f.write('<?xml version="1.0"?>\n')
+    f.write('<VTKFile type="UnstructuredGrid" version="0.1" '
+            'byte_order="LittleEndian">\n')
+    f.write('  <UnstructuredGrid>\n')
+    f.write(f'    <Piece NumberOfPoints="{number_of_points}" '
+            f'NumberOfCells="{number_of_cells}">\n')
+
+
+def vtk_footer(f):
+    """Write the end of a VTU file after the piece"""
+    f.write('    </Piece>\n')
+    f.write('  </UnstructuredGrid>\n')
+    f.write('</VTKFile>\n')
+
+
+def log_saved(file_type, name):
+    """Log the file name of a written mesh in the output folder"""
+    basename = os.path.basename(name)
+    logger.info('{} saved as {}'.
+                format(file_type, os.path.join(OUTPUTDATA, basename)))
@@ -1,10 +1,8 @@
 
-import os
 import copy
 from datetime import date
 import locale
 import numpy as np
-from scipy import interpolate
 
 from PySide6 import QtGui, QtCore, QtWidgets
 
@@ -12,14 +10,28 @@ import PyAero
 import GraphicsItemsCollection as gic
 import GraphicsItem
 import Elliptic
+import Hyperbolic
 import Connect
+import Spacing
+import Stages
+import Morphing
+import Adaptation
+import Adjacency
+import MeshFiles
+from CompactMesh import CompactMesh
 from Smooth_angle_based import SmoothAngleBased
 from Utils import Utils
-from Settings import OUTPUTDATA
 import logging
 logger = logging.getLogger(__name__)
 
 
+# mesh writers (static methods of BlockMesh) and file extensions
+WRITERS = {'FLMA': ('writeFLMA', '.flma'),
+           'SU2': ('writeSU2_nolib', '.su2'),
+           'GMSH': ('writeGMSH_nolib', '.msh'),
+           'VTK': ('writeVTK_nolib', '.vtu')}
+
+
 class Windtunnel:
     """
     The Windtunnel class is responsible for generating a computational fluid dynamics (CFD) mesh 
@@ -38,7 +50,7 @@ class Windtunnel:
         self.mainwindow = QtCore.QCoreApplication.instance().mainwindow
 
     def AirfoilMesh(self, name='', contour=None, divisions=15, ratio=3.0,
-                    thickness=0.04):
+                    thickness=0.04, extrusion='normal'):
 
         # get airfoil contour coordinates
         x, y = contour
@@ -53,11 +65,18 @@ class Windtunnel:
 
         # self.block_airfoil.extrudeLine(line, length=thickness, direction=3,
         #                                divisions=divisions, ratio=ratio)
-        self.block_airfoil.extrudeLine_cell_thickness(line,
-                                                      cell_thickness=thickness,
-                                                      growth=ratio,
-                                                      divisions=divisions,
-                                                      direction=3)
+        if extrusion == 'hyperbolic':
+            self.block_airfoil.extrudeLineHyperbolic(line,
+                                                     cell_thickness=thickness,
+                                                     growth=ratio,
+                                                     divisions=divisions)
+        else:
+            self.block_airfoil.extrudeLine_cell_thickness(
+                line,
+                cell_thickness=thickness,
+                growth=ratio,
+                divisions=divisions,
+                direction=3)
 
         self.blocks.append(self.block_airfoil)
 
@@ -110,25 +129,41 @@ class Windtunnel:
                    ratio_height=10.0, dist='symmetric',
                    smoothing_algorithm='simple',
                    smoothing_iterations=10,
-                   smoothing_tolerance=1e-3):
+                   smoothing_tolerance=1e-3,
+                   blend_exponent=0.6,
+                   transfinite_start=30,
+                   transfinite_end=30,
+                   adaptation=None):
+        """Windtunnel block around airfoil and trailing edge blocks
+
+        Args:
+            blend_exponent (float, optional): Exponent of the blending
+                between the lines normal to the inner boundary (near
+                field) and the transfinite interpolation (far field)
+            transfinite_start (int, optional): Number of columns at the
+                start of the block re-interpolated after blending
+            transfinite_end (int, optional): Number of columns at the
+                end of the block re-interpolated after blending
+            adaptation (Adaptation, optional): Chooses the distribution
+                on the windtunnel boundary with the panel method solution
+        """
         block_tunnel = BlockMesh(name=name)
 
         self.tunnel_height = tunnel_height
 
         # line composed of trailing edge and airfoil meshes
-        line = self.block_te.getVLines()[-1]
-        line.reverse()
-        del line[-1]
-        line += self.block_airfoil.getULines()[-1]
-        del line[-1]
-        line += self.block_te.getVLines()[0]
+        te_vlines = self.block_te.getVLinesArray()
+        line = np.concatenate((te_vlines[-1][::-1][:-1],
+                               self.block_airfoil.getULinesArray()[-1][:-1],
+                               te_vlines[0]))
         block_tunnel.addLine(line)
 
         # line composed of upper, lower and front line segments
-        p1 = np.array((block_tunnel.getULines()[0][0][0], tunnel_height))
+        first_uline = block_tunnel.getULinesArray()[0]
+        p1 = np.array((first_uline[0][0], tunnel_height))
         p2 = np.array((0.0, tunnel_height))
         p3 = np.array((0.0, -tunnel_height))
-        p4 = np.array((block_tunnel.getULines()[0][-1][0], -tunnel_height))
+        p4 = np.array((first_uline[-1][0], -tunnel_height))
 
         # upper line of wind tunnel
         line = list()
@@ -137,6 +172,7 @@ class Windtunnel:
             p = p1 + t * vec
             line.append(p.tolist())
         del line[-1]
+        upper_end = len(line)
 
         # front half circle of wind tunnel
         for phi in np.linspace(90.0, 270.0, 200):
@@ -145,6 +181,7 @@ class Windtunnel:
             y = tunnel_height * np.sin(phir)
             line.append((x, y))
         del line[-1]
+        lower_start = len(line)
 
         # lower line of wind tunnel
         vec = p4 - p3
@@ -155,9 +192,7 @@ class Windtunnel:
         # make numpy array
         line = np.array(line)
 
-        # interpolate a spline through line
         # at this point "line" is the big "C" of the windtunnel until TE
-        tck, _ = interpolate.splprep(line.T, s=0, k=1)
 
         # point distribution on upper, front and lower part
         if dist == 'symmetric':
@@ -169,17 +204,27 @@ class Windtunnel:
         if dist == 'upper':
             ld = -1.5
             ud = 1.2
-        xx = np.linspace(ld, ud, len(block_tunnel.getULines()[0]))
-        t = (np.tanh(xx) + 1.0) / 2.0
+        if adaptation:
+            ld, ud = adaptation.tunnelDistribution(first_uline, line, ld, ud)
+        t = Spacing.tanh_two_sided(divisions=len(first_uline) - 1,
+                                   delta=ud - ld,
+                                   center=-ld / (ud - ld),
+                                   normalized=False)
+
+        # nodes of the big "C" on its upper and lower straight line
+        # (nodes before the first and from the second break)
+        u = Utils.arc_length_parameter(line)
+        self.tunnel_breaks = (int(np.searchsorted(t, u[upper_end], 'right')),
+                              int(np.searchsorted(t, u[lower_start], 'left')))
 
         # calculate new points on the big "C" according to t distribution
-        xs, ys = interpolate.splev(t, tck, der=0)
-        line = list(zip(xs.tolist(), ys.tolist()))
+        # (piecewise linear in arc length)
+        line = Utils.resample_polyline(line, t)
 
         block_tunnel.addLine(line)
 
-        p5 = np.array(block_tunnel.getULines()[0][0])
-        p6 = np.array(block_tunnel.getULines()[0][-1])
+        p5 = first_uline[0].copy()
+        p6 = first_uline[-1].copy()
 
         # first vline
         vline1 = BlockMesh.makeLine(p5, p1, divisions=divisions_height,
@@ -189,133 +234,137 @@ class Windtunnel:
         vline2 = BlockMesh.makeLine(p6, p4, divisions=divisions_height,
                                     ratio=ratio_height)
 
-        boundary = [block_tunnel.getULines()[0],
-                    block_tunnel.getULines()[-1],
+        boundary = [block_tunnel.getULinesArray()[0],
+                    block_tunnel.getULinesArray()[-1],
                     vline1,
                     vline2]
         block_tunnel.transfinite(boundary=boundary)
 
         # blending between normals (inner lines) and transfinite (outer lines)
-        ulines = list()
-        old_ulines = block_tunnel.getULines()
-
-        for j, uline in enumerate(block_tunnel.getULines()):
-
-            # skip first and last line
-            if j == 0 or j == len(block_tunnel.getULines()) - 1:
-                ulines.append(uline)
-                continue
-
-            line = list()
-            xo, yo = list(zip(*old_ulines[0]))
-            xo = np.array(xo)
-            yo = np.array(yo)
-            normals = BlockMesh.curveNormals(xo, yo)
+        block_tunnel.blendNormals(exponent=blend_exponent)
 
-            for i, point in enumerate(uline):
-
-                # skip first and last point
-                if i == 0 or i == len(uline) - 1:
-                    line.append(point)
-                    continue
+        # make transfinite interpolation from boundary lines
+        U, V = block_tunnel.getDivUV()
+        ij = [0, transfinite_start, 0, V]
+        block_tunnel.transfinite(ij=ij)
+        ij = [U - transfinite_end, U, 0, V]
+        block_tunnel.transfinite(ij=ij)
 
-                pt = np.array(old_ulines[j][i])
-                pto = np.array(old_ulines[0][i])
-                vec = pt - pto
-                # projection of vec into normal
-                dist = np.dot(vec, normals[i]) / np.linalg.norm(normals[i])
-                pn = pto + dist * normals[i]
-                v = float(j) / float(len(block_tunnel.getULines()))
-                exp = 0.6
-                pnew = (1.0 - v**exp) * pn + v**exp * pt
-                line.append((pnew.tolist()[0], pnew.tolist()[1]))
+        block_tunnel = self.smoothBlock(block_tunnel,
+                                        algorithm=smoothing_algorithm,
+                                        iterations=smoothing_iterations,
+                                        tolerance=smoothing_tolerance,
+                                        transfinite_start=transfinite_start,
+                                        transfinite_end=transfinite_end)
 
-            ulines.append(line)
+        self.block_tunnel = block_tunnel
+        self.blocks.append(block_tunnel)
 
-        block_tunnel = BlockMesh(name=name)
-        for uline in ulines:
-            block_tunnel.addLine(uline)
+    @staticmethod
+    def smoothBlock(block, algorithm='simple', iterations=10,
+                    tolerance=1e-3, transfinite_start=0, transfinite_end=0):
+        """Smooth the interior nodes of a block
 
-        # make transfinite interpolation from boundary lines
-        ij = [0, 30, 0, len(block_tunnel.getULines()) - 1]
-        block_tunnel.transfinite(ij=ij)
-        ij = [len(block_tunnel.getVLines()) - 31,
-              len(block_tunnel.getVLines()) - 1,
-              0,
-              len(block_tunnel.getULines()) - 1]
-        block_tunnel.transfinite(ij=ij)
+        Args:
+            block (BlockMesh): Block to be smoothed
+            algorithm (str, optional): 'simple', 'elliptic' or 'angle_based'
+            iterations (int, optional): Smoothing iterations (elliptic and
+                angle based smoothing)
+            tolerance (float, optional): Smoothing tolerance (elliptic and
+                angle based smoothing)
+            transfinite_start (int, optional): Number of columns at the
+                start of the block which get extra smoothing ('simple')
+            transfinite_end (int, optional): Number of columns at the
+                end of the block which get extra smoothing ('simple')
 
+        Returns:
+            BlockMesh: The smoothed block
+        """
         # FIXME:
         # FIXME: refactoring needed here (put smoother in blockmesh class)
-        # FIXME: and refactor complete meshing functions
         # FIXME:
 
-        if smoothing_algorithm == 'simple':
+        U, V = block.getDivUV()
+
+        if algorithm == 'simple':
             # FIXME:
             # FIXME: this can be improved
             # FIXME: and at least documented
             # FIXME:
-            smooth = Smooth(block_tunnel)
+            smooth = Smooth(block)
 
             nodes = smooth.selectNodes(domain='interior')
-            block_tunnel = smooth.smooth(nodes, iterations=1,
-                                         algorithm='laplace')
-            ij = [1, 30, 1, len(block_tunnel.getULines()) - 2]
-            nodes = smooth.selectNodes(domain='ij', ij=ij)
-            block_tunnel = smooth.smooth(nodes, iterations=2,
-                                         algorithm='laplace')
-            ij = [len(block_tunnel.getVLines()) - 31,
-                  len(block_tunnel.getVLines()) - 2,
-                  1,
-                  len(block_tunnel.getULines()) - 2]
-            nodes = smooth.selectNodes(domain='ij', ij=ij)
-            block_tunnel = smooth.smooth(nodes, iterations=3,
-                                         algorithm='laplace')
-
-        elif smoothing_algorithm == 'elliptic':
+            block = smooth.smooth(nodes, iterations=1, algorithm='laplace')
+            if transfinite_start:
+                ij = [1, transfinite_start, 1, V - 1]
+                nodes = smooth.selectNodes(domain='ij', ij=ij)
+                block = smooth.smooth(nodes, iterations=2,
+                                      algorithm='laplace')
+            if transfinite_end:
+                ij = [U - transfinite_end, U - 1, 1, V - 1]
+                nodes = smooth.selectNodes(domain='ij', ij=ij)
+                block = smooth.smooth(nodes, iterations=3,
+                                      algorithm='laplace')
+
+        elif algorithm == 'elliptic':
             # elliptic grid generation
-            smoother = Elliptic.Elliptic(block_tunnel.getULines())
-            new_ulines = smoother.smooth(iterations=smoothing_iterations,
-                                         tolerance=smoothing_tolerance,
+            smoother = Elliptic.Elliptic(block.getULinesArray())
+            new_ulines = smoother.smooth(iterations=iterations,
+                                         tolerance=tolerance,
                                          bnd_type=None, # can be 'Neumann'
                                          verbose=True)
-            block_tunnel.setUlines(new_ulines)
+            block.setUlines(new_ulines)
 
-        elif smoothing_algorithm == 'angle_based':
-            smoother = SmoothAngleBased(block_tunnel, data_source='block')
-            smoothed_vertices = smoother.smooth(iterations=smoothing_iterations,
-                                                tolerance=smoothing_tolerance,
+        elif algorithm == 'angle_based':
+            smoother = SmoothAngleBased(block, data_source='block')
+            smoothed_vertices = smoother.smooth(iterations=iterations,
+                                                tolerance=tolerance,
                                                 verbose=True)
             new_ulines = smoother.mapToUlines(smoothed_vertices)
-            block_tunnel.setUlines(new_ulines)
+            block.setUlines(new_ulines)
 
-        self.block_tunnel = block_tunnel
-        self.blocks.append(block_tunnel)
+        return block
 
     def TunnelMeshWake(self, name='', tunnel_wake=2.0,
-                       divisions=100, ratio=0.1, spread=0.4):
+                       divisions=100, ratio=0.1, spread=0.4,
+                       adaptation=None):
+        """Windtunnel block downstream of trailing edge and tunnel blocks
+
+        Args:
+            adaptation (Adaptation, optional): Chooses the ratio of the
+                distribution along the wake with the panel method solution
+        """
 
         chord = 1.0
 
         block_tunnel_wake = BlockMesh(name=name)
 
         # line composed of trailing edge and block_tunnel meshes
-        line = self.block_tunnel.getVLines()[-1]
-        line.reverse()
-        del line[-1]
-        line += self.block_te.getULines()[-1]
-        del line[-1]
-        line += self.block_tunnel.getVLines()[0]
+        tunnel_vlines = self.block_tunnel.getVLinesArray()
+        te_last_uline = self.block_te.getULinesArray()[-1]
+        line = np.concatenate((tunnel_vlines[-1][::-1][:-1],
+                               te_last_uline[:-1],
+                               tunnel_vlines[0]))
         block_tunnel_wake.addLine(line)
 
         #
-        p1 = np.array((self.block_te.getULines()[-1][0][0],
-                       self.tunnel_height))
-        p4 = np.array((self.block_te.getULines()[-1][-1][0],
-                       - self.tunnel_height))
+        p1 = np.array((te_last_uline[0][0], self.tunnel_height))
+        p4 = np.array((te_last_uline[-1][0], - self.tunnel_height))
         p7 = np.array((tunnel_wake + chord, self.tunnel_height))
         p8 = np.array((tunnel_wake + chord, -self.tunnel_height))
 
+        if adaptation:
+            # wake centre line, starting with the last cell of the
+            # trailing edge block
+            te_ulines = self.block_te.getULinesArray()
+            middle = te_ulines.shape[1] // 2
+            first = np.linalg.norm(te_ulines[-1, middle] -
+                                   te_ulines[-2, middle])
+            start = te_ulines[-1, middle]
+            end = np.array((tunnel_wake + chord, start[1]))
+            ratio = adaptation.wakeRatio(start, end, divisions=divisions,
+                                         ratio=ratio, first=first)
+
         upper = BlockMesh.makeLine(p7, p1, divisions=divisions,
                                    ratio=1.0 / ratio)
         lower = BlockMesh.makeLine(p8, p4, divisions=divisions,
@@ -327,32 +376,283 @@ class Windtunnel:
         block_tunnel_wake.transfinite(boundary=boundary)
 
         # equalize division line in wake
-        for i, u in enumerate(block_tunnel_wake.getULines()[0]):
+        first_uline = block_tunnel_wake.getULinesArray()[0]
+        for i, u in enumerate(first_uline):
             if u[0] < chord + tunnel_wake * spread:
-                ll = len(block_tunnel_wake.getULines()[0])
+                ll = len(first_uline)
                 line_no = -ll + i
                 break
         block_tunnel_wake.distribute(direction='v', number=line_no)
 
+        U, V = block_tunnel_wake.getDivUV()
+
         # transfinite left of division line
-        ij = [len(block_tunnel_wake.getVLines()) + line_no,
-              len(block_tunnel_wake.getVLines()) - 1,
-              0,
-              len(block_tunnel_wake.getULines()) - 1]
+        ij = [U + 1 + line_no, U, 0, V]
         block_tunnel_wake.transfinite(ij=ij)
 
         # transfinite right of division line
-        ij = [0,
-              len(block_tunnel_wake.getVLines()) + line_no,
-              0,
-              len(block_tunnel_wake.getULines()) - 1]
+        ij = [0, U + 1 + line_no, 0, V]
         block_tunnel_wake.transfinite(ij=ij)
 
         self.block_tunnel_wake = block_tunnel_wake
         self.blocks.append(block_tunnel_wake)
 
-    def makeMesh(self):
+    def CGridMesh(self, name='', contour=None, divisions=15, ratio=1.05,
+                  thickness=0.004, extrusion='normal', te_divisions=3,
+                  tunnel_height=2.0, divisions_height=100, ratio_height=10.0,
+                  dist='symmetric', tunnel_wake=2.0, divisions_wake=100,
+                  smoothing_algorithm='simple', smoothing_iterations=10,
+                  smoothing_tolerance=1e-3, blend_exponent=0.6,
+                  transfinite_width=20):
+        """Single structured C-grid block around airfoil and wake
+
+        The first u-line runs from the outlet along the wake cut to the
+        trailing edge, around the airfoil (upper side, leading edge, lower
+        side) and back along the wake cut to the outlet. For a blunt
+        trailing edge it includes the trailing edge base and the wake cut
+        starts at the middle of the base. The nodes (i, 0) and
+        (nu - 1 - i, 0) for i < self.cgrid_cut lie on both sides of the
+        wake cut and are the same mesh vertex (see Connect.connectCGrid).
+        The nodes (nv - 1, i) of the windtunnel boundary lie on its upper
+        straight line for i < upper_end and on its lower straight line
+        for i >= lower_start, (upper_end, lower_start) is
+        self.cgrid_tunnel_breaks.
+
+        Near the wall, the layers around the airfoil are extruded like in
+        AirfoilMesh. The layers above and below the wake cut (and the
+        trailing edge base) are a transfinite interpolation up to the
+        outermost airfoil layer. The far field part up to the C-shaped
+        windtunnel boundary is made like in TunnelMesh (transfinite
+        interpolation, blending with the normals and smoothing).
+
+        Args:
+            divisions (int, optional): Number of layers near the wall
+            ratio (float, optional): Growth rate of the layers near the wall
+            thickness (float, optional): Thickness of the first layer
+            extrusion (str, optional): 'normal' or 'hyperbolic'
+            te_divisions (int, optional): Number of subdivisions of a blunt
+                trailing edge base (rounded up to an even number)
+            divisions_wake (int, optional): Number of subdivisions of the
+                wake cut, the first cell matches the contour spacing at
+                the trailing edge
+            transfinite_width (int, optional): Number of columns on each
+                side of the trailing edge re-interpolated after blending
+        """
+        chord = 1.0
+
+        contour = np.stack(contour, axis=-1)
+
+        # trailing edge base, from its middle to the corners
+        if self.mainwindow.airfoil.has_TE:
+            upper_corner, lower_corner = contour[0], contour[-1]
+            te = 0.5 * (upper_corner + lower_corner)
+            nb = max(1, (te_divisions + 1) // 2)
+            t = np.linspace(0.0, 1.0, nb + 1)[:-1, np.newaxis]
+            base_upper = te + t * (upper_corner - te)
+            base_lower = (te + t * (lower_corner - te))[::-1]
+        else:
+            te = contour[0]
+            base_upper = base_lower = np.empty((0, 2))
+
+        # wake cut, starting with the contour spacing at the trailing edge
+        ds = 0.5 * (np.linalg.norm(contour[1] - contour[0]) +
+                    np.linalg.norm(contour[-1] - contour[-2]))
+        wake_length = chord + tunnel_wake - te[0]
+        growth, _ = Spacing.growth_rate(first=ds, length=wake_length,
+                                        cells=divisions_wake)
+        spacing = Spacing.cell_thickness(cell_thickness=ds, growth=growth,
+                                         divisions=divisions_wake)
+        spacing[-1] = wake_length
+        wake = te + spacing[1:, np.newaxis] * np.array([1.0, 0.0])
+
+        wall = np.concatenate((wake[::-1], base_upper, contour,
+                               base_lower, wake))
+        cut = len(wake) + 1
+        nu = len(wall)
+
+        # layers near the airfoil contour
+        airfoil = BlockMesh(name=name)
+        airfoil.addLine(contour)
+        if extrusion == 'hyperbolic':
+            airfoil.extrudeLineHyperbolic(contour,
+                                          cell_thickness=thickness,
+                                          growth=ratio,
+                                          divisions=divisions)
+        else:
+            airfoil.extrudeLine_cell_thickness(contour,
+                                               cell_thickness=thickness,
+                                               growth=ratio,
+                                               divisions=divisions,
+                                               direction=3)
+        airfoil_vlines = airfoil.getVLinesArray()
+
+        # layers above and below the wake cut (and the trailing edge base)
+        # as transfinite interpolation up to the outermost airfoil layer
+        layers = Spacing.cell_thickness(cell_thickness=thickness,
+                                        growth=ratio,
+                                        divisions=divisions)
+        up = np.array([0.0, 1.0])
+
+        upper = BlockMesh(name=name)
+        lower = wall[:cut + len(base_upper)]
+        top = np.linspace((lower[0] + layers[-1] * up), airfoil_vlines[0, -1],
+                          len(lower))
+        upper.transfinite(boundary=[lower, top,
+                                    lower[0] + layers[:, np.newaxis] * up,
+                                    airfoil_vlines[0]])
+
+        below = BlockMesh(name=name)
+        lower = wall[nu - cut - len(base_lower):]
+        bottom = np.linspace(airfoil_vlines[-1, -1],
+                             (lower[-1] - layers[-1] * up), len(lower))
+        below.transfinite(boundary=[lower, bottom,
+                                    airfoil_vlines[-1],
+                                    lower[-1] - layers[:, np.newaxis] * up])
+
+        block = BlockMesh(name=name)
+        block.setNodes(np.concatenate((upper.getULinesArray()[:, :-1],
+                                       airfoil.getULinesArray(),
+                                       below.getULinesArray()[:, 1:]),
+                                      axis=1))
+
+        # C-shaped windtunnel boundary
+        # straight lines above and below the wake cut
+        inner = block.getULinesArray()[-1]
+        top = np.stack((inner[:cut, 0],
+                        np.full(cut, tunnel_height)), axis=-1)
+        bottom = np.stack((inner[nu - cut:, 0],
+                           np.full(cut, -tunnel_height)), axis=-1)
+
+        # upper line, front half circle and lower line until the
+        # trailing edge (like in TunnelMesh)
+        phi = np.radians(np.linspace(90.0, 270.0, 200))
+        front = np.concatenate((
+            np.linspace(top[-1], (0.0, tunnel_height), 10)[:-1],
+            tunnel_height * np.stack((np.cos(phi), np.sin(phi)), axis=-1),
+            np.linspace((0.0, -tunnel_height), bottom[0], 10)[1:]))
 
+        if dist == 'symmetric':
+            ld, ud = -1.3, 1.3
+        if dist == 'lower':
+            ld, ud = -1.2, 1.5
+        if dist == 'upper':
+            ld, ud = -1.5, 1.2
+        t = Spacing.tanh_two_sided(divisions=nu - 2 * cut + 1,
+                                   delta=ud - ld,
+                                   center=-ld / (ud - ld))
+
+        # nodes of the front part on the upper and lower straight line
+        # (nodes before the first and from the second break, the half
+        # circle starts at point 9 and ends at point len(front) - 10)
+        u = Utils.arc_length_parameter(front)
+        upper_end = int(np.searchsorted(t, u[9], 'right'))
+        lower_start = int(np.searchsorted(t, u[len(front) - 10], 'left'))
+
+        front = Utils.resample_polyline(front, t, u)
+
+        outer = np.concatenate((top[:-1], front, bottom[1:]))
+
+        # far field part of the block
+        left = BlockMesh.makeLine(inner[0], outer[0],
+                                  divisions=divisions_height,
+                                  ratio=ratio_height)
+        right = BlockMesh.makeLine(inner[-1], outer[-1],
+                                   divisions=divisions_height,
+                                   ratio=ratio_height)
+
+        farfield = BlockMesh(name=name)
+        farfield.transfinite(boundary=[inner, outer, left, right])
+        farfield.blendNormals(exponent=blend_exponent)
+
+        # the inner line has kinks at the trailing edge, so re-interpolate
+        # there after blending
+        U, V = farfield.getDivUV()
+        for i in (cut - 1, nu - cut):
+            ij = [max(i - transfinite_width, 0),
+                  min(i + transfinite_width, U), 0, V]
+            farfield.transfinite(ij=ij)
+
+        farfield = self.smoothBlock(farfield,
+                                    algorithm=smoothing_algorithm,
+                                    iterations=smoothing_iterations,
+                                    tolerance=smoothing_tolerance)
+
+        block.setNodes(np.concatenate((block.getULinesArray(),
+                                       farfield.getULinesArray()[1:])))
+
+        self.tunnel_height = tunnel_height
+        self.cgrid_cut = cut
+        self.cgrid_tunnel_breaks = (cut - 1 + upper_end,
+                                    cut - 1 + lower_start)
+
+        # columns and rows where the parts of the block meet
+        nv = len(block.getULinesArray())
+        self.cgrid_breaks = (sorted({0, cut - 1, cut - 1 + len(base_upper),
+                                     nu - cut - len(base_lower), nu - cut,
+                                     nu - 1}),
+                             [0, divisions, nv - 1])
+        self.block_cgrid = block
+        self.blocks.append(block)
+
+    @staticmethod
+    def blockInterfaces(blocks):
+        """Interfaces of the multi-block mesh for Connect.connectBlocks
+
+        The blocks share these index ranges (nodes as (nv, nu) arrays):
+
+            - airfoil last v-line (trailing edge upper side, reversed)
+              and first v-line (lower side) with the ends of the first
+              u-line of the trailing edge block
+            - airfoil last u-line with the middle of the first u-line of
+              the tunnel block, the trailing edge v-lines with its ends
+            - trailing edge last u-line with the middle of the last
+              v-line of the wake block, the tunnel v-lines with its ends
+
+        A sharp trailing edge closes the airfoil block: both of its
+        v-lines meet the trailing edge block in the same node.
+
+        Args:
+            blocks (list): Airfoil, trailing edge, tunnel and wake block
+
+        Returns:
+            list: Interfaces ((block, side, index range), (block, side,
+                index range))
+        """
+        shapes = [block.getULinesArray().shape[:2] for block in blocks]
+        divisions = shapes[0][0] - 1
+        contour = shapes[0][1]
+        divisions_te, nu_te = shapes[1][0] - 1, shapes[1][1]
+        height, nu_tunnel = shapes[2][0] - 1, shapes[2][1]
+        nv_wake = shapes[3][0]
+        reverse = slice(None, None, -1)
+
+        return [
+            ((0, 'last_vline', reverse),
+             (1, 'first_uline', slice(0, divisions + 1))),
+            ((0, 'first_vline', slice(None)),
+             (1, 'first_uline', slice(nu_te - divisions - 1, nu_te))),
+            ((0, 'last_uline', slice(None)),
+             (2, 'first_uline', slice(divisions_te,
+                                      divisions_te + contour))),
+            ((1, 'last_vline', reverse),
+             (2, 'first_uline', slice(0, divisions_te + 1))),
+            ((1, 'first_vline', slice(None)),
+             (2, 'first_uline', slice(nu_tunnel - divisions_te - 1,
+                                      nu_tunnel))),
+            ((1, 'last_uline', slice(None)),
+             (3, 'last_vline', slice(height, height + nu_te))),
+            ((2, 'last_vline', reverse),
+             (3, 'last_vline', slice(0, height + 1))),
+            ((2, 'first_vline', slice(None)),
+             (3, 'last_vline', slice(height + nu_te - 1, nv_wake)))]
+
+    def makeMesh(self, cache=None):
+        """Generate the mesh with the settings from the toolbox
+
+        Args:
+            cache (dict, optional): Outputs of the mesh stages of a
+                previous call, see makeStages
+        """
         toolbox = self.mainwindow.centralwidget.toolbox
 
         if self.mainwindow.airfoil:
@@ -386,71 +686,62 @@ class Windtunnel:
         progdialog.setValue(10)
         # progdialog.setLabelText('making blocks')
 
-        self.AirfoilMesh(name='block_airfoil',
-                         contour=contour,
-                         divisions=toolbox.points_n.value(),
-                         ratio=toolbox.ratio.value(),
-                         thickness=toolbox.normal_thickness.value())
-        progdialog.setValue(20)
-
-        if progdialog.wasCanceled():
+        if toolbox.topology.currentText() == 'C-grid':
+            self.makeMeshCGrid(contour, progdialog)
             return
 
-        self.TrailingEdgeMesh(name='block_TE',
-                              te_divisions=toolbox.te_div.value(),
-                              thickness=toolbox.length_te.value(),
-                              divisions=toolbox.points_te.value(),
-                              ratio=toolbox.ratio_te.value())
-        progdialog.setValue(30)
+        # only stages whose inputs changed since the last mesh are run
+        graph = self.makeStages(contour, cache, progdialog)
 
-        if progdialog.wasCanceled():
-            return
+        for stage, progress in (('airfoil', 20), ('trailing_edge', 30),
+                                ('tunnel', 50), ('wake', 70)):
+            graph.evaluate(stage)
+            progdialog.setValue(progress)
 
-        self.TunnelMesh(name='block_tunnel',
-                        tunnel_height=toolbox.tunnel_height.value(),
-                        divisions_height=toolbox.divisions_height.value(),
-                        ratio_height=toolbox.ratio_height.value(),
-                        dist=toolbox.dist.currentText(),
-                        smoothing_algorithm=toolbox.smoothing_algorithm,
-                        smoothing_iterations=toolbox.smoother_iterations.value(),
-                        smoothing_tolerance=float(toolbox.smoother_tolerance.text()))
-        progdialog.setValue(50)
+            if progdialog.wasCanceled():
+                return
 
-        if progdialog.wasCanceled():
-            return
-
-        self.TunnelMeshWake(name='block_tunnel_wake',
-                            tunnel_wake=toolbox.tunnel_wake.value(),
-                            divisions=toolbox.divisions_wake.value(),
-                            ratio=toolbox.ratio_wake.value(),
-                            spread=toolbox.spread.value() / 100.0)
-        progdialog.setValue(70)
-
-        if progdialog.wasCanceled():
-            return
+        self.block_airfoil = graph.evaluate('airfoil')
+        self.block_te = graph.evaluate('trailing_edge')
+        self.block_tunnel, self.tunnel_breaks = graph.evaluate('tunnel')
+        self.block_tunnel_wake = graph.evaluate('wake')
+        self.blocks = [self.block_airfoil, self.block_te,
+                       self.block_tunnel, self.block_tunnel_wake]
+        self.tunnel_height = toolbox.tunnel_height.value()
 
         # connect mesh blocks
-        connect = Connect.Connect(progdialog)
-        vertices, connectivity, progdialog = \
-            connect.connectAllBlocks(self.blocks)
+        vertices, connectivity, self.node_ids = graph.evaluate('connect')
 
         # add mesh to Wind-tunnel instance
         self.mesh = vertices, connectivity
 
+        # adjacency tables of the connected mesh, LCE and LCC share them
+        self.adjacency = (self.mesh, graph.evaluate('edges'))
+
         # generate cell to vertex connectivity from mesh
         self.makeLCV()
 
+        # generate cell to cell connectivity from mesh
+        self.makeLCC()
+
         # generate cell to edge connectivity from mesh
         self.makeLCE()
 
         # generate boundaries from mesh connectivity
-        self.makeBoundaries()
+        self.boundary_edges, self.boundary_tags = \
+            graph.evaluate('boundaries')
 
         logger.info('Mesh around {} created'.
                     format(self.mainwindow.airfoil.name))
         logger.info('Mesh has {} vertices and {} elements'.
                     format(len(vertices), len(connectivity)))
 
+        adaptation = graph.evaluate('adaptation')
+        if adaptation:
+            cells, static_cells = adaptation.report(self)['mesh']
+            logger.info('Static distributions need {} instead of {} cells '
+                        'for the same accuracy'.format(static_cells, cells))
+
         self.drawMesh(self.mainwindow.airfoil)
         self.drawBlockOutline(self.mainwindow.airfoil)
 
@@ -463,6 +754,221 @@ class Windtunnel:
         # enable mesh export and set filename and boundary definitions
         toolbox.box_meshexport.setEnabled(True)
     
+    def makeStages(self, contour, cache=None, progdialog=None):
+        """Stages of the multi-block mesh as a dependency graph
+
+        A stage is only run again if its settings from the toolbox or
+        one of the stages it depends on changed. For example, changing
+        the wake settings does not redo the smoothing of the windtunnel
+        block.
+
+            airfoil -> trailing_edge -> tunnel -> wake -> connect
+                    -> edges, boundaries
+
+        The optional adaptation stage (panel method solution, see
+        Adaptation) is upstream of the tunnel and wake stages.
+
+        Args:
+            contour (tuple): x and y coordinates of the airfoil contour
+            cache (dict, optional): Outputs of the stages of previous
+                mesh generations (updated in place)
+            progdialog (QProgressDialog, optional): Progress dialog
+
+        Returns:
+            Stages.StageGraph: Graph of the mesh stages
+        """
+        toolbox = self.mainwindow.centralwidget.toolbox
+
+        def airfoil(**parameters):
+            self.AirfoilMesh(**parameters)
+            return self.block_airfoil
+
+        def trailing_edge(block_airfoil, has_te, **parameters):
+            # has_te is read by TrailingEdgeMesh, here it is in the key
+            self.block_airfoil = block_airfoil
+            self.TrailingEdgeMesh(**parameters)
+            return self.block_te
+
+        def adaptation(contour, active, **parameters):
+            if active:
+                return Adaptation.Adaptation(contour, **parameters)
+            return None
+
+        def tunnel(block_airfoil, block_te, adaptation, **parameters):
+            self.block_airfoil = block_airfoil
+            self.block_te = block_te
+            self.TunnelMesh(adaptation=adaptation, **parameters)
+            return self.block_tunnel, self.tunnel_breaks
+
+        def wake(block_te, tunnel, adaptation, tunnel_height,
+                 **parameters):
+            self.block_te = block_te
+            self.block_tunnel, self.tunnel_breaks = tunnel
+            self.tunnel_height = tunnel_height
+            self.TunnelMeshWake(adaptation=adaptation, **parameters)
+            return self.block_tunnel_wake
+
+        def connect(block_airfoil, block_te, tunnel, block_tunnel_wake):
+            blocks = [block_airfoil, block_te, tunnel[0], block_tunnel_wake]
+            return Connect.Connect(progdialog).connectAllBlocks(
+                blocks, interfaces=self.blockInterfaces(blocks))
+
+        def edges(connected):
+            adjacency = Adjacency.Adjacency(connected[:2])
+            adjacency.edgeTable()
+            return adjacency
+
+        def boundaries(connected, tunnel):
+            self.block_tunnel, self.tunnel_breaks = tunnel
+            self.makeBoundariesBlocks(connected[2])
+            return self.boundary_edges, self.boundary_tags
+
+        graph = Stages.StageGraph(cache)
+
+        graph.add('airfoil', airfoil,
+                  name='block_airfoil',
+                  contour=contour,
+                  divisions=toolbox.points_n.value(),
+                  ratio=toolbox.ratio.value(),
+                  thickness=toolbox.normal_thickness.value(),
+                  extrusion=toolbox.extrusion.currentText())
+
+        graph.add('trailing_edge', trailing_edge, upstream=['airfoil'],
+                  has_te=self.mainwindow.airfoil.has_TE,
+                  name='block_TE',
+                  te_divisions=toolbox.te_div.value(),
+                  thickness=toolbox.length_te.value(),
+                  divisions=toolbox.points_te.value(),
+                  ratio=toolbox.ratio_te.value())
+
+        # the panel method settings only matter if the adaptation is on
+        active = toolbox.adaptation.isChecked()
+        settings = dict(alpha=toolbox.aoaAP.value(),
+                        npanel=toolbox.panels.value()) if active else {}
+        graph.add('adaptation', adaptation,
+                  contour=contour,
+                  active=active,
+                  **settings)
+
+        graph.add('tunnel', tunnel,
+                  upstream=['airfoil', 'trailing_edge', 'adaptation'],
+                  name='block_tunnel',
+                  tunnel_height=toolbox.tunnel_height.value(),
+                  divisions_height=toolbox.divisions_height.value(),
+                  ratio_height=toolbox.ratio_height.value(),
+                  dist=toolbox.dist.currentText(),
+                  smoothing_algorithm=toolbox.smoothing_algorithm,
+                  smoothing_iterations=toolbox.smoother_iterations.value(),
+                  smoothing_tolerance=float(toolbox.smoother_tolerance.text()))
+
+        graph.add('wake', wake,
+                  upstream=['trailing_edge', 'tunnel', 'adaptation'],
+                  tunnel_height=toolbox.tunnel_height.value(),
+                  name='block_tunnel_wake',
+                  tunnel_wake=toolbox.tunnel_wake.value(),
+                  divisions=toolbox.divisions_wake.value(),
+                  ratio=toolbox.ratio_wake.value(),
+                  spread=toolbox.spread.value() / 100.0)
+
+        graph.add('connect', connect,
+                  upstream=['airfoil', 'trailing_edge', 'tunnel', 'wake'])
+        graph.add('edges', edges, upstream=['connect'])
+        graph.add('boundaries', boundaries, upstream=['connect', 'tunnel'])
+
+        return graph
+
+    def makeMeshCGrid(self, contour, progdialog):
+        """Single block C-grid, see CGridMesh
+
+        Connectivity and boundaries follow from the block indices,
+        no geometric merging of vertices is needed.
+        """
+        toolbox = self.mainwindow.centralwidget.toolbox
+
+        self.CGridMesh(name='block_cgrid',
+                       contour=contour,
+                       divisions=toolbox.points_n.value(),
+                       ratio=toolbox.ratio.value(),
+                       thickness=toolbox.normal_thickness.value(),
+                       extrusion=toolbox.extrusion.currentText(),
+                       te_divisions=toolbox.te_div.value(),
+                       tunnel_height=toolbox.tunnel_height.value(),
+                       divisions_height=toolbox.divisions_height.value(),
+                       ratio_height=toolbox.ratio_height.value(),
+                       dist=toolbox.dist.currentText(),
+                       tunnel_wake=toolbox.tunnel_wake.value(),
+                       divisions_wake=toolbox.divisions_wake.value(),
+                       smoothing_algorithm=toolbox.smoothing_algorithm,
+                       smoothing_iterations=toolbox.smoother_iterations.value(),
+                       smoothing_tolerance=float(toolbox.smoother_tolerance.text()))
+        progdialog.setValue(70)
+
+        if progdialog.wasCanceled():
+            return
+
+        connect = Connect.Connect(progdialog)
+        vertices, connectivity, node_ids = \
+            connect.connectCGrid(self.block_cgrid, self.cgrid_cut)
+
+        # add mesh to Wind-tunnel instance
+        self.mesh = vertices, connectivity
+
+        # generate cell to vertex connectivity from mesh
+        self.makeLCV()
+
+        # generate cell to cell connectivity from mesh
+        self.makeLCC()
+
+        # generate cell to edge connectivity from mesh
+        self.makeLCE()
+
+        # boundaries from the block indices
+        self.makeBoundariesCGrid(node_ids)
+
+        logger.info('C-grid mesh around {} created'.
+                    format(self.mainwindow.airfoil.name))
+        logger.info('Mesh has {} vertices and {} elements'.
+                    format(len(vertices), len(connectivity)))
+
+        self.drawMesh(self.mainwindow.airfoil)
+        self.drawBlockOutline(self.mainwindow.airfoil)
+
+        progdialog.setValue(100)
+
+        # enable mesh export and set filename and boundary definitions
+        toolbox.box_meshexport.setEnabled(True)
+
+    def morphMesh(self, contour, new_contour, radius=0.5):
+        """Deform the mesh to a modified contour instead of remeshing
+
+        Connectivity and boundary tags are kept, see Morphing.
+
+        Args:
+            contour (tuple): x and y coordinates of the contour the mesh
+                was made for
+            new_contour (tuple): x and y coordinates of the modified
+                contour, same number of points
+            radius (float, optional): Support radius of the deformation
+
+        Returns:
+            dict: Displacement and mesh quality report (Morphing.morph)
+        """
+        morphing = Morphing.Morphing(contour, new_contour, radius=radius)
+        return morphing.morph(self)
+
+    def makeCompact(self, dtype=np.float64):
+        """Store the mesh as CompactMesh (contiguous arrays)
+
+        Has to be called before makeLCE, then LCE and edges are int32
+        arrays (see Adjacency.edgeTable).
+
+        Args:
+            dtype (np.dtype, optional): np.float64 or np.float32 for the
+                vertex coordinates
+        """
+        vertices, connectivity = self.mesh
+        self.mesh = CompactMesh(vertices, connectivity, dtype=dtype)
+
     def makeLCV(self):
         """Make cell to vertex connectivity for the mesh
            LCV is identical to connectivity
@@ -470,57 +976,55 @@ class Windtunnel:
         _, connectivity = self.mesh
         self.LCV = connectivity
 
-    def makeLVC(self):
-        _, connectivity = self.mesh
-        nodes = list(set([node for cell in connectivity for node in cell]))
-        self.lvc = dict()
-        for node in nodes:
-            for cell in connectivity:
-                if node in cell:
-                    self.lvc.setdefault(node, []).append(cell.tolist())
+    def getAdjacency(self):
+        """Adjacency tables of the current mesh
 
-    def makeLCE(self):
-        """Make cell to edge connectivity for the mesh"""
-        _, connectivity = self.mesh
-        self.LCE = dict()
-        self.edges = list()
+        The tables are kept until the mesh is replaced.
 
-        for i, cell in enumerate(connectivity):
-            # example for quadrilateral:
-            # cell: [0, 1, 5, 4]
-            # edges: [(0,1), (1,5), (5,4), (4,0)]
-            edges = [(cell[j], cell[(j + 1) % len(cell)])
-                           for j in range(len(cell))]
+        Returns:
+            Adjacency.Adjacency: Shared instance for the mesh
+        """
+        cached = getattr(self, 'adjacency', None)
+        if cached is None or cached[0] is not self.mesh:
+            self.adjacency = (self.mesh, Adjacency.Adjacency(self.mesh))
+        return self.adjacency[1]
 
-            # all edges for cell i
-            self.LCE[i] = edges
+    def makeLVC(self):
+        """Make vertex to cell connectivity for the mesh
+           LVC is a CSR table (indptr, indices), the cells at vertex i
+           are indices[indptr[i]:indptr[i + 1]]
+        """
+        self.LVC = self.getAdjacency().vertexCells()
 
-            # all edges in one list
-            self.edges += [tuple(sorted(edge)) for edge in edges]
+    def makeLCE(self):
+        """Make cell to edge connectivity for the mesh
+           edges is the array of the unique edges (sorted vertex numbers),
+           LCE[i, j] is the row in edges of edge j of cell i, which runs
+           from vertex j to vertex j + 1 of the cell
+        """
+        # shared with the other adjacency tables of the mesh
+        self.edges, self.LCE = self.getAdjacency().edgeTable()
 
     def makeLCC(self):
-        """Make cell to cell connectivity for the mesh"""
-        pass
+        """Make cell to cell connectivity for the mesh
+           LCC[i, j] is the cell across edge j of cell i (from vertex j
+           to vertex j + 1), -1 on the boundary
+        """
+        self.LCC = self.getAdjacency().cellNeighbours()
 
     def makeBoundaries(self):
-        """A boundary edge is an edge that belongs only to one cell"""
+        """A boundary edge is an edge that belongs only to one cell
+
+        The edges are tagged by their coordinates. Meshes made from the
+        multi-block or C-grid topology are tagged from their block sides
+        instead, see makeBoundariesBlocks and makeBoundariesCGrid.
+        """
 
         vertices, _ = self.mesh
         vertices = np.array(vertices)
 
-        edges = self.edges
-
-        seen = set()
-        unique = list()
-        doubles = set()
-        for edge in edges:
-            if edge not in seen:
-                seen.add(edge)
-                unique.append(edge)
-            else:
-                doubles.add(edge)
-
-        self.boundary_edges = [edge for edge in unique if edge not in doubles]
+        # edges which belong to only one cell, in the order of the cells
+        self.boundary_edges = self.getAdjacency().boundaryEdges()
 
         # tag edges for boundary definitions
         # FIXME
@@ -541,7 +1045,7 @@ class Windtunnel:
         ymax = np.max(vertices[:,1])
         ymin = np.min(vertices[:,1])
 
-        for edge in self.boundary_edges:
+        for edge in map(tuple, self.boundary_edges.tolist()):
             x1 = vertices[edge[0]][0]
             y1 = vertices[edge[0]][1]
             x2 = vertices[edge[1]][0]
@@ -560,6 +1064,77 @@ class Windtunnel:
 
         return
 
+    def makeBoundariesBlocks(self, node_ids):
+        """Boundaries of the multi-block mesh from its block sides
+
+        The airfoil is the first u-line of the airfoil block and the
+        base of a blunt trailing edge, the outlet is the first v-line of
+        the wake block and the wake block u-lines are top and bottom.
+        The last u-line of the tunnel block starts and ends with the
+        straight upper and lower windtunnel lines (see tunnel_breaks in
+        TunnelMesh), in between is the inlet. See blockInterfaces for
+        the block layout.
+
+        Args:
+            node_ids (list): Mesh vertex number of each block node, one
+                array of shape (nv, nu) per block, see
+                Connect.connectAllBlocks
+        """
+        airfoil, trailing_edge, tunnel, wake = node_ids
+        divisions = airfoil.shape[0] - 1
+        nu_te = trailing_edge.shape[1]
+
+        def edges(line):
+            pairs = np.sort(np.stack((line[:-1], line[1:]), axis=-1), axis=-1)
+            return list(map(tuple, pairs.tolist()))
+
+        upper_end, lower_start = self.tunnel_breaks
+        outer = tunnel[-1]
+
+        self.boundary_tags = {
+            'airfoil': edges(airfoil[0]) +
+                       edges(trailing_edge[0, divisions:nu_te - divisions]),
+            'inlet': edges(outer[max(upper_end - 1, 0):lower_start + 1]),
+            'outlet': edges(wake[:, 0]),
+            'top': edges(outer[:upper_end]) + edges(wake[-1]),
+            'bottom': edges(outer[lower_start:]) + edges(wake[0])}
+
+        self.boundary_edges = np.array(
+            [edge for tag in self.boundary_tags.values() for edge in tag],
+            dtype=int).reshape(-1, 2)
+
+    def makeBoundariesCGrid(self, node_ids):
+        """Boundaries of the single block C-grid from its indices
+
+        Args:
+            node_ids (np.array): Mesh vertex number of each block node,
+                shape (nv, nu), see Connect.connectCGrid
+        """
+        cut = self.cgrid_cut
+        nu = node_ids.shape[1]
+
+        def edges(line):
+            pairs = np.sort(np.stack((line[:-1], line[1:]), axis=-1), axis=-1)
+            return list(map(tuple, pairs.tolist()))
+
+        wall = node_ids[0]
+        outer = node_ids[-1]
+
+        # the front part of the windtunnel starts and ends with straight
+        # lines, these belong to top and bottom
+        upper_end, lower_start = self.cgrid_tunnel_breaks
+
+        self.boundary_tags = {
+            'airfoil': edges(wall[cut - 1:nu - cut + 1]),
+            'inlet': edges(outer[upper_end - 1:lower_start + 1]),
+            'outlet': edges(node_ids[:, 0]) + edges(node_ids[:, -1]),
+            'top': edges(outer[:upper_end]),
+            'bottom': edges(outer[lower_start:])}
+
+        self.boundary_edges = np.array(
+            [edge for tag in self.boundary_tags.values() for edge in tag],
+            dtype=int).reshape(-1, 2)
+
     def drawMesh(self, airfoil):
         """Add the mesh as ItemGroup to the scene
 
@@ -578,14 +1153,14 @@ class Windtunnel:
         mesh = list()
 
         for block in self.blocks:
-            for lines in [block.getULines(),
-                          block.getVLines()]:
+            for lines in [block.getULinesArray(),
+                          block.getVLinesArray()]:
                 for line in lines:
 
                     # instantiate a graphics item
                     contour = gic.GraphicsCollection()
                     # make it polygon type and populate its points
-                    points = [QtCore.QPointF(x, y) for x, y in line]
+                    points = [QtCore.QPointF(x, y) for x, y in line.tolist()]
                     contour.Polyline(QtGui.QPolygonF(points), '')
                     # set its properties
                     contour.pen.setColor(QtGui.QColor(0, 0, 0, 255))
@@ -607,12 +1182,13 @@ class Windtunnel:
     def drawMeshQuality(self, quality):
 
         vertices, connectivity = self.mesh
+        vertices = np.asarray(vertices, dtype=float)
         quads = list()
         colors = [Utils.scalar_to_rgb(q, range='256') for q in quality]
 
         for i, cell in enumerate(connectivity):
             quad = gic.GraphicsCollection()
-            points = [QtCore.QPointF(*vertices[vertex]) for vertex in cell]
+            points = [QtCore.QPointF(x, y) for x, y in vertices[cell].tolist()]
             quad.Polygon(QtGui.QPolygonF(points), '')
             quad.pen.setColor(QtGui.QColor(0, 0, 0, 255))
             quad.brush.setColor(QtGui.QColor(*colors[i]))
@@ -637,13 +1213,13 @@ class Windtunnel:
         mesh_blocks = list()
 
         for block in self.blocks:
-            for lines in [block.getULines()]:
+            for lines in [block.getULinesArray()]:
                 for line in [lines[0], lines[-1]]:
 
                     # instantiate a graphics item
                     contour = gic.GraphicsCollection()
                     # make it polygon type and populate its points
-                    points = [QtCore.QPointF(x, y) for x, y in line]
+                    points = [QtCore.QPointF(x, y) for x, y in line.tolist()]
                     contour.Polyline(QtGui.QPolygonF(points), '')
                     # set its properties
                     contour.pen.setColor(QtGui.QColor(202, 31, 123, 255))
@@ -656,13 +1232,13 @@ class Windtunnel:
                     meshline = GraphicsItem.GraphicsItem(contour)
                     mesh_blocks.append(meshline)
 
-            for lines in [block.getVLines()]:
+            for lines in [block.getVLinesArray()]:
                 for line in [lines[0], lines[-1]]:
 
                     # instantiate a graphics item
                     contour = gic.GraphicsCollection()
                     # make it polygon type and populate its points
-                    points = [QtCore.QPointF(x, y) for x, y in line]
+                    points = [QtCore.QPointF(x, y) for x, y in line.tolist()]
                     contour.Polyline(QtGui.QPolygonF(points), '')
                     # set its properties
                     contour.pen.setColor(QtGui.QColor(202, 31, 123, 255))
@@ -683,143 +1259,190 @@ class Windtunnel:
         self.mainwindow.centralwidget.mesh_blocks_checkbox.setEnabled(True)
 
     def MeshQuality(self, crit='k2inf'):
+        """Cell quality of the mesh
+
+        'k2inf' is the largest condition number of the four corners of a
+        quadrilateral (1.0 for a square), where each corner contributes
+        (a**2 + d**2) / (a * d * sin(alpha)) / 2 for its adjacent sides
+        a, d and the angle alpha between them.
+
+        'size_ratio' is the largest area ratio of a cell and its face
+        neighbours (1.0 if all neighbours have the same size). The
+        neighbours come from the shared adjacency of the mesh (see
+        getAdjacency).
+
+        Args:
+            crit (str, optional): 'k2inf' or 'size_ratio'
+
+        Returns:
+            np.array: Quality of each cell
+        """
         vertices, connectivity = self.mesh
+        vertices = np.asarray(vertices, dtype=float)
+        connectivity = np.asarray(connectivity)
 
         if crit == 'k2inf':
-            v12 = vertices[connectivity[:, 1]] - vertices[connectivity[:, 0]]
-            v23 = vertices[connectivity[:, 2]] - vertices[connectivity[:, 1]]
-            v34 = vertices[connectivity[:, 3]] - vertices[connectivity[:, 2]]
-            v41 = vertices[connectivity[:, 0]] - vertices[connectivity[:, 3]]
-            a = np.linalg.norm(v12)
-            b = np.linalg.norm(v23)
-            c = np.linalg.norm(v34)
-            d = np.linalg.norm(v41)
-            p = 0.5 * (a + b + c + d)
-            q2 = np.sqrt(a**2 + b**2 + c**2 + d**2)
+            corners = vertices[connectivity]
 
-            alpha = Utils.angle_between(v12, -v41)
-            beta =  Utils.angle_between(v23, -v12)
-            gamma = Utils.angle_between(v34, -v23)
-            delta = Utils.angle_between(v41, -v12)
-            theta = 0.5 * (alpha + gamma)
+            # side j runs from corner j to corner j + 1
+            sides = np.roll(corners, -1, axis=1) - corners
+            previous = np.roll(sides, 1, axis=1)
+            lengths = np.linalg.norm(sides, axis=-1)
+            previous_lengths = np.roll(lengths, 1, axis=1)
 
-            # quad area using Bretschneider’s formula
-            A = np.sqrt((p -a)*(p-b)*(p-c)*(p-d) - a*b*c*d*np.cos(theta))
+            # a * d * sin(alpha) is the cross product of the sides
+            cross = np.abs(previous[..., 0] * sides[..., 1] -
+                           previous[..., 1] * sides[..., 0])
+            k = (lengths**2 + previous_lengths**2) / cross
 
-            ka = (a**2 + d**2) / (a*d*np.sin(alpha))
-            kb = (a**2 + b**2) / (a*b*np.sin(beta))
-            kc = (b**2 + c**2) / (b*c*np.sin(gamma))
-            kd = (c**2 + d**2) / (c*d*np.sin(delta))
-            k = np.stack((ka, kb, kc, kd))
+            quality = np.max(k, axis=1) / 2.
 
-            quality = np.max(k, axis=0) / 2.
+        elif crit == 'size_ratio':
+            x, y = vertices[connectivity].transpose(2, 0, 1)
+            area = 0.5 * np.abs(np.sum(x * np.roll(y, -1, axis=1) -
+                                       np.roll(x, -1, axis=1) * y, axis=1))
 
-        self.mesh.quality = quality
+            neighbours = self.getAdjacency().cellNeighbours()
+            neighbour_area = np.where(neighbours >= 0, area[neighbours],
+                                      area[:, np.newaxis])
+            ratio = neighbour_area / area[:, np.newaxis]
+            quality = np.max(np.maximum(ratio, 1.0 / ratio), axis=1)
 
-        return self.mesh.quality
+        else:
+            raise ValueError('Unknown mesh quality criterion {}.'.
+                             format(crit))
+
+        self.quality = quality
+        if isinstance(self.mesh, CompactMesh):
+            self.mesh.quality = quality
+
+        return quality
 
 
 class BlockMesh:
+    """Structured mesh block
+
+    The block nodes are stored in one contiguous array of shape (nv, nu, 2),
+    i.e. nodes[j, i] is the point (x, y) number i on u-line number j.
+    u-lines and v-lines are available as zero-copy views into this array
+    (see getULinesArray and getVLinesArray). The list based methods
+    getULines and getVLines are kept for compatibility and return
+    lists of (x, y) tuples.
+    """
 
     def __init__(self, name='block'):
         self.name = name
-        self.ULines = list()
+        self.nodes = np.empty((0, 0, 2))
 
     def addLine(self, line):
-        # line is a list of (x, y) tuples
-        self.ULines.append(line)
+        # line is a list of (x, y) tuples or an array of shape (nu, 2)
+        line = np.asarray(line, dtype=float).reshape(1, -1, 2)
+        if self.nodes.size == 0:
+            self.nodes = line.copy()
+        else:
+            self.nodes = np.concatenate((self.nodes, line))
+
+    def getULinesArray(self):
+        """u-lines as array view of shape (nv, nu, 2)"""
+        return self.nodes
+
+    def getVLinesArray(self):
+        """v-lines as array view of shape (nu, nv, 2)"""
+        return self.nodes.swapaxes(0, 1)
+
+    def setNodes(self, nodes):
+        self.nodes = np.ascontiguousarray(nodes, dtype=float)
 
     def getULines(self):
-        return self.ULines
+        return [list(map(tuple, uline)) for uline in self.nodes.tolist()]
 
     def setUlines(self, ulines):
-        self.ULines = ulines
+        self.setNodes(ulines)
 
     def getVLines(self):
-        vlines = list()
-        U, V = self.getDivUV()
-
-        # loop over all u-lines
-        for i in range(U + 1):
-            # prepare new v-line
-            vline = list()
-            # collect i-th point on each u-line
-            for uline in self.getULines():
-                vline.append(uline[i])
-            vlines.append(vline)
-
-        return vlines
+        return [list(map(tuple, vline))
+                for vline in self.getVLinesArray().tolist()]
 
     def getLine(self, number=0, direction='u'):
         if direction.lower() == 'u':
-            lines = self.getULines()
+            line = self.getULinesArray()[number]
         if direction.lower() == 'v':
-            lines = self.getVLines()
-        return lines[number]
+            line = self.getVLinesArray()[number]
+        return list(map(tuple, line.tolist()))
 
     def getDivUV(self):
-        u = len(self.getULines()[0]) - 1
-        v = len(self.getULines()) - 1
-        return u, v
+        v, u = self.nodes.shape[:2]
+        return u - 1, v - 1
 
     def getNodeCoo(self, node):
         I, J = node[0], node[1]
-        uline = self.getULines()[J]
-        point = uline[I]
-        return np.array(point)
+        return self.nodes[J, I]
 
     def setNodeCoo(self, node, new_pos):
         I, J = node[0], node[1]
-        uline = self.getULines()[J]
-        uline[I] = new_pos
+        self.nodes[J, I] = new_pos
         return
 
     @staticmethod
     def makeLine(p1, p2, divisions=1, ratio=1.0):
         vec = p2 - p1
         dist = np.linalg.norm(vec)
-        spacing = BlockMesh.spacing(divisions=divisions,
+        spacing = Spacing.geometric(divisions=divisions,
                                     ratio=ratio, length=dist)
-        line = list()
-        line.append((p1.tolist()[0], p1.tolist()[1]))
-        for i in range(1, len(spacing)):
-            p = p1 + spacing[i] * Utils.unit_vector(vec)
-            line.append((p.tolist()[0], p.tolist()[1]))
-        del line[-1]
-        line.append((p2.tolist()[0], p2.tolist()[1]))
-        return line
+        line = p1 + spacing[:, np.newaxis] * Utils.unit_vector(vec)
+        line[-1] = p2
+        return list(map(tuple, line.tolist()))
 
     def extrudeLine_cell_thickness(self, line, cell_thickness=0.04,
                                    growth=1.05,
                                    divisions=1,
-                                   direction=3):
-        x, y = list(zip(*line))
-        x = np.array(x)
-        y = np.array(y)
-        if direction == 3:
-            spacing, _ = self.spacing_cell_thickness(
-                cell_thickness=cell_thickness,
-                growth=growth,
-                divisions=divisions)
-            normals = self.curveNormals(x, y)
-            for i in range(1, len(spacing)):
-                xo = x + spacing[i] * normals[:, 0]
-                yo = y + spacing[i] * normals[:, 1]
-                line = list(zip(xo.tolist(), yo.tolist()))
-                self.addLine(line)
-        elif direction == 4:
-            spacing, _ = self.spacing_cell_thickness(
-                cell_thickness=cell_thickness,
-                growth=growth,
-                divisions=divisions)
-            normals = self.curveNormals(x, y)
-            normalx = normals[:, 0].mean()
-            normaly = normals[:, 1].mean()
-            for i in range(1, len(spacing)):
-                xo = x + spacing[i] * normalx
-                yo = y + spacing[i] * normaly
-                line = list(zip(xo.tolist(), yo.tolist()))
-                self.addLine(line)
+                                   direction=3,
+                                   length=None):
+        """Extrude a line with a geometric growth of the cell thickness
+
+        Args:
+            line (list): List of (x, y) tuples
+            cell_thickness (float, optional): Thickness of the first layer
+            growth (float, optional): Ratio of two adjacent layers
+            divisions (int, optional): Number of layers
+            direction (int, optional): 3 ... along the local normals,
+                4 ... along the mean normal
+            length (float, optional): If given, the growth rate is solved
+                for, so that the extrusion ends at this distance
+        """
+        if length is not None:
+            growth, _ = Spacing.growth_rate(first=cell_thickness,
+                                            length=length,
+                                            cells=divisions)
+        spacing = Spacing.cell_thickness(cell_thickness=cell_thickness,
+                                         growth=growth,
+                                         divisions=divisions)
+        self.extrudeLineSpacing(line, spacing, direction=direction)
+
+    def extrudeLineHyperbolic(self, line, cell_thickness=0.04, growth=1.05,
+                              divisions=1, dissipation=1.0,
+                              volume_smoothing=0.3):
+        """Extrude a line by hyperbolic grid marching
+
+        Unlike the extrusion along fixed normals, grid lines do not fold
+        in concave regions and at blunt trailing edges.
+
+        Args:
+            line (list): List of (x, y) tuples
+            cell_thickness (float, optional): Thickness of the first layer
+            growth (float, optional): Ratio of two adjacent layers
+            divisions (int, optional): Number of layers
+            dissipation (float, optional): See Hyperbolic.march
+            volume_smoothing (float, optional): See Hyperbolic.march
+        """
+        spacing = Spacing.cell_thickness(cell_thickness=cell_thickness,
+                                         growth=growth,
+                                         divisions=divisions)
+        nodes = Hyperbolic.Hyperbolic(line).march(
+            spacing,
+            dissipation=dissipation,
+            volume_smoothing=volume_smoothing)
+        self.setNodes(np.concatenate((self.nodes, nodes[1:])))
 
     def extrudeLine(self, line, direction=0, length=0.1, divisions=1,
                     ratio=1.00001, constant=False):
@@ -834,80 +1457,66 @@ class BlockMesh:
             y.fill(length)
             line = list(zip(x.tolist(), y.tolist()))
             self.addLine(line)
-        elif direction == 3:
-            spacing = self.spacing(divisions=divisions,
-                                   ratio=ratio,
-                                   length=length)
-            normals = self.curveNormals(x, y)
-            for i in range(1, len(spacing)):
-                xo = x + spacing[i] * normals[:, 0]
-                yo = y + spacing[i] * normals[:, 1]
-                line = list(zip(xo.tolist(), yo.tolist()))
-                self.addLine(line)
-        elif direction == 4:
-            spacing = self.spacing(divisions=divisions,
-                                   ratio=ratio,
-                                   length=length)
-            normals = self.curveNormals(x, y)
-            normalx = normals[:, 0].mean()
-            normaly = normals[:, 1].mean()
-            for i in range(1, len(spacing)):
-                xo = x + spacing[i] * normalx
-                yo = y + spacing[i] * normaly
-                line = list(zip(xo.tolist(), yo.tolist()))
-                self.addLine(line)
+        elif direction in (3, 4):
+            spacing = Spacing.geometric(divisions=divisions,
+                                        ratio=ratio,
+                                        length=length)
+            self.extrudeLineSpacing(line, spacing, direction=direction)
+
+    def extrudeLineSpacing(self, line, spacing, direction=3):
+        """Add all layers of an extrusion at once
+
+        Args:
+            line (list): List of (x, y) tuples, i.e. the first layer
+            spacing (np.array): Layer positions along the normals,
+                starting with 0.0 for the line itself
+            direction (int, optional): 3 ... along the local normals,
+                4 ... along the mean normal
+        """
+        line = np.asarray(line, dtype=float)
+        normals = Utils.curve_normals(line[:, 0], line[:, 1])
+        if direction == 4:
+            normals = normals.mean(axis=0)
+        layers = line + spacing[1:, np.newaxis, np.newaxis] * normals
+        self.setNodes(np.concatenate((self.nodes, layers)))
 
     def distribute(self, direction='u', number=0, type='constant'):
 
         if direction == 'u':
-            line = np.array(self.getULines()[number])
+            line = self.getULinesArray()[number]
         elif direction == 'v':
-            line = np.array(self.getVLines()[number])
+            line = self.getVLinesArray()[number]
 
-        # interpolate B-spline through data points
-        # here, a linear interpolant is derived "k=1"
-        # splprep returns:
-        # tck ... tuple (t,c,k) containing the vector of knots,
-        #         the B-spline coefficients, and the degree of the spline.
-        #   u ... array of the parameters for each given point (knot)
-        tck, u = interpolate.splprep(line.T, s=0, k=1)
+        # parametrize the line by its normalized arc length
+        # u ... array of the parameters for each given point
+        u = Utils.arc_length_parameter(line)
 
         if type == 'constant':
             t = np.linspace(0.0, 1.0, num=len(line))
         if type == 'transition':
-            first = np.array(self.getULines()[0])
-            last = np.array(self.getULines()[-1])
-            tck_first, u_first = interpolate.splprep(first.T, s=0, k=1)
-            tck_last, u_last = interpolate.splprep(last.T, s=0, k=1)
+            # first and last u-line parametrized in one go
+            u_first, u_last = \
+                Utils.arc_length_parameter(self.getULinesArray()[[0, -1]])
+            nu = self.getVLinesArray().shape[0]
             if number < 0.0:
-                number = len(self.getVLines())
-            v = float(number) / float(len(self.getVLines()))
+                number = nu
+            v = float(number) / float(nu)
             t = (1.0 - v) * u_first + v * u_last
 
-        # evaluate function at any parameter "0<=t<=1"
-        line = interpolate.splev(t, tck, der=0)
-        line = list(zip(line[0].tolist(), line[1].tolist()))
+        # evaluate the linear interpolant at any parameter "0<=t<=1"
+        line = Utils.resample_polyline(line, t, u=u)
 
         if direction == 'u':
-            self.getULines()[number] = line
+            self.getULinesArray()[number] = line
         elif direction == 'v':
-            for i, uline in enumerate(self.getULines()):
-                self.getULines()[i][number] = line[i]
+            self.getVLinesArray()[number] = line
 
     @staticmethod
     def spacing_cell_thickness(cell_thickness=0.04, growth=1.1, divisions=10):
-
-        # add cell thickness of first layer
-        spacing = [cell_thickness]
-
-        for i in range(divisions - 1):
-            spacing.append(spacing[0] + spacing[-1] * growth)
-
-        spacing.insert(0, 0.0)
-
-        length = np.sum(spacing)
-
-        return spacing, length
+        spacing = Spacing.cell_thickness(cell_thickness=cell_thickness,
+                                         growth=growth,
+                                         divisions=divisions)
+        return spacing, spacing[-1]
 
     @staticmethod
     def spacing(divisions=10, ratio=1.0, length=1.0):
@@ -921,26 +1530,8 @@ class BlockMesh:
         Returns:
             array: individual line segment lengths
         """
-
-        if divisions == 1:
-            sp = [0.0, 1.0]
-            return np.array(sp)
-
-        growth = ratio**(1.0 / (float(divisions) - 1.0))
-
-        if growth == 1.0:
-            growth = 1.0 + 1.0e-10
-
-        s = [1.0]
-        for i in range(1, divisions + 1):
-            s.append(growth**i)
-
-        spacing = np.array(s)
-        spacing -= spacing[0]
-        spacing /= spacing[-1]
-        spacing *= length
-
-        return spacing
+        return Spacing.geometric(divisions=divisions, ratio=ratio,
+                                 length=length)
 
     def mapLines(self, line_1, line_2):
         """Map the distribution of points from one line to another line
@@ -953,28 +1544,40 @@ class BlockMesh:
 
     @staticmethod
     def curveNormals(x, y, closed=False):
-        istart = 0
-        iend = 0
-        n = list()
+        return Utils.curve_normals(x, y, closed=closed)
 
-        for i, _ in enumerate(x):
+    def blendNormals(self, exponent=0.6):
+        """Blend the interior nodes towards lines normal to the first u-line
 
-            if closed:
-                if i == len(x) - 1:
-                    iend = -i - 1
-            else:
-                if i == 0:
-                    istart = 1
-                if i == len(x) - 1:
-                    iend = -1
-
-            a = np.array([x[i + 1 + iend] - x[i - 1 + istart],
-                          y[i + 1 + iend] - y[i - 1 + istart]])
-            e = Utils.unit_vector(a)
-            n.append([e[1], -e[0]])
-            istart = 0
-            iend = 0
-        return np.array(n)
+        Near the first u-line, the nodes are moved onto the normals of
+        that line, further away the nodes stay where they are. Used
+        after a transfinite interpolation to get grid lines which leave
+        the inner boundary (nearly) orthogonally.
+
+        Args:
+            exponent (float, optional): Exponent of the blending
+                between the lines normal to the inner boundary (near
+                field) and the current nodes (far field)
+        """
+        # done for all interior nodes at once, first and last u-line
+        # and first and last v-line stay as they are
+        nodes = self.getULinesArray()
+        nlines = nodes.shape[0]
+
+        # normals of the inner line
+        inner = nodes[0]
+        normals = BlockMesh.curveNormals(*inner.T)[np.newaxis, 1:-1]
+
+        pt = nodes[1:-1, 1:-1]
+        pto = inner[np.newaxis, 1:-1]
+        vec = pt - pto
+        # projection of vec into normal
+        dist = np.sum(vec * normals, axis=-1, keepdims=True) / \
+            np.linalg.norm(normals, axis=-1, keepdims=True)
+        pn = pto + dist * normals
+        v = np.arange(1, nlines - 1, dtype=float) / float(nlines)
+        v = v[:, np.newaxis, np.newaxis]**exponent
+        nodes[1:-1, 1:-1] = (1.0 - v) * pn + v * pt
 
     def transfinite(self, boundary=[], ij=[]):
         """Make a transfinite interpolation.
@@ -1001,15 +1604,15 @@ class BlockMesh:
             left = boundary[2]
             right = boundary[3]
         elif ij:
-            lower = self.getULines()[ij[2]][ij[0]:ij[1] + 1]
-            upper = self.getULines()[ij[3]][ij[0]:ij[1] + 1]
-            left = self.getVLines()[ij[0]][ij[2]:ij[3] + 1]
-            right = self.getVLines()[ij[1]][ij[2]:ij[3] + 1]
+            lower = self.getULinesArray()[ij[2], ij[0]:ij[1] + 1]
+            upper = self.getULinesArray()[ij[3], ij[0]:ij[1] + 1]
+            left = self.getVLinesArray()[ij[0], ij[2]:ij[3] + 1]
+            right = self.getVLinesArray()[ij[1], ij[2]:ij[3] + 1]
         else:
-            lower = self.getULines()[0]
-            upper = self.getULines()[-1]
-            left = self.getVLines()[0]
-            right = self.getVLines()[-1]
+            lower = self.getULinesArray()[0]
+            upper = self.getULinesArray()[-1]
+            left = self.getVLinesArray()[0]
+            right = self.getVLinesArray()[-1]
 
         # FIXME
         # FIXME left and right need to swapped from input
@@ -1017,25 +1620,17 @@ class BlockMesh:
         # FIXME like: left, right = right, left
         # FIXME
 
-        lower = np.array(lower)
-        upper = np.array(upper)
-        left = np.array(left)
-        right = np.array(right)
+        # copies, as the block nodes are overwritten below
+        lower = np.array(lower, dtype=float)
+        upper = np.array(upper, dtype=float)
+        left = np.array(left, dtype=float)
+        right = np.array(right, dtype=float)
 
         # convert the block boundary curves into parametric form
         # as curves need to be between 0 and 1
-        # interpolate B-spline through data points
-        # here, a linear interpolant is derived "k=1"
-        # splprep returns:
-        # tck ... tuple (t,c,k) containing the vector of knots,
-        #         the B-spline coefficients, and the degree of the spline.
-        #   u ... array of the parameters for each given point (knot)
-        tck_lower, u_lower = interpolate.splprep(lower.T, s=0, k=1)
-        tck_upper, u_upper = interpolate.splprep(upper.T, s=0, k=1)
-        tck_left, u_left = interpolate.splprep(left.T, s=0, k=1)
-        tck_right, u_right = interpolate.splprep(right.T, s=0, k=1)
-
-        nodes = np.zeros((len(left) * len(lower), 2))
+        # (normalized arc length, i.e. the chord length parametrization)
+        u_lower = Utils.arc_length_parameter(lower)
+        u_left = Utils.arc_length_parameter(left)
 
         # corner points
         c1 = lower[0]
@@ -1043,39 +1638,22 @@ class BlockMesh:
         c3 = lower[-1]
         c4 = upper[-1]
 
-        for i, xi in enumerate(u_lower):
-            for j, eta in enumerate(u_left):
+        # evaluate the Coons patch for all nodes at once
+        # rows (index j) follow the left/right boundaries (parameter eta)
+        # columns (index i) follow the lower/upper boundaries (parameter xi)
+        xi = u_lower[np.newaxis, :, np.newaxis]
+        eta = u_left[:, np.newaxis, np.newaxis]
 
-                node = i * len(u_left) + j
-
-                point = (1.0 - xi) * left[j] + xi * right[j] + \
-                    (1.0 - eta) * lower[i] + eta * upper[i] - \
-                    ((1.0 - xi) * (1.0 - eta) * c1 + (1.0 - xi) * eta * c2 +
-                     xi * (1.0 - eta) * c3 + xi * eta * c4)
-
-                nodes[node, 0] = point[0]
-                nodes[node, 1] = point[1]
-
-        vlines = list()
-        vline = list()
-        i = 0
-        for node in nodes:
-            i += 1
-            vline.append(node)
-            if i % len(left) == 0:
-                vlines.append(vline)
-                vline = list()
-
-        vlines.reverse()
+        nodes = (1.0 - xi) * left[:, np.newaxis] + \
+            xi * right[:, np.newaxis] + \
+            (1.0 - eta) * lower + eta * upper - \
+            ((1.0 - xi) * (1.0 - eta) * c1 + (1.0 - xi) * eta * c2 +
+             xi * (1.0 - eta) * c3 + xi * eta * c4)
 
         if ij:
-            ulines = self.makeUfromV(vlines)
-            n = -1
-            for k in range(ij[2], ij[3] + 1):
-                n += 1
-                self.ULines[k][ij[0]:ij[1] + 1] = ulines[n]
+            self.nodes[ij[2]:ij[3] + 1, ij[0]:ij[1] + 1] = nodes
         else:
-            self.ULines = self.makeUfromV(vlines)
+            self.setNodes(nodes)
 
         return
 
@@ -1095,9 +1673,6 @@ class BlockMesh:
     def writeFLMA(wind_tunnel, name='', depth=0.3):
         '''Write mesh to AVL-FIRE *.flma format'''
 
-        basename = os.path.basename(name)
-        nameroot, extension = os.path.splitext(basename)
-
         mesh = wind_tunnel.mesh
 
         vertices, connectivity = mesh
@@ -1192,8 +1767,7 @@ class BlockMesh:
             f.write('2\n')
             f.write('0 5\n')
 
-            logger.info('FIRE type mesh saved as {}'.
-                        format(os.path.join(OUTPUTDATA, basename)))
+        MeshFiles.log_saved('FIRE type mesh', name)
 
     @staticmethod
     def writeSU2_nolib(wind_tunnel, name=''):
@@ -1203,69 +1777,34 @@ class BlockMesh:
         vertices, connectivity = mesh
         tags = wind_tunnel.boundary_tags
 
-        num_airfoil_edges = len(tags['airfoil'])
-        num_inlet_edges = len(tags['inlet'])
-        num_outlet_edges = len(tags['outlet'])
-        num_top_edges = len(tags['top'])
-        num_bottom_edges = len(tags['bottom'])
-
         with open(name, 'w') as f:
             # write header
-            f.write('%\n')
-            f.write('% Problem dimension\n')
-            f.write('%\n')
-            f.write('NDIME= 2\n')
-
-            f.write('%\n')
-            f.write('% Node coordinates\n')
-            f.write('%\n')
-            f.write('NPOIN= ' + str(len(vertices)) + '\n')
+            MeshFiles.su2_section(f, 'Problem dimension', 'NDIME', 2)
+
+            MeshFiles.su2_section(f, 'Node coordinates', 'NPOIN',
+                                  len(vertices))
             # write vertices
             for i, vertex in enumerate(vertices):
                 f.write(f'{vertex[0]: .8e} {vertex[1]: .8e} {i:<}\n')
 
-            f.write('%\n')
-            f.write('% Element connectivity\n')
-            f.write('%\n')
-            f.write('NELEM= ' + str(len(connectivity)) + '\n')
-            # write elements
+            MeshFiles.su2_section(f, 'Element connectivity', 'NELEM',
+                                  len(connectivity))
+            # write elements (SU2 element type 5 triangle, 9 quadrilateral)
+            element_types = {3: 5, 4: 9}
+            if len(connectivity) and len(connectivity[0]) not in element_types:
+                raise ValueError('SU2 supports only linear elements, not '
+                                 f'{len(connectivity[0])}-node cells.')
             for i, cell in enumerate(connectivity):
-                f.write(f'9 {cell[0]:10d} {cell[1]:10d} {cell[2]:10d} {cell[3]:10d} {i:>10d}\n')
-
-            f.write('%\n')
-            f.write('% Boundary tags\n')
-            f.write('%\n')
-            # write boundary tags
-            f.write('NMARK= 5\n')
-
-            f.write('MARKER_TAG= airfoil\n')
-            f.write('MARKER_ELEMS= ' + str(num_airfoil_edges) + '\n')
-            for edge in tags['airfoil']:
-                f.write(f'3 {edge[0]} {edge[1]}\n')
-
-            f.write('MARKER_TAG= inlet\n')
-            f.write('MARKER_ELEMS= ' + str(num_inlet_edges) + '\n')
-            for edge in tags['inlet']:
-                f.write(f'3 {edge[0]} {edge[1]}\n')
-
-            f.write('MARKER_TAG= outlet\n')
-            f.write('MARKER_ELEMS= ' + str(num_outlet_edges) + '\n')
-            for edge in tags['outlet']:
-                f.write(f'3 {edge[0]} {edge[1]}\n')
-
-            f.write('MARKER_TAG= top\n')
-            f.write('MARKER_ELEMS= ' + str(num_top_edges) + '\n')
-            for edge in tags['top']:
-                f.write(f'3 {edge[0]} {edge[1]}\n')
-
-            f.write('MARKER_TAG= bottom\n')
-            f.write('MARKER_ELEMS= ' + str(num_bottom_edges) + '\n')
-            for edge in tags['bottom']:
-                f.write(f'3 {edge[0]} {edge[1]}\n')
-            
-        basename = os.path.basename(name)
-        logger.info('SU2 type mesh saved as {}'.
-                    format(os.path.join(OUTPUTDATA, basename)))
+                nodes = ' '.join(f'{node:10d}' for node in cell)
+                f.write(f'{element_types[len(cell)]} {nodes} {i:>10d}\n')
+
+            # write boundary tags (SU2 element type 3 line)
+            MeshFiles.su2_markers(
+                f, list(tags), lambda tag: len(tags[tag]),
+                lambda tag: [np.asarray(tags[tag], dtype=int).reshape(-1, 2)],
+                3)
+
+        MeshFiles.log_saved('SU2 type mesh', name)
 
     @staticmethod
     def writeVTK_nolib(wind_tunnel, name=''):
@@ -1276,7 +1815,6 @@ class BlockMesh:
         vertices, connectivity = mesh
         tags = wind_tunnel.boundary_tags
 
-        vertices = [v + (0.0,) for v in vertices]
         # Determine number of points
         num_vertices = len(vertices)
 
@@ -1294,6 +1832,10 @@ class BlockMesh:
                 return 5  # VTK_TRIANGLE
             elif n == 4:
                 return 9  # VTK_QUAD
+            elif n == 8:
+                return 23  # VTK_QUADRATIC_QUAD
+            elif n == 9:
+                return 28  # VTK_BIQUADRATIC_QUAD
             else:
                 raise ValueError(f"No VTK cell type defined for {n}-node cells.")
 
@@ -1309,8 +1851,7 @@ class BlockMesh:
 
         # Process boundary edges (line cells)
         # Assign each boundary name a unique ID starting from 1
-        boundary_names = list(tags.keys())
-        boundary_id_map = {name: i+1 for i, name in enumerate(boundary_names)}
+        boundary_id_map, _ = MeshFiles.tag_numbers(tags)
 
         # Flatten boundary edges into a single connectivity array
         # Each edge is a 2-vertex line cell
@@ -1322,11 +1863,12 @@ class BlockMesh:
         for bname, edges in tags.items():
             for edge in edges:
                 edge = np.array(edge, dtype=int)  # ensure numpy array
-                if len(edge) != 2:
-                    raise ValueError("Boundary edges must have exactly 2 vertices.")
+                if len(edge) not in (2, 3):
+                    raise ValueError("Boundary edges must have 2 or 3 vertices.")
                 boundary_edges.append(edge)
-                boundary_edge_lengths.append(2)
-                boundary_edge_types.append(cell_type_from_length(2))
+                boundary_edge_lengths.append(len(edge))
+                # VTK_LINE or VTK_QUADRATIC_EDGE (mid-edge node last)
+                boundary_edge_types.append(3 if len(edge) == 2 else 21)
                 boundary_edge_ids.append(boundary_id_map[bname])
 
         if len(boundary_edges) > 0:
@@ -1349,10 +1891,7 @@ class BlockMesh:
 
         # Write VTU file in ASCII format
         with open(name, "w") as f:
-            f.write('<?xml version="1.0"?>\n')
-            f.write('<VTKFile type="UnstructuredGrid" version="0.1" byte_order="LittleEndian">\n')
-            f.write('  <UnstructuredGrid>\n')
-            f.write(f'    <Piece NumberOfPoints="{num_vertices}" NumberOfCells="{num_cells}">\n')
+            MeshFiles.vtk_header(f, num_vertices, num_cells)
 
             # Cell Data: boundary_ids
             f.write('      <CellData Scalars="BoundaryID">\n')
@@ -1364,8 +1903,8 @@ class BlockMesh:
             # vertices
             f.write('      <Points>\n')
             f.write('        <DataArray type="Float32" NumberOfComponents="3" format="ascii">\n')
-            for p in vertices:
-                f.write(f'          {p[0]} {p[1]} {p[2]}\n')
+            for x, y in vertices:
+                f.write(f'          {x} {y} 0.0\n')
             f.write('        </DataArray>\n')
             f.write('      </Points>\n')
 
@@ -1388,13 +1927,9 @@ class BlockMesh:
 
             f.write('      </Cells>\n')
 
-            f.write('    </Piece>\n')
-            f.write('  </UnstructuredGrid>\n')
-            f.write('</VTKFile>\n')
+            MeshFiles.vtk_footer(f)
 
-        basename = os.path.basename(name)
-        logger.info('VTK type mesh saved as {}'.
-                    format(os.path.join(OUTPUTDATA, basename)))
+        MeshFiles.log_saved('VTK type mesh', name)
 
     @staticmethod
     def writeGMSH_nolib(wind_tunnel, name=''):
@@ -1404,29 +1939,25 @@ class BlockMesh:
         vertices, connectivity = mesh
         boundaries = wind_tunnel.boundary_tags
 
-        # Assign unique physical tags to boundaries
-        boundary_tags = {name: idx + 1 for idx, name in enumerate(boundaries.keys())}
-        num_physical_names = len(boundaries) + 1  # +1 for the domain (elements)
+        # GMSH element types of the cells by their number of vertices
+        element_types = {3: 2,    # triangle
+                         4: 3,    # quadrangle
+                         6: 9,    # 6-node second order triangle
+                         8: 16,   # 8-node second order quadrangle
+                         9: 10}   # 9-node second order quadrangle
 
-        # Assign a physical tag for the domain elements
-        domain_physical_tag = num_physical_names
+        cells = np.asarray(connectivity)
+        if len(cells) and cells.shape[1] not in element_types:
+            raise ValueError(f"Unsupported element with {cells.shape[1]} nodes.")
+
+        edges = {name: np.asarray(tag, dtype=int)
+                 for name, tag in boundaries.items()}
 
         # Write the mesh file
         with open(name, 'w') as f:
-            # Write MeshFormat section
-            f.write('$MeshFormat\n')
-            f.write('2.2 0 8\n')  # Version 2.2, ASCII mode, size of double precision
-            f.write('$EndMeshFormat\n')
-
-            # Write PhysicalNames section
-            f.write('$PhysicalNames\n')
-            f.write(f'{num_physical_names}\n')
-            # Write boundary physical names
-            for name1, tag in boundary_tags.items():
-                f.write(f'1 {tag} "{name1}"\n')  # Dimension 1 for lines
-            # Write domain physical name
-            f.write(f'2 {domain_physical_tag} "Domain"\n')  # Dimension 2 for surface elements
-            f.write('$EndPhysicalNames\n')
+            # Write MeshFormat and PhysicalNames sections
+            physical_tags, domain_physical_tag = \
+                MeshFiles.gmsh_header(f, list(boundaries), 2)
 
             # Write Nodes section
             f.write('$Nodes\n')
@@ -1436,61 +1967,24 @@ class BlockMesh:
                 f.write(f'{idx} {x: .8e} {y: .8e} {z: .8e}\n')
             f.write('$EndNodes\n')
 
-            # Prepare elements
-            elements_data = []
-            elem_id = 1
-
-            # Write boundary edge elements
-            for name1, edges in boundaries.items():
-                physical_tag = boundary_tags[name1]
-                geometrical_tag = physical_tag  # For simplicity, set geometrical tag equal to physical tag
-                element_type = 1  # Line elements
-                num_tags = 2
-                for edge in edges:
-                    node1, node2 = edge
-                    elements_data.append((elem_id,
-                                          element_type,
-                                          num_tags,
-                                          physical_tag,
-                                          geometrical_tag,
-                                          [node1+1, node2+1])) # +1 to match GMSH 1-based indexing
-                    elem_id += 1
-
-            # Write domain elements
-            for elem_nodes in connectivity:
-                num_nodes = len(elem_nodes)
-                if num_nodes == 3:
-                    element_type = 2  # Triangle
-                elif num_nodes == 4:
-                    element_type = 3  # Quadrangle
-                elif num_nodes == 6:
-                    element_type = 9  # 6-node second order triangle
-                elif num_nodes == 8:
-                    element_type = 16  # 8-node second order quadrangle
-                else:
-                    raise ValueError(f"Unsupported element with {num_nodes} nodes.")
-
-                num_tags = 2
-                physical_tag = domain_physical_tag
-                geometrical_tag = physical_tag
-                elements_data.append((elem_id,
-                                      element_type,
-                                      num_tags,
-                                      physical_tag,
-                                      geometrical_tag,
-                                      [node+1 for node in elem_nodes])) # +1 to match GMSH 1-based indexing
-                elem_id += 1
-
-            # Write Elements section
+            # Write Elements section, boundary edges first, then the cells
             f.write('$Elements\n')
-            f.write(f'{len(elements_data)}\n')
-            for elem in elements_data:
-                elem_id, elem_type, num_tags, physical_tag, geometrical_tag, node_ids = elem
-                node_ids_str = ' '.join(map(str, node_ids))
-                f.write(f'{elem_id} {elem_type} {num_tags} {physical_tag} {geometrical_tag} {node_ids_str}\n')
+            f.write(f'{sum(map(len, edges.values())) + len(cells)}\n')
+            elem_id = 1
+            for name1, tag_edges in edges.items():
+                if len(tag_edges):
+                    # line or 3-node second order line (mid-edge node last)
+                    element_type = 1 if tag_edges.shape[1] == 2 else 8
+                    elem_id = MeshFiles.gmsh_elements(
+                        f, elem_id, element_type, physical_tags[name1],
+                        tag_edges)
+            if len(cells):
+                MeshFiles.gmsh_elements(f, elem_id,
+                                        element_types[cells.shape[1]],
+                                        domain_physical_tag, cells)
             f.write('$EndElements\n')
-                    
-        logger.info(f'GMSH type mesh saved as {name}')
+
+        MeshFiles.log_saved('GMSH type mesh', name)
 
 
 class Smooth:
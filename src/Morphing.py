@@ -0,0 +1,184 @@
+import copy
+import numpy as np
+from scipy import spatial
+
+from CompactMesh import CompactMesh
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Morphing:
+    """Deform an existing mesh to a modified airfoil contour
+
+    The displacements of the contour points are spread into the mesh by
+    inverse distance weighting of the nearest contour points. Only
+    contour points within the support radius are used (KD-tree query)
+    and the displacement decays smoothly to zero at the support radius
+    (Wendland C2 function of the distance to the nearest contour point).
+    Mesh topology, connectivity and boundary tags stay the same.
+    """
+
+    def __init__(self, contour, new_contour, radius=0.5, exponent=3.0,
+                 neighbours=32):
+        """
+        Args:
+            contour (tuple): x and y coordinates of the contour the mesh
+                was made for
+            new_contour (tuple): x and y coordinates of the modified
+                contour, same number of points
+            radius (float, optional): Support radius, mesh nodes further
+                away from the contour are not moved
+            exponent (float, optional): Exponent of the inverse distance
+                weights
+            neighbours (int, optional): Maximum number of contour points
+                used for each mesh node
+
+        Raises:
+            ValueError: If the contours have a different number of points
+        """
+        self.points = np.stack(contour, axis=-1)
+        new_points = np.stack(new_contour, axis=-1)
+
+        if self.points.shape != new_points.shape:
+            raise ValueError('Modified contour has {} points, the mesh was '
+                             'made for {} points.'.
+                             format(len(new_points), len(self.points)))
+
+        self.displacements = new_points - self.points
+        self.radius = radius
+        self.exponent = exponent
+        self.neighbours = min(neighbours, len(self.points))
+        self.tree = spatial.cKDTree(self.points)
+
+    def displacement(self, nodes, chunk=65536):
+        """Displacement of arbitrary mesh nodes
+
+        Args:
+            nodes (np.array): Node coordinates of shape (n, 2)
+            chunk (int, optional): Number of nodes processed at once
+
+        Returns:
+            np.array: Displacements of shape (n, 2)
+        """
+        nodes = np.asarray(nodes, dtype=float)
+        displacements = np.zeros_like(nodes)
+        missing = len(self.points)
+
+        for start in range(0, len(nodes), chunk):
+            distances, ids = self.tree.query(
+                nodes[start:start + chunk], k=self.neighbours,
+                distance_upper_bound=self.radius)
+            distances = distances.reshape(len(distances), -1)
+            ids = ids.reshape(len(ids), -1)
+
+            inside = np.isfinite(distances[:, 0])
+            distances, ids = distances[inside], ids[inside]
+            found = ids < missing
+
+            # nodes on the contour follow it exactly
+            on_contour = distances[:, 0] < 1.e-12
+            safe = np.where(found, np.maximum(distances, 1.e-12), 1.0)
+            weights = np.where(found, safe**-self.exponent, 0.0)
+            weights[on_contour] = 0.0
+            weights[on_contour, 0] = 1.0
+
+            ids = np.where(found, ids, 0)
+            moved = np.einsum('ij,ijk->ik', weights, self.displacements[ids])
+            moved /= np.sum(weights, axis=1)[:, np.newaxis]
+
+            # smooth decay to zero at the support radius
+            r = distances[:, 0] / self.radius
+            moved *= ((1.0 - r)**4 * (4.0 * r + 1.0))[:, np.newaxis]
+
+            displacements[start:start + chunk][inside] = moved
+
+        return displacements
+
+    def morph(self, wind_tunnel):
+        """Move the nodes of the mesh and of its blocks
+
+        The blocks and the mesh vertices are replaced, not changed in
+        place: the blocks and the connected mesh can be outputs of the
+        mesh stages, which are reused by the next mesh generation (see
+        Windtunnel.makeStages).
+
+        Args:
+            wind_tunnel (Windtunnel): Instance with a generated mesh,
+                modified in place
+
+        Returns:
+            dict: Maximum displacement, number of moved vertices, number
+                of inverted cells and mesh quality (k2inf, min/mean/max)
+                before and after
+        """
+        vertices, connectivity = wind_tunnel.mesh
+        vertices = np.asarray(vertices, dtype=float)
+
+        area_before = self.signedArea(vertices, connectivity)
+        quality_before = np.array(wind_tunnel.MeshQuality())
+
+        displacements = self.displacement(vertices)
+        new_vertices = vertices + displacements
+
+        if isinstance(wind_tunnel.mesh, CompactMesh):
+            wind_tunnel.mesh.vertices = new_vertices.astype(
+                wind_tunnel.mesh.vertices.dtype)
+        else:
+            adjacency = wind_tunnel.getAdjacency()
+            wind_tunnel.mesh = (list(map(tuple, new_vertices.tolist())),
+                                connectivity)
+            # the connectivity is the same, so are the adjacency tables
+            wind_tunnel.adjacency = (wind_tunnel.mesh, adjacency)
+
+        morphed = dict()
+        for block in wind_tunnel.blocks:
+            nodes = block.getULinesArray()
+            moved = nodes.reshape(-1, 2) + \
+                self.displacement(nodes.reshape(-1, 2))
+            morphed[id(block)] = copy.copy(block)
+            morphed[id(block)].setNodes(moved.reshape(nodes.shape))
+
+        wind_tunnel.blocks = [morphed[id(block)]
+                              for block in wind_tunnel.blocks]
+        for name in ('block_airfoil', 'block_te', 'block_tunnel',
+                     'block_tunnel_wake', 'block_cgrid'):
+            block = getattr(wind_tunnel, name, None)
+            if id(block) in morphed:
+                setattr(wind_tunnel, name, morphed[id(block)])
+
+        area_after = self.signedArea(new_vertices, connectivity)
+        quality_after = np.array(wind_tunnel.MeshQuality())
+
+        def statistics(quality):
+            return quality.min(), quality.mean(), quality.max()
+
+        report = {
+            'max_displacement':
+                np.linalg.norm(displacements, axis=1).max(),
+            'moved_vertices': int(np.count_nonzero(
+                np.any(displacements != 0.0, axis=1))),
+            'inverted_cells': int(np.count_nonzero(
+                np.sign(area_after) != np.sign(area_before))),
+            'quality_before': statistics(quality_before),
+            'quality_after': statistics(quality_after),
+            'quality_change_max':
+                np.abs(quality_after - quality_before).max()}
+
+        logger.info('Mesh morphed: {} vertices moved (max {:.3e}), {} '
+                    'inverted cells, worst cell quality {:.4f} -> {:.4f}'.
+                    format(report['moved_vertices'],
+                           report['max_displacement'],
+                           report['inverted_cells'],
+                           report['quality_before'][2],
+                           report['quality_after'][2]))
+
+        return report
+
+    @staticmethod
+    def signedArea(vertices, connectivity):
+        """Signed area of each cell (shoelace formula)"""
+        corners = np.asarray(vertices)[np.asarray(connectivity)]
+        x, y = corners[..., 0], corners[..., 1]
+        return 0.5 * np.sum(x * np.roll(y, -1, axis=1) -
+                            np.roll(x, -1, axis=1) * y, axis=1)
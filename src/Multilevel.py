@@ -0,0 +1,300 @@
+"""
+Multilevel mesh hierarchy of a single block C-grid
+
+The C-grid (see Windtunnel.CGridMesh) is generated once. Coarser levels
+take every second node in both directions, finer levels insert one node
+between each pair of nodes on cubic splines through the grid lines. The
+grid lines are splined piecewise between the columns and rows where the
+parts of the C-grid meet (trailing edge, wake cut, near wall layers), so
+kinks of the block are kept.
+
+Each level is a Windtunnel instance whose connectivity and boundary tags
+come from index arithmetic (Connect.connectCGrid and
+Windtunnel.makeBoundariesCGrid), so all mesh writers can be used for it.
+"""
+
+import os
+import numpy as np
+from scipy import interpolate
+
+import Meshing
+import Connect
+from Utils import Utils
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def coarsen(nodes, breaks):
+    """Take every second node of a block in both directions
+
+    Args:
+        nodes (np.array): Block nodes of shape (nv, nu, 2)
+        breaks (tuple): Columns and rows which have to be kept
+
+    Returns:
+        tuple: Nodes and breaks of the coarse block
+
+    Raises:
+        ValueError: If a column or row of the breaks (including the
+            last ones) has an odd index
+    """
+    u_breaks, v_breaks = breaks
+    nv, nu = nodes.shape[:2]
+
+    for direction, indices in (('u', u_breaks + [nu - 1]),
+                               ('v', v_breaks + [nv - 1])):
+        odd = [index for index in indices if index % 2]
+        if odd:
+            raise ValueError('Block can not be coarsened, odd number of '
+                             'divisions up to {} in {}-direction.'.
+                             format(odd, direction))
+
+    return nodes[::2, ::2], ([b // 2 for b in u_breaks],
+                             [b // 2 for b in v_breaks])
+
+
+def refine(nodes, breaks):
+    """Insert one node between each pair of nodes in both directions
+
+    The new nodes lie on cubic splines (node index as parameter) through
+    the grid lines, piecewise between the breaks.
+
+    Args:
+        nodes (np.array): Block nodes of shape (nv, nu, 2)
+        breaks (tuple): Columns and rows where the grid lines may have
+            kinks
+
+    Returns:
+        tuple: Nodes and breaks of the fine block
+    """
+    u_breaks, v_breaks = breaks
+    nodes = _refine_lines(nodes, u_breaks, axis=1)
+    nodes = _refine_lines(nodes, v_breaks, axis=0)
+    return nodes, ([2 * b for b in u_breaks], [2 * b for b in v_breaks])
+
+
+def _refine_lines(nodes, breaks, axis):
+    """Subdivide all grid lines along one axis at once"""
+    n = nodes.shape[axis]
+    bounds = sorted(set(breaks) | {0, n - 1})
+
+    refined = [np.take(nodes, [0], axis=axis)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        index = np.arange(start, end + 1)
+        spline = interpolate.CubicSpline(index,
+                                         np.take(nodes, index, axis=axis),
+                                         axis=axis)
+        refined.append(spline(np.arange(start + 0.5, end + 0.25, 0.5)))
+
+    return np.concatenate(refined, axis=axis)
+
+
+def compatible_settings(contour, coarse=1, divisions=15,
+                        divisions_height=100, divisions_wake=100,
+                        te_divisions=3):
+    """Round up C-grid settings so that the grid can be coarsened
+
+    All parts of the C-grid need a number of divisions which is a
+    multiple of 2**coarse. Missing contour points are inserted at the
+    middle of the longest contour segments on a cubic spline through
+    the contour.
+
+    Args:
+        contour (tuple): x and y coordinates of the airfoil contour
+        coarse (int, optional): Number of coarser levels
+        divisions (int, optional): Number of layers near the wall
+        divisions_height (int, optional): Divisions of the tunnel height
+        divisions_wake (int, optional): Divisions of the wake cut
+        te_divisions (int, optional): Divisions of a blunt trailing edge
+
+    Returns:
+        tuple: contour and dictionary of the rounded divisions
+    """
+    multiple = 2**coarse
+
+    def round_up(value):
+        return multiple * int(np.ceil(value / multiple))
+
+    points = np.stack(contour, axis=-1)
+    missing = -(len(points) - 1) % multiple
+    if missing:
+        s = Utils.arc_length_parameter(points)
+        longest = np.sort(np.argsort(np.diff(s))[-missing:])
+        spline = interpolate.CubicSpline(s, points, axis=0)
+        new = spline(0.5 * (s[longest] + s[longest + 1]))
+        points = np.insert(points, longest + 1, new, axis=0)
+
+    # CGridMesh divides a blunt trailing edge into two halves
+    base = max(1, (te_divisions + 1) // 2)
+
+    settings = {'divisions': round_up(divisions),
+                'divisions_height': round_up(divisions_height),
+                'divisions_wake': round_up(divisions_wake),
+                'te_divisions': 2 * round_up(base)}
+
+    logger.info('C-grid divisions for {} coarser levels: {}, {} contour '
+                'points inserted'.format(coarse, settings, missing))
+
+    return (points[:, 0], points[:, 1]), settings
+
+
+class MeshHierarchy:
+    """Coarser and finer levels of a C-grid from one generated grid
+
+    Attributes:
+        levels (list): Windtunnel instances, from the finest to the
+            coarsest level
+    """
+
+    def __init__(self, wind_tunnel, coarse=1, fine=0, dtype=None):
+        """
+        Args:
+            wind_tunnel (Windtunnel): Instance with a C-grid made by
+                Windtunnel.CGridMesh (the generated level)
+            coarse (int, optional): Number of coarser levels
+            fine (int, optional): Number of finer levels
+            dtype (np.dtype, optional): If given, the levels are stored
+                as CompactMesh with this coordinate type
+
+        Raises:
+            ValueError: If the C-grid can not be coarsened (see
+                compatible_settings)
+        """
+        self.tunnel_height = wind_tunnel.tunnel_height
+        self.dtype = dtype
+
+        nodes = wind_tunnel.block_cgrid.getULinesArray()
+        breaks = wind_tunnel.cgrid_breaks
+        wake = wind_tunnel.cgrid_cut - 1
+        tunnel_breaks = wind_tunnel.cgrid_tunnel_breaks
+
+        generated = [(nodes, breaks, wake, tunnel_breaks)]
+        for _ in range(fine):
+            nodes, breaks, wake, tunnel_breaks = generated[0]
+            nodes, breaks = refine(nodes, breaks)
+            self.projectFarfield(nodes[-1, 1::2])
+            tunnel_breaks = self.refineTunnelBreaks(nodes[-1],
+                                                    tunnel_breaks)
+            generated.insert(0, (nodes, breaks, 2 * wake, tunnel_breaks))
+        for _ in range(coarse):
+            nodes, breaks, wake, tunnel_breaks = generated[-1]
+            # node 2 * i of the fine level is node i of the coarse level
+            tunnel_breaks = tuple((b + 1) // 2 for b in tunnel_breaks)
+            generated.append(coarsen(nodes, breaks) +
+                             (wake // 2, tunnel_breaks))
+
+        # index of the generated level
+        self.generated = fine
+
+        self.levels = [self.makeLevel(nodes, breaks, wake + 1, tunnel_breaks)
+                       for nodes, breaks, wake, tunnel_breaks in generated]
+
+    def projectFarfield(self, outer):
+        """Move inserted nodes back onto the windtunnel boundary
+
+        The splines through the outermost grid line deviate slightly
+        from the straight lines and the half circle of the windtunnel
+        boundary (see Windtunnel.CGridMesh).
+
+        Args:
+            outer (np.array): Inserted nodes of the outermost u-line,
+                modified in place
+        """
+        height = self.tunnel_height
+
+        circle = outer[:, 0] < 0.0
+        radius = np.linalg.norm(outer[circle], axis=-1)
+        outer[circle] *= height / radius[:, np.newaxis]
+        outer[~circle, 1] = np.copysign(height, outer[~circle, 1])
+
+    @staticmethod
+    def refineTunnelBreaks(outer, breaks):
+        """Tunnel breaks of a refined C-grid
+
+        See Windtunnel.CGridMesh for the tunnel breaks. The node
+        inserted between a straight line and the half circle belongs to
+        the straight line if projectFarfield moved it there.
+
+        Args:
+            outer (np.array): Outermost u-line of the refined block
+            breaks (tuple): Tunnel breaks of the coarse block
+
+        Returns:
+            tuple: Tunnel breaks of the refined block
+        """
+        upper_end, lower_start = 2 * breaks[0] - 1, 2 * breaks[1]
+        if outer[upper_end, 0] >= 0.0:
+            upper_end += 1
+        if outer[lower_start - 1, 0] >= 0.0:
+            lower_start -= 1
+        return upper_end, lower_start
+
+    def makeLevel(self, nodes, breaks, cut, tunnel_breaks):
+        """Windtunnel instance with mesh and boundaries of one level"""
+        block = Meshing.BlockMesh(name='block_cgrid')
+        block.setNodes(nodes)
+
+        level = Meshing.Windtunnel()
+        level.blocks = [block]
+        level.block_cgrid = block
+        level.cgrid_breaks = breaks
+        level.cgrid_cut = cut
+        level.cgrid_tunnel_breaks = tunnel_breaks
+        level.tunnel_height = self.tunnel_height
+
+        connect = Connect.Connect(None)
+        vertices, connectivity, level.node_ids = \
+            connect.connectCGrid(block, level.cgrid_cut)
+        level.mesh = vertices, connectivity
+        if self.dtype:
+            level.makeCompact(dtype=self.dtype)
+        level.makeLCV()
+        level.makeLCE()
+        level.makeBoundariesCGrid(level.node_ids)
+
+        return level
+
+    def restriction(self, level):
+        """Vertices of a level which are kept on the next coarser level
+
+        Args:
+            level (int): Level number (0 is the finest level)
+
+        Returns:
+            np.array: Vertex number on the fine level for each vertex
+                of the coarse level (injection for multigrid)
+        """
+        fine = self.levels[level].node_ids
+        coarse = self.levels[level + 1].node_ids
+
+        ids = np.empty(coarse.max() + 1, dtype=fine.dtype)
+        ids[coarse] = fine[::2, ::2]
+
+        return ids
+
+    def export(self, basename, formats=('SU2',)):
+        """Write all levels in one call
+
+        The level number is appended to the file name, level 0 is the
+        finest level.
+
+        Args:
+            basename (str): Path and file name without extension
+            formats (list, optional): Output formats, see Meshing.WRITERS
+
+        Returns:
+            list: Names of the written files
+        """
+        names = list()
+        for number, level in enumerate(self.levels):
+            for output_format in formats:
+                writer, extension = Meshing.WRITERS[output_format]
+                name = '{}_L{}{}'.format(basename, number, extension)
+                getattr(Meshing.BlockMesh, writer)(level, name=name)
+                names.append(name)
+
+        logger.info('Mesh hierarchy with {} levels saved as {}_L*'.
+                    format(len(self.levels), os.path.basename(basename)))
+
+        return names
@@ -8,6 +8,7 @@ from PySide6 import QtGui, QtCore
 import GraphicsItemsCollection as gic
 import GraphicsItem
 import Connect
+import Adjacency
 import logging
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,15 @@ class SmoothAngleBased:
     This class contains the corrected equations.
     """
 
-    def __init__(self, data, data_source='block'):
+    def __init__(self, data, data_source='block', adjacency=None):
+        """
+        Args:
+            data (BlockMesh or tuple): Block or mesh (vertices and
+                connectivity) to be smoothed
+            data_source (str, optional): 'block' or 'mesh'
+            adjacency (Adjacency.Adjacency, optional): Shared adjacency
+                tables of the mesh, e.g. from Windtunnel.getAdjacency
+        """
 
         # get MainWindow instance (overcomes handling parents)
         self.mainwindow = QtCore.QCoreApplication.instance().mainwindow
@@ -44,6 +53,10 @@ class SmoothAngleBased:
         if data_source == 'mesh':
             self.mesh = data
 
+        if adjacency is None:
+            adjacency = Adjacency.Adjacency(self.mesh)
+        self.adjacency = adjacency
+
         lvc = self.makeLVC()
         self.stencils = self.make_stencil(lvc)
 
@@ -51,14 +64,14 @@ class SmoothAngleBased:
 
     def makeLVC(self):
         _, connectivity = self.mesh
-        nodes = set([node for cell in connectivity for node in cell])
-
-        self.lvc = dict()
         conn = np.array(connectivity)
 
-        for node in nodes:
-            cells, _ = np.where(conn == node)
-            self.lvc.setdefault(node, []).append([conn[cell] for cell in cells])
+        # cells at each vertex from the CSR vertex to cell table
+        indptr, indices = self.adjacency.vertexCells()
+        used = np.flatnonzero(np.diff(indptr))
+
+        self.lvc = {node: [conn[indices[indptr[node]:indptr[node + 1]]]]
+                    for node in used.tolist()}
 
         return self.lvc
 
@@ -292,7 +305,7 @@ class SmoothAngleBased:
         self.new_ulines = list()
 
         j = -1
-        for uline in self.block.getULines():
+        for uline in self.block.getULinesArray():
             new_uline = list()
             for i in range(len(uline)):
                 j += 1
@@ -0,0 +1,214 @@
+"""
+Grid point distributions (spacing functions) along a line
+
+All functions return the positions of divisions + 1 points,
+starting at 0.0 and ending at the length of the line.
+They are evaluated in closed form for all points at once.
+
+References:
+  - Vinokur, M.: On one-dimensional stretching functions for
+    finite-difference calculations, J. Comp. Physics 50, 1983
+  - Thompson, J.F., Soni, B.K., Weatherill, N.P.: Handbook of grid
+    generation, CRC Press, 1999 (chapter 32)
+"""
+
+import numpy as np
+from scipy import optimize
+
+
+def geometric(divisions=10, ratio=1.0, length=1.0):
+    """Geometric growth of the cell size along a line
+
+    Args:
+        divisions (int, optional): Number of subdivisions
+        ratio (float, optional): Ratio of last to first subdivision size
+        length (float, optional): Length of line
+
+    Returns:
+        np.array: Point positions along the line
+    """
+    if divisions == 1:
+        return np.array([0.0, length])
+
+    growth = ratio**(1.0 / (float(divisions) - 1.0))
+
+    if growth == 1.0:
+        return np.linspace(0.0, length, divisions + 1)
+
+    spacing = growth**np.arange(divisions + 1, dtype=float)
+    spacing -= spacing[0]
+    spacing /= spacing[-1]
+    spacing *= length
+
+    return spacing
+
+
+def cell_thickness(cell_thickness=0.04, growth=1.1, divisions=10):
+    """Geometric growth starting from a given first cell size
+
+    Args:
+        cell_thickness (float, optional): Size of the first cell
+        growth (float, optional): Ratio of two adjacent cell sizes
+        divisions (int, optional): Number of subdivisions
+
+    Returns:
+        np.array: Point positions along the line
+    """
+    k = np.arange(divisions + 1, dtype=float)
+
+    if growth == 1.0:
+        return cell_thickness * k
+
+    return cell_thickness * (growth**k - 1.0) / (growth - 1.0)
+
+
+def tanh_one_sided(divisions=10, delta=2.0, length=1.0):
+    """One-sided hyperbolic tangent stretching
+
+    Points are clustered at the start of the line.
+
+    Args:
+        divisions (int, optional): Number of subdivisions
+        delta (float, optional): Stretching parameter (> 0)
+        length (float, optional): Length of line
+
+    Returns:
+        np.array: Point positions along the line
+    """
+    xi = np.linspace(0.0, 1.0, divisions + 1)
+    spacing = 1.0 + np.tanh(delta * (xi - 1.0)) / np.tanh(delta)
+    spacing[[0, -1]] = 0.0, 1.0
+    return length * spacing
+
+
+def tanh_two_sided(divisions=10, delta=2.0, center=0.5, length=1.0,
+                   normalized=True):
+    """Two-sided hyperbolic tangent stretching
+
+    Points are clustered at both ends of the line (symmetric for
+    center=0.5). The argument of the tanh runs from -delta * center to
+    delta * (1 - center).
+
+    Args:
+        divisions (int, optional): Number of subdivisions
+        delta (float, optional): Stretching parameter (> 0)
+        center (float, optional): Position of the tanh inflection point
+        length (float, optional): Length of line
+        normalized (bool, optional): If False, the tanh distribution is
+            not stretched onto the full line, i.e. the first and last
+            points are 0.5 * (1 + tanh(...)) at the ends of the window
+
+    Returns:
+        np.array: Point positions along the line
+    """
+    x = np.linspace(-delta * center, delta * (1.0 - center), divisions + 1)
+    spacing = 0.5 * (np.tanh(x) + 1.0)
+
+    if normalized:
+        spacing = (spacing - spacing[0]) / (spacing[-1] - spacing[0])
+
+    return length * spacing
+
+
+def vinokur(divisions=10, first=0.1, last=0.1, length=1.0):
+    """Two-sided stretching with prescribed first and last cell size
+
+    Vinokur's stretching function. The first and last cell sizes are
+    matched to first order, which is exact enough for grid generation.
+
+    Args:
+        divisions (int, optional): Number of subdivisions
+        first (float, optional): Size of the first cell
+        last (float, optional): Size of the last cell
+        length (float, optional): Length of line
+
+    Returns:
+        np.array: Point positions along the line
+    """
+    s0 = first / length
+    s1 = last / length
+
+    a = np.sqrt(s1 / s0)
+    b = 1.0 / (divisions * np.sqrt(s0 * s1))
+    xi = np.linspace(0.0, 1.0, divisions + 1)
+
+    if abs(b - 1.0) < 1.e-6:
+        u = xi
+    elif b > 1.0:
+        dy = _solve_sinc(b, hyperbolic=True)
+        u = 0.5 * (1.0 + np.tanh(dy * (xi - 0.5)) / np.tanh(0.5 * dy))
+    else:
+        dy = _solve_sinc(b, hyperbolic=False)
+        u = 0.5 * (1.0 + np.tan(dy * (xi - 0.5)) / np.tan(0.5 * dy))
+
+    spacing = u / (a + (1.0 - a) * u)
+    spacing[[0, -1]] = 0.0, 1.0
+
+    return length * spacing
+
+
+def _solve_sinc(b, hyperbolic=True):
+    """Solve sinh(y) / y = b (b > 1) or sin(y) / y = b (b < 1) for y"""
+    if hyperbolic:
+        upper = 1.0
+        while np.sinh(upper) / upper < b:
+            upper *= 2.0
+        return optimize.brentq(lambda y: np.sinh(y) / y - b, 1.e-12, upper)
+    return optimize.brentq(lambda y: np.sin(y) / y - b, 1.e-12,
+                           np.pi - 1.e-12)
+
+
+def growth_rate(first=None, last=None, length=None, cells=None):
+    """Growth rate of a geometric distribution
+
+    Computes the ratio of two adjacent cell sizes from any three of
+    first cell size, last cell size, total length and number of cells.
+    If the number of cells is not given, it is rounded to the nearest
+    integer and the growth rate is recomputed so that first cell size
+    and length are met exactly.
+
+    Args:
+        first (float, optional): Size of the first cell
+        last (float, optional): Size of the last cell
+        length (float, optional): Length of line
+        cells (int, optional): Number of cells
+
+    Returns:
+        tuple: growth rate and number of cells
+    """
+    given = [value is not None for value in (first, last, length, cells)]
+    if sum(given) < 3:
+        raise ValueError('Three of first, last, length and cells '
+                         'need to be specified.')
+
+    if cells is None:
+        if np.isclose(first, last):
+            cells = max(1, int(round(length / first)))
+            return growth_rate(first=first, length=length, cells=cells)
+        growth = (length - first) / (length - last)
+        cells = 1 + np.log(last / first) / np.log(growth)
+        cells = max(1, int(round(cells)))
+        return growth_rate(first=first, length=length, cells=cells)
+
+    if cells == 1:
+        return 1.0, cells
+
+    if first is not None and last is not None:
+        return (last / first)**(1.0 / (cells - 1.0)), cells
+
+    # only one end cell is given, the length has to be matched
+    if first is None:
+        growth, _ = growth_rate(first=last, length=length, cells=cells)
+        return 1.0 / growth, cells
+
+    def residual(g):
+        if abs(g - 1.0) < 1.e-12:
+            return first * cells - length
+        return first * (g**cells - 1.0) / (g - 1.0) - length
+
+    if np.isclose(first * cells, length, rtol=1.e-12):
+        return 1.0, cells
+    if first * cells < length:
+        upper = (length / first)**(1.0 / (cells - 1.0))
+        return optimize.brentq(residual, 1.0, upper), cells
+    return optimize.brentq(residual, 1.e-12, 1.0), cells
@@ -6,6 +6,7 @@ from scipy import interpolate
 from PySide6 import QtGui, QtCore
 
 from Utils import Utils
+import Spacing
 import GraphicsItemsCollection as gic
 import GraphicsItem
 
@@ -310,18 +311,12 @@ class SplineRefine:
         y = np.delete(y, index)
         t = np.delete(t, index)
 
-        # add refined points
-        for s in spacing[::-1]:
-            # upper side
-            p = interpolate.splev(s, tck, der=0)
-            x = np.insert(x, 0, p[0])
-            y = np.insert(y, 0, p[1])
-            t = np.insert(t, 0, s)
-            # lower side
-            p = interpolate.splev(1. - s, tck, der=0)
-            x = np.append(x, p[0])
-            y = np.append(y, p[1])
-            t = np.append(t, 1. - s)
+        # add refined points (upper side at the start, lower side at the end)
+        xu, yu = interpolate.splev(spacing, tck, der=0)
+        xl, yl = interpolate.splev(1. - spacing[::-1], tck, der=0)
+        x = np.concatenate((xu, x, xl))
+        y = np.concatenate((yu, y, yl))
+        t = np.concatenate((spacing, t, 1. - spacing[::-1]))
 
         # update coordinate array, including inserted points
         self.spline_data[0] = (x, y)
@@ -342,25 +337,8 @@ class SplineRefine:
         Returns:
             TYPE: Description
         """
-        if divisions == 1:
-            sp = [0.0, 1.0]
-            return np.array(sp)
-
-        growth = ratio**(1.0 / (float(divisions) - 1.0))
-
-        if growth == 1.0:
-            growth = 1.0 + 1.0e-10
-
-        s0 = 1.0
-        s = [s0]
-        for i in range(1, divisions + 1):
-            app = s0 * growth**i
-            s.append(app)
-        sp = np.array(s)
-        sp -= sp[0]
-        sp /= sp[-1]
-        sp *= thickness
-        return sp
+        return Spacing.geometric(divisions=divisions, ratio=ratio,
+                                 length=thickness)
 
     def writeContour(self):
 
@@ -0,0 +1,116 @@
+"""
+Memoized stages of the mesh generation
+
+The mesh generation is a directed acyclic graph of stages (blocks,
+connectivity, edges, boundaries). Each stage is identified by a key made
+from its own input parameters and the keys of its upstream stages. The
+output of a stage is kept in a cache together with its key, so a stage
+only runs again if one of its inputs or one of its upstream stages
+changed. The cache is a plain dictionary which can be kept between
+mesh generations.
+"""
+
+import hashlib
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache (dict, optional): Stage name -> (key, output) of
+                previous runs, updated in place
+        """
+        self.cache = cache if cache is not None else dict()
+
+        # stage name -> (function, upstream stage names, parameters)
+        self.stages = dict()
+
+        # keys and outputs of the stages evaluated with this graph
+        self.keys = dict()
+        self.outputs = dict()
+
+    def add(self, stage, function, upstream=(), **parameters):
+        """Add a stage to the graph
+
+        The function is called with the outputs of the upstream stages
+        (positional, in the given order) and the parameters (keywords).
+
+        Args:
+            stage (str): Name of the stage
+            function (callable): Computes the output of the stage
+            upstream (list, optional): Names of the stages the function
+                depends on
+            **parameters: Input parameters of the stage
+        """
+        self.stages[stage] = (function, tuple(upstream), parameters)
+
+    def evaluate(self, stage):
+        """Output of a stage, reused if its key did not change
+
+        Upstream stages are evaluated first (recursively).
+
+        Args:
+            stage (str): Name of the stage
+
+        Returns:
+            object: Output of the stage function
+        """
+        if stage in self.outputs:
+            return self.outputs[stage]
+
+        function, upstream, parameters = self.stages[stage]
+        inputs = [self.evaluate(name) for name in upstream]
+        key = self.fingerprint(parameters,
+                               [self.keys[name] for name in upstream])
+
+        cached = self.cache.get(stage)
+        if cached is not None and cached[0] == key:
+            output = cached[1]
+            logger.info('Mesh stage {} unchanged, reusing it'.format(stage))
+        else:
+            output = function(*inputs, **parameters)
+            self.cache[stage] = (key, output)
+
+        self.keys[stage] = key
+        self.outputs[stage] = output
+
+        return output
+
+    @staticmethod
+    def fingerprint(parameters, upstream_keys=()):
+        """Key of a stage from its parameters and its upstream keys
+
+        Args:
+            parameters (dict): Input parameters of the stage, numbers,
+                strings, arrays and (nested) lists or tuples of these
+            upstream_keys (list, optional): Keys of the upstream stages
+
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.sha1()
+
+        def update(value):
+            if isinstance(value, np.ndarray):
+                digest.update('{}{}'.format(value.dtype, value.shape).encode())
+                digest.update(np.ascontiguousarray(value).tobytes())
+            elif isinstance(value, (list, tuple)):
+                digest.update('({}'.format(len(value)).encode())
+                for item in value:
+                    update(item)
+                digest.update(b')')
+            else:
+                digest.update(repr(value).encode())
+
+        for key in upstream_keys:
+            digest.update(key.encode())
+        for name in sorted(parameters):
+            digest.update(name.encode())
+            update(parameters[name])
+
+        return digest.hexdigest()
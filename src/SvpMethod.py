@@ -87,7 +87,9 @@ def define_panels(x, y, N=40):
     x_center = (x.max()+x.min())/2  # x-coord of the center
     x_circle = x_center + R*numpy.cos(numpy.linspace(0, 2*math.pi, N+1))  # x-coord of the circle points
 
-    x_ends = numpy.copy(x_circle)  # projection of the x-coord on the surface
+    # projection of the x-coord on the surface (clipped, rounding of the
+    # cosine must not move the end-points outside of the contour)
+    x_ends = numpy.clip(x_circle, x.min(), x.max())
     y_ends = numpy.empty_like(x_ends)  # initialization of the y-coord Numpy array
 
     x, y = numpy.append(x, x[0]), numpy.append(y, y[0])    # extend arrays using numpy.append
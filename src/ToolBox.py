@@ -10,6 +10,9 @@ import Airfoil
 import FileDialog
 import FileSystem
 import SvpMethod
+import Farfield
+import CellBudget
+import ElementTypes
 import SplineRefine
 import TrailingEdge
 import Meshing
@@ -442,6 +445,16 @@ class Toolbox(QtWidgets.QToolBox):
         self.ratio.setDecimals(3)
         self.form_mesh_airfoil.addRow(label, self.ratio)
 
+        label = QtWidgets.QLabel('Extrusion')
+        label.setToolTip('normal: grid lines along the contour normals\n' +
+                         'hyperbolic: hyperbolic grid marching, avoids ' +
+                         'folded cells at concave parts and blunt ' +
+                         'trailing edges')
+        self.extrusion = QtWidgets.QComboBox()
+        self.extrusion.addItems(['normal', 'hyperbolic'])
+        self.extrusion.setCurrentIndex(0)
+        self.form_mesh_airfoil.addRow(label, self.extrusion)
+
         self.form_mesh_TE = QtWidgets.QFormLayout()
 
         label = QtWidgets.QLabel(u'Divisions at trailing edge')
@@ -511,6 +524,35 @@ class Toolbox(QtWidgets.QToolBox):
         self.dist.setCurrentIndex(0)
         self.form_mesh_tunnel.addRow(label, self.dist)
 
+        label = QtWidgets.QLabel('Farfield error tolerance (-)')
+        label.setToolTip('Largest velocity error of a point vortex ' +
+                         'farfield relative to the free stream.\n' +
+                         'Angle of attack and number of panels are ' +
+                         'taken from the panel method.')
+        self.farfield_tolerance = QtWidgets.QDoubleSpinBox()
+        self.farfield_tolerance.setDecimals(4)
+        self.farfield_tolerance.setSingleStep(0.0005)
+        self.farfield_tolerance.setRange(0.0001, 0.1)
+        self.farfield_tolerance.setValue(0.002)
+        self.form_mesh_tunnel.addRow(label, self.farfield_tolerance)
+
+        farfieldButton = QtWidgets.QPushButton('Size windtunnel from ' +
+                                               'panel method')
+        farfieldButton.setToolTip('Smallest windtunnel height and wake ' +
+                                  'for the farfield error tolerance')
+        self.form_mesh_tunnel.addRow(farfieldButton)
+        farfieldButton.clicked.connect(self.sizeFarfield)
+
+        self.adaptation = QtWidgets.QCheckBox('Adaptive clustering ' +
+                                              '(panel method)')
+        self.adaptation.setToolTip('Choose the point distributions of ' +
+                                   'windtunnel and wake from the velocity ' +
+                                   'gradients of the panel method.\n' +
+                                   'Angle of attack and number of panels ' +
+                                   'are taken from the panel method.')
+        self.adaptation.setChecked(False)
+        self.form_mesh_tunnel.addRow(self.adaptation)
+
         self.form_mesh_wake = QtWidgets.QFormLayout()
 
         label = QtWidgets.QLabel('Windtunnel Wake (chords)')
@@ -550,6 +592,33 @@ class Toolbox(QtWidgets.QToolBox):
         self.spread.setDecimals(1)
         self.form_mesh_wake.addRow(label, self.spread)
 
+        self.form_mesh_topology = QtWidgets.QFormLayout()
+
+        label = QtWidgets.QLabel('Mesh topology')
+        label.setToolTip('multi-block: four blocks (airfoil, trailing ' +
+                         'edge, windtunnel, wake) which are merged\n' +
+                         'C-grid: one structured block around airfoil ' +
+                         'and wake')
+        self.topology = QtWidgets.QComboBox()
+        self.topology.addItems(['multi-block', 'C-grid'])
+        self.topology.setCurrentIndex(0)
+        self.form_mesh_topology.addRow(label, self.topology)
+
+        label = QtWidgets.QLabel('Cell budget')
+        label.setToolTip('Largest number of cells of the mesh.\n' +
+                         'All divisions are scaled by the same factor, ' +
+                         'the airfoil contour is kept.')
+        self.cell_budget = QtWidgets.QSpinBox()
+        self.cell_budget.setSingleStep(1000)
+        self.cell_budget.setRange(1000, 10000000)
+        self.cell_budget.setValue(80000)
+        self.form_mesh_topology.addRow(label, self.cell_budget)
+
+        budgetButton = QtWidgets.QPushButton('Fit divisions to cell budget')
+        budgetButton.setToolTip('Predicts the cell count without meshing')
+        self.form_mesh_topology.addRow(budgetButton)
+        budgetButton.clicked.connect(self.fitCellBudget)
+
         # smoothing parameters
         label = QtWidgets.QLabel('Smoothing')
         label.setToolTip('Specify algorithm and parameters for smoothing')
@@ -682,6 +751,18 @@ class Toolbox(QtWidgets.QToolBox):
         grid.addWidget(self.check_GMSH, 1, 3)
         grid.addWidget(self.check_VTK, 2, 1)
 
+        label = QtWidgets.QLabel('Element type:')
+        label.setToolTip('quad: linear quadrilaterals as meshed\n' +
+                         'tri: quadrilaterals split along the shorter ' +
+                         'diagonal\n' +
+                         'quad8, quad9: second order quadrilaterals ' +
+                         '(GMSH, VTK)')
+        self.element_type = QtWidgets.QComboBox()
+        self.element_type.addItems(ElementTypes.ELEMENT_TYPES)
+        self.element_type.setCurrentIndex(0)
+        grid.addWidget(label, 3, 0)
+        grid.addWidget(self.element_type, 3, 1)
+
         exportMeshButton = QtWidgets.QPushButton('Export Mesh')
         hbl = QtWidgets.QHBoxLayout()
         hbl.addStretch(stretch=1)
@@ -700,6 +781,7 @@ class Toolbox(QtWidgets.QToolBox):
 
         vbl = QtWidgets.QVBoxLayout()
         vbl.addStretch(1)
+        vbl.addLayout(self.form_mesh_topology)
         vbl.addWidget(box_airfoil)
         vbl.addWidget(box_TE)
         vbl.addWidget(box_tunnel)
@@ -970,6 +1052,101 @@ class Toolbox(QtWidgets.QToolBox):
             self.parent.slots.messageBox('No airfoil loaded.')
             return
 
+    def sizeFarfield(self):
+        """Set windtunnel height and wake from the panel method
+
+        See Farfield.Farfield.settings. The divisions of the windtunnel
+        are adapted so that the cells near the airfoil stay the same.
+        """
+        if not self.parent.airfoil:
+            self.parent.slots.messageBox('No airfoil loaded.')
+            return
+
+        if not hasattr(self.parent.airfoil, 'spline_data'):
+            self.parent.slots.messageBox('Splining needs to be done first.')
+            return
+
+        contour = self.parent.airfoil.spline_data[0]
+        farfield = Farfield.Farfield(contour, alpha=self.aoaAP.value(),
+                                     npanel=self.panels.value())
+        settings = farfield.settings(
+            self.farfield_tolerance.value(),
+            tunnel_height=self.tunnel_height.value(),
+            divisions_height=self.divisions_height.value(),
+            ratio_height=self.ratio_height.value(),
+            tunnel_wake=self.tunnel_wake.value(),
+            divisions_wake=self.divisions_wake.value(),
+            ratio_wake=self.ratio_wake.value())
+
+        # cell count of the current mesh against the sized windtunnel
+        if hasattr(self, 'wind_tunnel') and self.wind_tunnel.blocks:
+            cells = Farfield.Farfield.cells(self.wind_tunnel)
+            sized = Farfield.Farfield.cells(self.wind_tunnel,
+                                            settings['divisions_height'],
+                                            settings['divisions_wake'])
+            logger.info('Sized windtunnel: {} instead of {} cells '
+                        '({} cells saved)'.format(sized, cells,
+                                                  cells - sized))
+
+        self.tunnel_height.setValue(settings['tunnel_height'])
+        self.divisions_height.setValue(settings['divisions_height'])
+        self.ratio_height.setValue(settings['ratio_height'])
+        self.tunnel_wake.setValue(settings['tunnel_wake'])
+        self.divisions_wake.setValue(settings['divisions_wake'])
+        self.ratio_wake.setValue(settings['ratio_wake'])
+
+    def fitCellBudget(self):
+        """Scale the mesh divisions to the cell budget
+
+        See CellBudget.CellBudget.plan. The number of contour points is
+        taken from the current contour.
+        """
+        if not self.parent.airfoil:
+            self.parent.slots.messageBox('No airfoil loaded.')
+            return
+
+        if not hasattr(self.parent.airfoil, 'spline_data'):
+            self.parent.slots.messageBox('Splining needs to be done first.')
+            return
+
+        contour = self.parent.airfoil.spline_data[0]
+        planner = CellBudget.CellBudget(
+            topology=self.topology.currentText(),
+            has_te=self.parent.airfoil.has_TE,
+            ref_te=0, ref_te_n=0)
+        settings = dict(points=len(contour[0]),
+                        divisions=self.points_n.value(),
+                        divisions_te=self.points_te.value(),
+                        te_divisions=self.te_div.value(),
+                        divisions_height=self.divisions_height.value(),
+                        divisions_wake=self.divisions_wake.value())
+
+        try:
+            settings, counts = planner.plan(
+                self.cell_budget.value(), settings,
+                scale=[name for name in CellBudget.SETTINGS
+                       if name != 'points'])
+        except ValueError as error:
+            self.parent.slots.messageBox(str(error))
+            return
+
+        self.points_n.setValue(settings['divisions'])
+        self.points_te.setValue(settings['divisions_te'])
+        self.te_div.setValue(settings['te_divisions'])
+        self.divisions_height.setValue(settings['divisions_height'])
+        self.divisions_wake.setValue(settings['divisions_wake'])
+
+        # the spin boxes may have limited the divisions
+        counts = planner.counts(points=len(contour[0]),
+                                divisions=self.points_n.value(),
+                                divisions_te=self.points_te.value(),
+                                te_divisions=self.te_div.value(),
+                                divisions_height=self.divisions_height.value(),
+                                divisions_wake=self.divisions_wake.value())
+        logger.info('Predicted mesh: {} cells, {} nodes, {} boundary edges'.
+                    format(counts['cells'], counts['nodes'],
+                           counts['boundary_edges']))
+
     def spline_and_refine(self):
         """Spline and refine airfoil"""
 
@@ -1060,7 +1237,12 @@ class Toolbox(QtWidgets.QToolBox):
 
     def generateMesh(self):
         self.wind_tunnel = Meshing.Windtunnel()
-        self.wind_tunnel.makeMesh()
+
+        # outputs of the mesh stages, reused if their inputs are unchanged
+        if not hasattr(self, 'mesh_stages'):
+            self.mesh_stages = dict()
+
+        self.wind_tunnel.makeMesh(cache=self.mesh_stages)
 
     def analyzeAirfoil(self):
         """Airfoil contour analysis with respect to geometric features"""
@@ -1113,19 +1295,21 @@ class Toolbox(QtWidgets.QToolBox):
         self.wind_tunnel.boundary_top = self.lineedit_top.text()
         self.wind_tunnel.boundary_bottom = self.lineedit_bottom.text()
 
-        if self.check_FIRE.isChecked():
-            name = filename + '.flma'
-            Meshing.BlockMesh.writeFLMA(self.wind_tunnel,
-                                        name=name)
-        if self.check_SU2.isChecked():
-            name = filename + '.su2'
-            Meshing.BlockMesh.writeSU2_nolib(self.wind_tunnel, name=name)
-        if self.check_GMSH.isChecked():
-            name = filename + '.msh'
-            Meshing.BlockMesh.writeGMSH_nolib(self.wind_tunnel, name=name)
-        if self.check_VTK.isChecked():
-            name = filename + '.vtu'
-            Meshing.BlockMesh.writeVTK_nolib(self.wind_tunnel, name=name)
+        element_type = self.element_type.currentText()
+        wind_tunnel = ElementTypes.convert(self.wind_tunnel, element_type)
+
+        checked = [output_format for output_format, check in
+                   (('FLMA', self.check_FIRE), ('SU2', self.check_SU2),
+                    ('GMSH', self.check_GMSH), ('VTK', self.check_VTK))
+                   if check.isChecked()]
+        for output_format in checked:
+            if not ElementTypes.supported(output_format, element_type):
+                logger.info('No {} export of {} elements'.
+                            format(output_format, element_type))
+                continue
+            writer, extension = Meshing.WRITERS[output_format]
+            getattr(Meshing.BlockMesh, writer)(wind_tunnel,
+                                               name=filename + extension)
 
     def exportContour(self):
 
@@ -75,14 +75,14 @@ class TrailingEdge:
         blend_points = np.where(xx > (1.0 - blend) * xmax)
         x = copy.copy(xx)
         y = copy.copy(yy)
+        # normal at the trailing edge end of the contour
+        # (lower side: contour runs towards the TE, so flip the normal)
         if side == 'upper':
             signum = 1.0
-            a = np.array([x[1] - x[0], y[1] - y[0]])
+            n = Utils.curve_normals(x[:2], y[:2])[0]
         elif side == 'lower':
             signum = -1.0
-            a = np.array([x[-2] - x[-1], y[-2] - y[-1]])
-        e = Utils.unit_vector(a)
-        n = np.array([e[1], -e[0]])
+            n = -Utils.curve_normals(x[-2:], y[-2:])[-1]
         shift = 0.5 * thickness
         for i in blend_points:
             shift_blend = (x[i] - xmax * (1.0 - blend)) / \
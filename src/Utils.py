@@ -175,6 +175,112 @@ class Utils:
         """ Returns the unit vector of the vector.  """
         return vector / np.linalg.norm(vector)
 
+    @staticmethod
+    def curve_tangents(x, y, closed=False):
+        """Unit tangent vectors of a polyline (central differences)
+
+        At the ends of an open curve one-sided differences are used.
+        For closed curves the first and last point are connected, i.e.
+        the differences wrap around.
+
+        Args:
+            x (np.array): x-coordinates, shape (n,) or (..., n) for a
+                          batch of curves with the same number of points
+            y (np.array): y-coordinates, same shape as x
+            closed (bool, optional): True if the curve is closed
+
+        Returns:
+            np.array: unit tangents, shape (..., n, 2)
+        """
+        p = np.stack((np.asarray(x, dtype=float),
+                      np.asarray(y, dtype=float)), axis=-1)
+
+        if closed:
+            a = np.roll(p, -1, axis=-2) - np.roll(p, 1, axis=-2)
+        else:
+            a = np.empty_like(p)
+            a[..., 1:-1, :] = p[..., 2:, :] - p[..., :-2, :]
+            a[..., 0, :] = p[..., 1, :] - p[..., 0, :]
+            a[..., -1, :] = p[..., -1, :] - p[..., -2, :]
+
+        return a / np.linalg.norm(a, axis=-1, keepdims=True)
+
+    @staticmethod
+    def curve_normals(x, y, closed=False):
+        """Unit normal vectors of a polyline (central differences)
+
+        The normal is the tangent rotated clockwise by 90 degrees,
+        i.e. (ty, -tx). See curve_tangents for the arguments.
+
+        Returns:
+            np.array: unit normals, shape (..., n, 2)
+        """
+        t = Utils.curve_tangents(x, y, closed=closed)
+        return np.stack((t[..., 1], -t[..., 0]), axis=-1)
+
+    @staticmethod
+    def arc_length_parameter(points):
+        """Normalized cumulative arc length of polylines
+
+        This is the chord length parametrization which
+        scipy.interpolate.splprep uses for its parameter u.
+
+        Args:
+            points (np.array): Polyline points, shape (n, 2) or (..., n, 2)
+                               for a stack of polylines
+
+        Returns:
+            np.array: parameter 0 <= u <= 1, shape (n,) or (..., n)
+        """
+        points = np.asarray(points, dtype=float)
+        ds = np.linalg.norm(np.diff(points, axis=-2), axis=-1)
+        u = np.zeros(points.shape[:-1])
+        np.cumsum(ds, axis=-1, out=u[..., 1:])
+        return u / u[..., -1:]
+
+    @staticmethod
+    def resample_polyline(points, t, u=None):
+        """Evaluate polylines at parameters t (linear interpolation)
+
+        Gives the same points as evaluating a linear spline
+        (splprep with k=1 and s=0) with splev, but without fitting one.
+
+        Args:
+            points (np.array): Polyline points, shape (n, 2) or (..., n, 2)
+            t (np.array): Parameters 0 <= t <= 1, shape (m,) or (..., m)
+            u (np.array, optional): Parameters of the polyline points
+                                    (default is the arc length parameter)
+
+        Returns:
+            np.array: Interpolated points, shape (m, 2) or (..., m, 2)
+        """
+        points = np.asarray(points, dtype=float)
+        if u is None:
+            u = Utils.arc_length_parameter(points)
+
+        if points.ndim == 2:
+            return np.stack((np.interp(t, u, points[:, 0]),
+                             np.interp(t, u, points[:, 1])), axis=-1)
+
+        # stacked polylines: shift the parameter range of curve k by 2k
+        # so that the segments of all curves are found with one search
+        batch = points.shape[:-2]
+        n = points.shape[-2]
+        t = np.broadcast_to(t, batch + np.shape(t)[-1:])
+        curve = np.arange(int(np.prod(batch)))
+        offset = 2.0 * curve.reshape(batch + (1,))
+        k = np.searchsorted((u + offset).ravel(), (t + offset).ravel(),
+                            side='right') - 1
+        curve = np.repeat(curve, t.shape[-1])
+        k = np.clip(k, curve * n, curve * n + n - 2)
+
+        # linear interpolation on segment k (with the unshifted parameters)
+        u = u.ravel()
+        p = points.reshape(-1, 2)
+        w = (t.ravel() - u[k]) / (u[k + 1] - u[k])
+        p = p[k] + w[:, np.newaxis] * (p[k + 1] - p[k])
+        return p.reshape(t.shape + (2,))
+
     @staticmethod
     def angle_between(a, b, degree=False):
         """Returns the angle between
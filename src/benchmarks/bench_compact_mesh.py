@@ -0,0 +1,117 @@
+"""
+Memory benchmark of CompactMesh against the former tuple/dict mesh
+
+A structured mesh of 1001 x 1001 nodes (1M quadrilaterals) is stored
+with the edge tables and the boundary edges, once as Python lists and
+dictionaries (the former Windtunnel.makeLCE and makeBoundaries, kept
+below as reference) and once as CompactMesh with float64 and float32
+coordinates. Memory is measured with tracemalloc.
+
+Usage (from the repository root):
+
+    python src/benchmarks/bench_compact_mesh.py [nodes per side]
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CompactMesh import CompactMesh
+
+
+def structured_mesh(n):
+    """Nodes and quadrilaterals of a unit square with n x n nodes"""
+    x, y = np.meshgrid(np.linspace(0.0, 1.0, n), np.linspace(0.0, 1.0, n))
+    nodes = np.stack((x, y), axis=-1).reshape(-1, 2)
+    ids = np.arange(n * n).reshape(n, n)
+    connectivity = np.stack((ids[:-1, :-1].T, ids[1:, :-1].T,
+                             ids[1:, 1:].T, ids[:-1, 1:].T),
+                            axis=-1).reshape(-1, 4)
+    return nodes, connectivity
+
+
+def tuple_mesh(nodes, connectivity):
+    """Former representation: vertex tuples, edge dict and edge lists"""
+    vertices = list(map(tuple, nodes.tolist()))
+
+    lce = dict()
+    edges = list()
+    for i, cell in enumerate(connectivity):
+        cell_edges = [(cell[j], cell[(j + 1) % len(cell)])
+                      for j in range(len(cell))]
+        lce[i] = cell_edges
+        edges += [tuple(sorted(edge)) for edge in cell_edges]
+
+    seen = set()
+    unique = list()
+    doubles = set()
+    for edge in edges:
+        if edge not in seen:
+            seen.add(edge)
+            unique.append(edge)
+        else:
+            doubles.add(edge)
+    boundary_edges = [edge for edge in unique if edge not in doubles]
+
+    return vertices, connectivity, lce, edges, boundary_edges
+
+
+def compact_mesh(nodes, connectivity, dtype):
+    # a copy, so that the coordinates are counted also for float64
+    mesh = CompactMesh(nodes.copy(), connectivity, dtype=dtype)
+    mesh.makeEdges()
+    return mesh, mesh.boundaryEdges()
+
+
+def measure(make):
+    """Retained and peak memory in MiB, run time in s and the result"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = make()
+    seconds = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / 2**20, peak / 2**20, seconds, result
+
+
+def main(n=1001):
+    nodes, connectivity = structured_mesh(n)
+
+    print('Mesh with {} cells (mesh, edge tables and boundary edges)'.
+          format(len(connectivity)))
+    print('  {:18s} {:>12s} {:>12s} {:>9s}'.format(
+        'representation', 'retained', 'peak', 'time'))
+
+    candidates = (
+        ('tuple/dict (old)', lambda: tuple_mesh(nodes, connectivity)),
+        ('compact float64',
+         lambda: compact_mesh(nodes, connectivity, np.float64)),
+        ('compact float32',
+         lambda: compact_mesh(nodes, connectivity, np.float32)))
+
+    results = dict()
+    for name, make in candidates:
+        retained, peak, seconds, result = measure(make)
+        results[name] = retained, result[-1]
+        print('  {:18s} {:8.1f} MiB {:8.1f} MiB {:7.2f} s'.format(
+            name, retained, peak, seconds))
+        del result
+
+    old_retained, old_boundary = results['tuple/dict (old)']
+    new_retained, new_boundary = results['compact float64']
+    print('  memory ratio old / compact float64: {:.1f}'.format(
+        old_retained / new_retained))
+
+    assert np.array_equal(np.array(old_boundary), new_boundary), \
+        'boundary edges differ'
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
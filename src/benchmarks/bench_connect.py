@@ -0,0 +1,159 @@
+"""
+Benchmark of the vertex merge of the multi-block mesh (Connect)
+
+Builds the four blocks of a multi-block mesh around the Clark Y airfoil
+with about 2M nodes and connects them with
+
+    - the former geometric merge (one KD-tree query per vertex, kept
+      below as reference)
+    - Connect.connectAllBlocks without interfaces (vectorized geometric
+      merge, the fallback for arbitrary blocks)
+    - Connect.connectAllBlocks with Windtunnel.blockInterfaces (index
+      arithmetic)
+
+and checks that all three give the same vertices and connectivity. The
+former merge takes a long time on 2M nodes.
+
+Usage (from the repository root):
+
+    python src/benchmarks/bench_connect.py [points divisions height wake]
+
+The defaults 1500 100 600 600 (points on the spline, airfoil and
+trailing edge layers, divisions of windtunnel height and wake) give
+2.04M nodes, 400 30 200 200 give 204k nodes.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import spatial
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC)
+
+from PySide6 import QtCore
+
+
+class MainWindow:
+    """Stands in for the GUI main window (holds the airfoil)"""
+    pass
+
+
+app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+app.mainwindow = MainWindow()
+
+import Airfoil
+import Connect
+import Meshing
+import SplineRefine
+
+
+def make_blocks(points=1500, divisions=100, height=600, wake=600):
+    """Blocks of the multi-block mesh around the Clark Y airfoil"""
+    path = os.path.join(os.path.dirname(SRC), 'data', 'Airfoils',
+                        'RC_Glider', 'clarky.dat')
+    airfoil = Airfoil.Airfoil('clarky')
+    airfoil.readContour(path, '#')
+    airfoil.has_TE = False
+    app.mainwindow.airfoil = airfoil
+    SplineRefine.SplineRefine().doSplineRefine(
+        tolerance=172.0, points=points, ref_te=3, ref_te_n=6, ref_te_ratio=3)
+    contour = airfoil.spline_data[0]
+
+    wind_tunnel = Meshing.Windtunnel()
+    wind_tunnel.AirfoilMesh(name='block_airfoil', contour=contour,
+                            divisions=divisions, ratio=1.01,
+                            thickness=0.004)
+    wind_tunnel.TrailingEdgeMesh(name='block_TE', te_divisions=3,
+                                 thickness=0.004, divisions=divisions,
+                                 ratio=1.01)
+    wind_tunnel.TunnelMesh(name='block_tunnel', tunnel_height=3.5,
+                           divisions_height=height, ratio_height=10.0,
+                           dist='symmetric', smoothing_algorithm='simple',
+                           smoothing_iterations=1, smoothing_tolerance=1e-5)
+    wind_tunnel.TunnelMeshWake(name='block_tunnel_wake', tunnel_wake=7.0,
+                               divisions=wake, ratio=15.0, spread=0.3)
+    return wind_tunnel
+
+
+def connect_kdtree_loop(blocks):
+    """Former Connect.connectAllBlocks (KD-tree query per vertex)"""
+    vertices = list()
+    connectivity = list()
+
+    for block in blocks:
+        shift = len(vertices)
+        vertices += list(map(tuple,
+                             block.getULinesArray().reshape(-1, 2).tolist()))
+
+        U, V = block.getDivUV()
+        up = U + 1
+        for u in range(U):
+            for v in range(V):
+                p1 = v * up + u + shift
+                connectivity.append((p1, p1 + up, p1 + up + 1, p1 + 1))
+
+    tree = spatial.cKDTree(vertices)
+    vertex_and_neighbours = dict()
+    for vertex_id, vertex in enumerate(vertices):
+        vertex_and_neighbours[vertex_id] = \
+            tree.query_ball_point(vertex, 1.e-6)
+
+    connectivity_connected = list()
+    for cell in connectivity:
+        connectivity_connected.append(
+            [min(vertex_and_neighbours[node]) for node in cell])
+
+    unconnected = np.array(connectivity)
+    connected = np.array(connectivity_connected)
+
+    deleted_nodes = np.unique(unconnected[np.where(connected != unconnected)])
+
+    vertices_clean = [v for i, v in enumerate(vertices)
+                      if i not in sorted(deleted_nodes.tolist())]
+
+    remaining_nodes = np.setdiff1d(np.unique(connected), deleted_nodes)
+    mapping = np.zeros(remaining_nodes.max() + 1, dtype=int)
+    mapping[remaining_nodes] = np.arange(len(remaining_nodes))
+
+    return vertices_clean, mapping[connected]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(points=1500, divisions=100, height=600, wake=600):
+    wind_tunnel = make_blocks(points, divisions, height, wake)
+    blocks = wind_tunnel.blocks
+    nodes = sum(block.getULinesArray().shape[0] *
+                block.getULinesArray().shape[1] for block in blocks)
+    print('Multi-block mesh with {} block nodes'.format(nodes))
+
+    connect = Connect.Connect(None)
+    geometric, (vertices, connectivity, _) = \
+        timed(connect.connectAllBlocks, blocks)
+    topological, (vertices_i, connectivity_i, _) = \
+        timed(connect.connectAllBlocks, blocks,
+              interfaces=wind_tunnel.blockInterfaces(blocks))
+    print('  {} vertices, {} cells'.format(len(vertices), len(connectivity)))
+    print('  vectorized KD-tree merge   {:8.2f} s'.format(geometric))
+    print('  declared interfaces        {:8.2f} s'.format(topological))
+
+    loop, (vertices_old, connectivity_old) = \
+        timed(connect_kdtree_loop, blocks)
+    print('  former per vertex merge    {:8.2f} s'.format(loop))
+    print('  speedup of the KD-tree merge {:.0f} x'.format(loop / geometric))
+
+    assert vertices == vertices_i == vertices_old, 'vertices differ'
+    assert np.array_equal(connectivity, connectivity_i) and \
+        np.array_equal(connectivity, connectivity_old), \
+        'connectivity differs'
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:5]])
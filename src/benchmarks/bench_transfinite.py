@@ -0,0 +1,106 @@
+"""
+Benchmark of BlockMesh.transfinite on a 500 x 500 node patch
+
+Compares the vectorized Coons patch with the former node by node loop
+(kept below as reference) and checks that both agree to machine
+precision.
+
+Usage (from the repository root):
+
+    python src/benchmarks/bench_transfinite.py [nodes]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import interpolate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6 import QtCore
+
+app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+import Meshing
+
+
+def boundaries(n):
+    """Curved boundaries of a unit square patch with n nodes per side"""
+    t = np.linspace(0.0, 1.0, n)
+    lower = np.column_stack((t, 0.1 * np.sin(np.pi * t)))
+    upper = np.column_stack((t, 1.0 + 0.1 * np.sin(2.0 * np.pi * t)))
+    left = np.column_stack((0.05 * np.sin(np.pi * t), t))
+    right = np.column_stack((1.0 + 0.05 * np.sin(np.pi * t), t))
+    return lower, upper, left, right
+
+
+def transfinite_loop(lower, upper, left, right):
+    """Former implementation of BlockMesh.transfinite (double loop)"""
+    _, u_lower = interpolate.splprep(lower.T, s=0, k=1)
+    _, u_left = interpolate.splprep(left.T, s=0, k=1)
+
+    nodes = np.zeros((len(left) * len(lower), 2))
+
+    c1 = lower[0]
+    c2 = upper[0]
+    c3 = lower[-1]
+    c4 = upper[-1]
+
+    for i, xi in enumerate(u_lower):
+        for j, eta in enumerate(u_left):
+
+            node = i * len(u_left) + j
+
+            point = (1.0 - xi) * left[j] + xi * right[j] + \
+                (1.0 - eta) * lower[i] + eta * upper[i] - \
+                ((1.0 - xi) * (1.0 - eta) * c1 + (1.0 - xi) * eta * c2 +
+                 xi * (1.0 - eta) * c3 + xi * eta * c4)
+
+            nodes[node, 0] = point[0]
+            nodes[node, 1] = point[1]
+
+    vlines = list()
+    vline = list()
+    i = 0
+    for node in nodes:
+        i += 1
+        vline.append(node)
+        if i % len(left) == 0:
+            vlines.append(vline)
+            vline = list()
+
+    vlines.reverse()
+
+    return np.array(Meshing.BlockMesh.makeUfromV(vlines))
+
+
+def main(n=500, repeat=5):
+    lower, upper, left, right = boundaries(n)
+
+    start = time.perf_counter()
+    reference = transfinite_loop(lower, upper, left, right)
+    loop = time.perf_counter() - start
+
+    block = Meshing.BlockMesh()
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        block.transfinite(boundary=[lower, upper, left, right])
+        times.append(time.perf_counter() - start)
+    vectorized = min(times)
+
+    difference = np.abs(reference - block.getULinesArray()).max()
+
+    print('Transfinite interpolation, {} x {} nodes'.format(n, n))
+    print('  loop        {:8.3f} s'.format(loop))
+    print('  vectorized  {:8.4f} s (best of {})'.format(vectorized, repeat))
+    print('  speedup     {:8.0f} x'.format(loop / vectorized))
+    print('  max. difference {:.1e}'.format(difference))
+
+    assert difference <= 1.e-12, 'results differ'
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])